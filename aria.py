@@ -1,7 +1,9 @@
-import requests
 import re
 import os
 
+import http_client
+from playlist_index import MAX_MISSED_RUNS, PlaylistIndex
+
 PLAYLIST_URLS = [
     "https://raw.githubusercontent.com/theariatv/theariatv.github.io/refs/heads/main/aria.m3u",
     "https://raw.githubusercontent.com/theariatv/theariatv.github.io/refs/heads/main/aria%2B.m3u"
@@ -19,21 +21,7 @@ group_regex = re.compile(r'group-title="([^"]*)"')
 
 def fetch_playlist(url):
     """Fetch playlist text and split into lines."""
-    r = requests.get(url)
-    r.raise_for_status()
-    return r.text.splitlines()
-
-def get_existing_urls(file_path):
-    """Collect URLs already present in the local playlist."""
-    urls = set()
-    if not os.path.exists(file_path):
-        return urls
-    with open(file_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-    for i, line in enumerate(lines):
-        if line.startswith("#EXTINF") and i + 1 < len(lines):
-            urls.add(lines[i + 1].strip())
-    return urls
+    return http_client.get_text(url).splitlines()
 
 def remap_group_title(line):
     """Prefix allowed group-titles with 'AriaPlus -', keep all other metadata intact."""
@@ -51,8 +39,8 @@ def remap_group_title(line):
     )
     return new_line
 
-def process_playlist(lines, existing_urls):
-    """Filter + remap channels, skipping already existing URLs."""
+def process_playlist(lines, index):
+    """Filter + remap channels, skipping URLs already in the index."""
     output_lines = []
     skip_next = False
     for i, line in enumerate(lines):
@@ -65,24 +53,25 @@ def process_playlist(lines, existing_urls):
             # Check next line for URL
             if i + 1 < len(lines):
                 url_line = lines[i + 1].strip()
-                if url_line not in existing_urls:
+                if url_line not in index:
                     output_lines.append(new_line)
                     output_lines.append(url_line)
-                    existing_urls.add(url_line)
+                index.seen(url_line)
             skip_next = True
     return output_lines
 
 def main():
     print("🔄 Updating AriaPlus playlist...")
-    existing_urls = get_existing_urls(OUTPUT_FILE)
+    index = PlaylistIndex(OUTPUT_FILE)
     new_entries = []
+    complete = True
 
-    for url in PLAYLIST_URLS:
-        try:
-            lines = fetch_playlist(url)
-            new_entries.extend(process_playlist(lines, existing_urls))
-        except Exception as e:
-            print(f"⚠️ Failed to fetch {url}: {e}")
+    for url, lines, error in http_client.fetch_all(PLAYLIST_URLS, fetch_playlist):
+        if error:
+            print(f"⚠️ Failed to fetch {url}: {error}")
+            complete = False
+            continue
+        new_entries.extend(process_playlist(lines, index))
 
     if not os.path.exists(OUTPUT_FILE):
         with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
@@ -95,5 +84,11 @@ def main():
     else:
         print("ℹ No new entries — playlist unchanged.")
 
+    index.end_run(complete)
+    removed = index.compact()
+    if removed:
+        print(f"🧹 Removed {removed} entries missing upstream for {MAX_MISSED_RUNS} runs")
+    index.save()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,111 @@
+"""Compares the old linear table scans with matcher.KeywordMatcher.
+
+    python benchmarks/bench_matcher.py [names]
+
+Builds a few thousand realistic names per table, checks both approaches agree
+on every one, then times them cold (fresh cache) and warm (repeat names).
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher import KeywordMatcher  # noqa: E402
+from fstv import CHANNEL_MAPPING, normalize_channel_name  # noqa: E402
+from pixelsport import LEAGUE_INFO  # noqa: E402
+from ppv import COLLEGE_TEAMS, NFL_TEAMS  # noqa: E402
+from rox import TV_INFO  # noqa: E402
+
+FILLER = ["live", "hd", "stream", "vs", "2024", "channel", "us", "east", "replay", "week 7"]
+
+
+def linear_fstv(name):
+    for channel_data in CHANNEL_MAPPING.values():
+        if any(keyword in name for keyword in channel_data.get("keywords", [])):
+            return channel_data
+    return {}
+
+
+def linear_football(name):
+    for team in NFL_TEAMS:
+        if team in name:
+            return ("NFL.Dummy.us", "PPVLand - NFL Action")
+    for team in COLLEGE_TEAMS:
+        if team in name:
+            return ("NCAA.Football.Dummy.us", "PPVLand - College Football")
+    return None
+
+
+def linear_league(name):
+    for key, info in LEAGUE_INFO.items():
+        if key.lower() in name.lower():
+            return info
+    return None
+
+
+def linear_tv(url):
+    for key, info in TV_INFO.items():
+        if key in url:
+            return info
+    return TV_INFO["misc"]
+
+
+def make_names(rng, keywords, count, transform=lambda s: s):
+    names = []
+    for _ in range(count):
+        parts = rng.sample(FILLER, 2)
+        if rng.random() < 0.8:
+            parts.insert(rng.randrange(3), rng.choice(keywords))
+        if rng.random() < 0.3:
+            parts.append(rng.choice(keywords))
+        names.append(transform(" ".join(parts)))
+    return names
+
+
+def timed(fn, names):
+    start = time.perf_counter()
+    for name in names:
+        fn(name)
+    return time.perf_counter() - start
+
+
+def run(label, linear, matcher, names):
+    mismatches = [n for n in names if linear(n) != matcher.match(n)]
+    if mismatches:
+        print(f"❌ {label}: {len(mismatches)} mismatches, e.g. {mismatches[0]!r}")
+    unique = list(dict.fromkeys(names))
+    matcher.match.cache_clear()
+    cold = timed(matcher.match, unique)
+    warm = timed(matcher.match, names)
+    base = timed(linear, names)
+    print(f"{label:<10} {len(names):>6} names  linear {base * 1000:8.1f} ms  "
+          f"matcher cold {cold * 1000:7.1f} ms ({len(unique)} unique)  warm {warm * 1000:7.1f} ms  "
+          f"x{base / max(warm, 1e-9):.0f}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(42)
+
+    fstv_keywords = [k for c in CHANNEL_MAPPING.values() for k in c.get("keywords", [])]
+    fstv = KeywordMatcher(((c.get("keywords", []), c) for c in CHANNEL_MAPPING.values()), default={})
+    run("fstv", linear_fstv, fstv, make_names(rng, fstv_keywords, count, normalize_channel_name))
+
+    # Sets iterate in hash order, so only compare against one ordering of each table.
+    football = KeywordMatcher([
+        (sorted(NFL_TEAMS), ("NFL.Dummy.us", "PPVLand - NFL Action")),
+        (sorted(COLLEGE_TEAMS), ("NCAA.Football.Dummy.us", "PPVLand - College Football")),
+    ])
+    run("ppv", linear_football, football, make_names(rng, sorted(NFL_TEAMS | COLLEGE_TEAMS), count))
+
+    leagues = KeywordMatcher(LEAGUE_INFO.items(), ignore_case=True)
+    run("pixel", linear_league, leagues, make_names(rng, list(LEAGUE_INFO), count))
+
+    tv = KeywordMatcher(TV_INFO.items(), default=TV_INFO["misc"])
+    run("rox", linear_tv, tv, make_names(rng, list(TV_INFO), count, lambda s: "https://roxiestreams.live/" + s.replace(" ", "-")))
+
+
+if __name__ == "__main__":
+    main()
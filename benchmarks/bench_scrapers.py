@@ -0,0 +1,192 @@
+"""Offline record/replay benchmark for the Playwright scrapers.
+
+    python benchmarks/bench_scrapers.py record ppv
+    python benchmarks/bench_scrapers.py replay ppv --latency 50 --jitter 20 --runs 3
+
+`record` runs the scraper against the live site once with HAR_MODE=record and
+leaves fixtures in --dir. `replay` serves the browser entirely from those
+fixtures and drives the scraper's browser step over every page the recording
+navigated to, reporting per-stream resolution time, pages per minute and the
+browser's peak memory (needs psutil). Sites: ppv, thetvapp, fstv, webcast.
+"""
+import argparse
+import asyncio
+import glob
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import har_replay  # noqa: E402
+from browser_pool import BrowserPool  # noqa: E402
+from page_trace import percentile  # noqa: E402
+from stream_capture import StreamCapture  # noqa: E402
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+SAMPLE_INTERVAL = 0.5
+BROWSER_TYPES = {"ppv": "firefox", "thetvapp": "firefox", "fstv": "firefox", "webcast": "chromium"}
+
+
+def fixture_names(site, directory):
+    if site == "webcast":
+        paths = glob.glob(os.path.join(directory, "webcast-*.pages.json"))
+        return sorted(os.path.basename(p)[: -len(".pages.json")] for p in paths)
+    if site == "thetvapp":
+        return ["thetvapp-channels", "thetvapp-sports"]
+    return [site]
+
+
+async def record(site, pool):
+    if site == "ppv":
+        import ppv
+        await ppv.main(pool)
+    elif site == "thetvapp":
+        import tv
+        await asyncio.gather(tv.scrape_tv_urls(pool), tv.scrape_all_sports_sections(pool))
+    elif site == "fstv":
+        import fstv
+        await fstv.fetch_fstv_channels(pool)
+    elif site == "webcast":
+        import webcast
+        await webcast.main(pool)
+
+
+async def resolve_ppv(context, url):
+    import ppv
+    page = await context.new_page()
+    try:
+        with StreamCapture(page) as capture, ppv.TRACER.start(page, url, "bench") as trace:
+            await ppv._capture_m3u8(page, url, capture, trace)
+            trace.outcome = "ok" if capture.first else "miss"
+            return capture.first
+    finally:
+        await page.close()
+
+
+async def resolve_thetvapp(context, url):
+    import tv
+    return await tv.capture_stream_in_browser(context, url, "bench", url)
+
+
+async def resolve_webcast(context, url):
+    import webcast
+    page = await context.new_page()
+    extract = lambda u: u if webcast.STREAM_PATTERN.search(u) else None  # noqa: E731
+    try:
+        with StreamCapture(page, extract, event="request") as capture:
+            await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            return await capture.wait(webcast.DYNAMIC_WAIT_TIMEOUT / 1000)
+    except Exception:
+        return None
+    finally:
+        await page.close()
+
+
+RESOLVERS = {"ppv": resolve_ppv, "thetvapp": resolve_thetvapp, "webcast": resolve_webcast}
+
+
+def blocker_for(site):
+    module = {"ppv": "ppv", "thetvapp": "tv", "fstv": "fstv", "webcast": "webcast"}[site]
+    return __import__(module).BLOCKER
+
+
+async def sample_memory(peak):
+    while True:
+        if psutil is not None:
+            total = 0
+            for child in psutil.Process().children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    continue
+            peak[0] = max(peak[0], total)
+        await asyncio.sleep(SAMPLE_INTERVAL)
+
+
+async def replay_once(site, directory):
+    timings, misses = [], 0
+    peak = [0]
+    sampler = asyncio.ensure_future(sample_memory(peak))
+    start = time.perf_counter()
+    async with BrowserPool(BROWSER_TYPES[site]) as pool:
+        if site == "fstv":
+            # FSTV is one page clicking through its own channel list, so it is
+            # timed as a whole and divided by the channels it resolved.
+            import fstv
+            channels = await fstv.fetch_fstv_channels(pool)
+            elapsed = time.perf_counter() - start
+            timings = [elapsed / len(channels)] * len(channels) if channels else []
+        else:
+            resolve = RESOLVERS[site]
+            for name in fixture_names(site, directory):
+                async with pool.context(blocker=blocker_for(site), har=name) as context:
+                    for url in har_replay.load_pages(name, directory):
+                        began = time.perf_counter()
+                        stream = await resolve(context, url)
+                        if stream:
+                            timings.append(time.perf_counter() - began)
+                        else:
+                            misses += 1
+        pages = pool.pages_opened
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+    return {
+        "elapsed": elapsed,
+        "streams": len(timings),
+        "misses": misses,
+        "pages_per_min": pages / (elapsed / 60) if elapsed else 0,
+        "p50": percentile(timings, 50),
+        "p95": percentile(timings, 95),
+        "peak_mb": peak[0] / 1_048_576 if psutil is not None else None,
+    }
+
+
+def print_run(label, r):
+    memory = f"{r['peak_mb']:.0f} MB" if r["peak_mb"] is not None else "n/a (no psutil)"
+    print(f"{label:<8} {r['elapsed']:7.1f} s  {r['streams']:>4} streams  {r['misses']:>4} misses  "
+          f"p50 {r['p50']:5.2f} s  p95 {r['p95']:5.2f} s  {r['pages_per_min']:6.1f} pages/min  peak {memory}")
+
+
+async def run(args):
+    har_replay.HAR_DIR = args.dir
+    har_replay.HAR_MODE = args.mode
+    if args.mode == "record":
+        async with BrowserPool(BROWSER_TYPES[args.site]) as pool:
+            await record(args.site, pool)
+        return
+
+    har_replay.HAR_LATENCY_MS = args.latency
+    har_replay.HAR_JITTER_MS = args.jitter
+    results = []
+    for i in range(args.runs):
+        result = await replay_once(args.site, args.dir)
+        print_run(f"run {i + 1}", result)
+        results.append(result)
+    if len(results) > 1:
+        median = {key: statistics.median(r[key] for r in results) for key in ("elapsed", "streams", "misses", "pages_per_min", "p50", "p95")}
+        peaks = [r["peak_mb"] for r in results if r["peak_mb"] is not None]
+        median["peak_mb"] = statistics.median(peaks) if peaks else None
+        print_run("median", median)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=("record", "replay"))
+    parser.add_argument("site", choices=sorted(BROWSER_TYPES))
+    parser.add_argument("--dir", default=har_replay.HAR_DIR, help="fixture directory")
+    parser.add_argument("--latency", default="0", help='ms added per response, or "recorded"')
+    parser.add_argument("--jitter", type=int, default=0, help="random extra 0..N ms per response")
+    parser.add_argument("--runs", type=int, default=1)
+    args = parser.parse_args()
+    args.dir = os.path.abspath(args.dir)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
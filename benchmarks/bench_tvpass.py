@@ -0,0 +1,162 @@
+"""Compares tvpass.py's old date parsing and reconcile with the current ones.
+
+    python benchmarks/bench_tvpass.py [entries]
+
+Builds a synthetic TVPass playlist (10k entries by default) plus an upstream
+copy with overlapping titles, checks both implementations produce the same
+playlist, then times parse + reconcile for each.
+"""
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tvpass  # noqa: E402
+from tvpass import extract_group, extract_title, lock_metadata  # noqa: E402
+
+GROUPS = ["nfl", "nba", "mlb", "nhl", "ppv", "ncaaf", "wnba", "live", "Entertainment", "Sports"]
+TEAMS = ["Jets", "Bills", "Lakers", "Celtics", "Yankees", "Mets", "Rangers", "Bruins", "Alabama", "Georgia"]
+CHANNELS = ["ESPN HD", "TSN2 SD", "Fox Business SD", "NY SD", "TBS East HD", "CBS Sports Network USA SD"]
+
+
+# --- previous implementation -------------------------------------------------
+
+def old_extract_event_date(title):
+    patterns = [
+        r"(\d{4}-\d{2}-\d{2})",
+        r"(\d{1,2}/\d{1,2})",
+        r"([A-Za-z]+ \d{1,2})",
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, title)
+        if match:
+            try:
+                text = match.group(1)
+                for fmt in ("%Y-%m-%d", "%m/%d", "%B %d", "%b %d"):
+                    try:
+                        parsed = datetime.strptime(text, fmt)
+                        if "%Y" not in fmt:
+                            parsed = parsed.replace(year=datetime.now().year)
+                        return parsed.date()
+                    except ValueError:
+                        continue
+            except Exception:
+                continue
+    return None
+
+
+def old_is_event_outdated(title):
+    event_date = old_extract_event_date(title)
+    if event_date:
+        today = datetime.now().date()
+        return event_date < today
+    return False
+
+
+def old_pairs(lines, start=0):
+    pairs = []
+    i = start
+    while i < len(lines):
+        if lines[i].startswith("#EXTINF"):
+            meta = lines[i].strip()
+            group = extract_group(meta).lower()
+            i += 1
+            if i < len(lines):
+                url = lines[i].strip()
+                title = extract_title(meta)
+                if group != "live" and not old_is_event_outdated(title):
+                    pairs.append((meta, url))
+        i += 1
+    return pairs
+
+
+def old_update_playlist(local_pairs, upstream_pairs):
+    updated = []
+    used_titles = set()
+    upstream_map = {extract_title(meta): url for meta, url in upstream_pairs}
+
+    for meta, url in local_pairs:
+        title = extract_title(meta)
+        if title in upstream_map:
+            new_url = upstream_map[title]
+            new_meta = lock_metadata(meta, title)
+            updated.append((new_meta, new_url))
+            used_titles.add(title)
+        else:
+            updated.append((lock_metadata(meta, title), url))
+
+    for meta, url in upstream_pairs:
+        title = extract_title(meta)
+        if title not in used_titles:
+            updated.append((lock_metadata(meta, title), url))
+
+    return updated
+
+
+# --- synthetic playlist ------------------------------------------------------
+
+def random_date(rng):
+    now = datetime.now()
+    month, day = rng.randint(1, 12), rng.randint(1, 28)
+    return rng.choice([
+        f"{now.year}-{month:02d}-{day:02d}",
+        f"{month}/{day}",
+        f"{datetime(2000, month, 1):%B} {day}",
+        f"{datetime(2000, month, 1):%b} {day}",
+        "2/29", "13/45", f"{now.year}-02-30", "Week 5 Oct 12", "Game 7",
+    ])
+
+
+def make_title(rng):
+    if rng.random() < 0.4:
+        return rng.choice(CHANNELS)
+    return f"{rng.choice(TEAMS)} vs {rng.choice(TEAMS)} {random_date(rng)}"
+
+
+def make_playlist(rng, titles):
+    lines = ["#EXTM3U"]
+    for n, title in enumerate(titles):
+        lines.append(f'#EXTINF:-1 tvg-id="x" group-title="{rng.choice(GROUPS)}",{title}')
+        lines.append(f"http://tvpass.org/live/{n}/{rng.randrange(10**6)}.m3u8")
+    return lines
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = random.Random(42)
+    titles = [make_title(rng) for _ in range(count // 2)]
+    local = make_playlist(rng, [rng.choice(titles) for _ in range(count)])
+    upstream = make_playlist(rng, [rng.choice(titles) for _ in range(count)])[1:]
+
+    old, old_time = timed(lambda: old_update_playlist(old_pairs(local, 1), old_pairs(upstream)))
+
+    def current():
+        today = datetime.now().date()
+        return tvpass.update_playlist(tvpass.read_entries(local, today, start=1),
+                                      tvpass.read_entries(upstream, today))
+
+    tvpass._event_month_day.cache_clear()
+    new, new_time = timed(current)
+    _, warm_time = timed(current)
+
+    if old != new:
+        first = next(i for i, (a, b) in enumerate(zip(old, new)) if a != b) if len(old) == len(new) else None
+        print(f"❌ outputs differ ({len(old)} vs {len(new)} entries, first difference at {first})")
+    print(f"{count} local + {count} upstream entries → {len(new)} kept")
+    print(f"old   {old_time * 1000:8.1f} ms")
+    print(f"new   {new_time * 1000:8.1f} ms (cold cache)  x{old_time / max(new_time, 1e-9):.1f}")
+    print(f"new   {warm_time * 1000:8.1f} ms (warm cache)  x{old_time / max(warm_time, 1e-9):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Benchmarks vod_search.VodIndex on a synthetic VOD catalog.
+
+    python benchmarks/bench_vod_search.py [titles]
+
+Generates a catalog shaped like DrewLiveVOD.json (100k titles by default: a
+mix of movies and series episodes with plots and genres), then reports build
+time, saved size, load time and per-query latency, and checks a sample of
+queries against a brute-force scan using the same matching rules, and their
+top 20 against a full ranking.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_trace import percentile  # noqa: E402
+from vod_search import GENRES, MAX_EXPANSIONS, MIN_PREFIX, VodIndex, parse_episode, tokenize  # noqa: E402
+
+LETTERS = "etaoinshrdlcumwfgypbvkjxqz"
+
+
+def word(rng):
+    return "".join(rng.choices(LETTERS, weights=range(26, 0, -1), k=rng.randint(2, 9)))
+
+
+def make_catalog(rng, count):
+    # Zipf-distributed words, so a few ("the", "of") sit in most plots.
+    vocabulary = [word(rng) for _ in range(50000)]
+    cum_weights = list(accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    sentence = lambda n: " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=n))  # noqa: E731
+    items = []
+    while len(items) < count:
+        genres = rng.sample(sorted(GENRES), rng.randint(1, 4))
+        if rng.random() < 0.8:
+            title = sentence(rng.randint(1, 4)).title()
+            items.append({"name": title, "group_title": "DrewLive - VOD", "plot": sentence(rng.randint(15, 40)),
+                          "genre_ids": genres, "folder_url": f"http://example.test/movies/{len(items)}.mkv"})
+        else:
+            series = sentence(rng.randint(1, 3)).title()
+            plot = sentence(rng.randint(15, 40))
+            for season in range(1, rng.randint(2, 6)):
+                for episode in range(1, rng.randint(6, 24)):
+                    items.append({"name": f"{series} - S{season:02d}E{episode:02d} - {sentence(3).title()}",
+                                  "group_title": f"DrewLive Shows - {series}", "plot": plot, "genre_ids": genres,
+                                  "folder_url": f"http://example.test/tv/{len(items)}.mkv"})
+    return items[:count]
+
+
+def brute_force(index, query):
+    """The set of title ids `query` should match, by scanning every title's words."""
+    season, episode, text = parse_episode(query)
+    words = tokenize(text)
+    docs_words = {}
+    for token, tiers in index.postings.items():
+        for _, docs in tiers:
+            for doc in docs:
+                docs_words.setdefault(doc, set()).add(token)
+    vocabulary = index.vocabulary
+    allowed = []
+    for w in words:
+        prefixed = [v for v in vocabulary if v.startswith(w) and v != w][:MAX_EXPANSIONS - (w in index.postings)]
+        allowed.append(({w} | set(prefixed)) if len(w) >= MIN_PREFIX else {w})
+    result = set()
+    for doc in range(len(index)):
+        if season >= 0 and (index.season[doc] != season or (episode >= 0 and index.episode[doc] != episode)):
+            continue
+        if all(docs_words.get(doc, set()) & a for a in allowed) and (words or season >= 0):
+            result.add(doc)
+    return result
+
+
+def make_queries(rng, items, count):
+    queries = []
+    for _ in range(count):
+        item = rng.choice(items)
+        words = tokenize(item["name"])
+        kind = rng.random()
+        if kind < 0.3:
+            queries.append(" ".join(rng.sample(words, min(2, len(words)))))
+        elif kind < 0.6:
+            queries.append(rng.choice(words)[:rng.randint(2, 5)])
+        elif kind < 0.8 and " - S" in item["name"]:
+            queries.append(item["name"].split(" - ")[0] + " " + item["name"].split(" - ")[1])
+        else:
+            queries.append(rng.choice(tokenize(item["plot"])) + " " + rng.choice(words))
+    return queries
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(7)
+    items = make_catalog(rng, count)
+    index, build_time = timed(lambda: VodIndex.build(items))
+    print(f"{len(items)} titles, {len(index.vocabulary)} words, built in {build_time:.2f} s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vod.idx")
+        _, save_time = timed(lambda: index.save(path))
+        loaded, load_time = timed(lambda: VodIndex.load(path))
+        print(f"saved {os.path.getsize(path) / 1_048_576:.1f} MiB in {save_time:.2f} s, loaded in {load_time:.2f} s")
+
+    queries = make_queries(rng, items, 2000)
+    latencies = []
+    for query in queries:
+        _, elapsed = timed(lambda: loaded.search(query))
+        latencies.append(elapsed * 1000)
+    print(f"{len(queries)} queries: p50 {percentile(latencies, 50):.3f} ms  p95 {percentile(latencies, 95):.3f} ms  "
+          f"p99 {percentile(latencies, 99):.3f} ms  max {max(latencies):.2f} ms")
+
+    mismatches = 0
+    for query in queries[:25]:
+        expected = brute_force(loaded, query)
+        got = {doc for _, doc in loaded.search(query, limit=len(loaded))}
+        if got != expected:
+            mismatches += 1
+            print(f"❌ {query!r}: index {len(got)} titles, scan {len(expected)}")
+    print(f"checked 25 queries against a full scan: {mismatches} mismatches")
+
+    # A full-length limit always scores every match, so it is the reference for the shortcuts small limits take.
+    mismatches = sum(loaded.search(query) != loaded.search(query, limit=len(loaded))[:20] for query in queries[:200])
+    print(f"checked the top 20 of 200 queries against a full ranking: {mismatches} mismatches")
+
+
+if __name__ == "__main__":
+    main()
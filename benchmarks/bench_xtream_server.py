@@ -0,0 +1,129 @@
+"""Load-tests xtream_server.py and reports the requests per second it sustains.
+
+    python benchmarks/bench_xtream_server.py [seconds] [connections]
+
+Starts the server on the repo's catalogs in its own process (one event loop,
+so one core), then keeps `connections` requests in flight for `seconds`
+(10 s, 64 by default) over a mix of what Xtream clients send: category and
+stream lists, per-series info, ETag revalidations and stream redirects.
+Throughput is reported both against wall time and against the CPU time the
+server process used, since the load generator shares the machine.
+"""
+import asyncio
+import os
+import random
+import resource
+import signal
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from page_trace import percentile  # noqa: E402
+
+PORT = 4099
+BASE = f"http://127.0.0.1:{PORT}"
+API = f"{BASE}/player_api.php?username=bench&password=bench"
+
+
+async def wait_ready(session, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(API) as resp:
+                if resp.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def request_mix(session):
+    """Weighted (kind, url, headers) choices built from the live catalog."""
+    async def get(action, **params):
+        query = "".join(f"&{k}={v}" for k, v in params.items())
+        async with session.get(f"{API}&action={action}{query}") as resp:
+            return await resp.json(), resp.headers.get("ETag")
+
+    series, _ = await get("get_series")
+    vods, vod_etag = await get("get_vod_streams")
+    categories, _ = await get("get_vod_categories")
+    gzip = {"Accept-Encoding": "gzip"}
+    mix = [(10, "list", f"{API}&action={action}", gzip)
+           for action in ("get_live_categories", "get_vod_categories", "get_series_categories")]
+    mix += [(10, "streams", f"{API}&action={action}", gzip)
+            for action in ("get_live_streams", "get_vod_streams", "get_series")]
+    mix += [(5, "category", f"{API}&action=get_vod_streams&category_id={c['category_id']}", gzip) for c in categories]
+    mix += [(30 / max(len(series), 1), "series_info", f"{API}&action=get_series_info&series_id={s['series_id']}", gzip)
+            for s in series]
+    mix.append((20, "revalidate", f"{API}&action=get_vod_streams", {**gzip, "If-None-Match": vod_etag}))
+    mix += [(10 / max(len(vods), 1), "redirect", f"{BASE}/movie/bench/bench/{v['stream_id']}.mp4", {})
+            for v in vods]
+    return mix
+
+
+async def worker(session, mix, deadline, rng, latencies, statuses, sizes):
+    weights = [w for w, *_ in mix]
+    while time.monotonic() < deadline:
+        _, kind, url, headers = rng.choices(mix, weights)[0]
+        start = time.perf_counter()
+        async with session.get(url, headers=headers, allow_redirects=False) as resp:
+            body = await resp.read()
+        latencies[kind].append((time.perf_counter() - start) * 1000)
+        statuses[resp.status] += 1
+        sizes[kind] += len(body)
+
+
+async def load(seconds, connections):
+    async with aiohttp.ClientSession() as session:
+        await wait_ready(session)
+        mix = await request_mix(session)
+    # Bodies stay gzipped, so the load generator does not spend its CPU share inflating them.
+    connector = aiohttp.TCPConnector(limit=connections)
+    async with aiohttp.ClientSession(connector=connector, auto_decompress=False) as session:
+        latencies, statuses, sizes = {kind: [] for _, kind, *_ in mix}, Counter(), Counter()
+        rng = random.Random(1)
+        start = time.perf_counter()
+        deadline = time.monotonic() + seconds
+        await asyncio.gather(*(worker(session, mix, deadline, rng, latencies, statuses, sizes)
+                               for _ in range(connections)))
+        return time.perf_counter() - start, latencies, statuses, sizes
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    env = dict(os.environ, XTREAM_USERNAME="bench", XTREAM_PASSWORD="bench", XTREAM_PORT=str(PORT))
+    server = subprocess.Popen([sys.executable, "xtream_server.py", "--host", "127.0.0.1", "--no-watch"],
+                              cwd=ROOT, env=env)
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    try:
+        elapsed, latencies, statuses, sizes = asyncio.run(load(seconds, connections))
+    finally:
+        server.send_signal(signal.SIGINT)
+        server.wait(timeout=30)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Includes the catalog load at startup; small next to the load phase.
+    server_cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+    total = sum(len(v) for v in latencies.values())
+    every = [ms for values in latencies.values() for ms in values]
+    print(f"{total} requests in {elapsed:.1f} s over {connections} connections on {os.cpu_count()} CPU(s); "
+          f"statuses {dict(statuses)}")
+    print(f"{total / elapsed:8.0f} req/s wall clock (server and load generator share the CPUs)")
+    print(f"{total / server_cpu:8.0f} req/s per server CPU-second ({server_cpu:.1f} s of server CPU)")
+    print(f"latency p50 {percentile(every, 50):.2f} ms  p99 {percentile(every, 99):.2f} ms")
+    for kind, values in latencies.items():
+        if values:
+            print(f"  {kind:<12} {len(values):7d} req  p50 {percentile(values, 50):6.2f} ms  "
+                  f"p99 {percentile(values, 99):6.2f} ms  {sizes[kind] / len(values) / 1024:7.1f} KiB/resp")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from har_replay import har_session
+from profiles import open_profile
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Connect to an already running browser server (`playwright run-server`) instead
+# of launching one locally when this is set, e.g. ws://127.0.0.1:3000/
+WS_ENDPOINT = os.environ.get("PLAYWRIGHT_WS_ENDPOINT")
+MAX_CONTEXTS = int(os.environ.get("BROWSER_MAX_CONTEXTS", "8"))
+RECYCLE_AFTER_PAGES = int(os.environ.get("BROWSER_RECYCLE_AFTER_PAGES", "250"))
+# 0 disables the memory cap. Measured with psutil, or /proc on Linux, and only
+# for a locally launched browser.
+MAX_MEMORY_MB = int(os.environ.get("BROWSER_MAX_MEMORY_MB", "2048"))
+# Walking the process tree is not free, so memory is sampled at most this often.
+MEMORY_CHECK_SECONDS = 10
+
+
+class _BrowserSlot:
+    def __init__(self, browser):
+        self.browser = browser
+        self.active_contexts = 0
+        self.pages_opened = 0
+        self.retired = False
+
+
+def _proc_descendants_rss():
+    """RSS in bytes of every descendant of this process, read from /proc (Linux)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(entry)
+    total, pending = 0, list(children.get(os.getpid(), []))
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(int(pid), []))
+        try:
+            with open(f"/proc/{pid}/statm", "r") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+class PooledContext:
+    """What BrowserPool.context() yields: a browser context that can move browsers.
+
+    Scrapers keep one context for a whole run, so recycling between contexts
+    alone would never fire. Once the browser is due for recycling, the next
+    new_page() opens its page in a fresh context on the replacement browser
+    (same options, blocker and `on` listeners), and the old context closes as
+    soon as its last page does. Everything else goes to the current context.
+    """
+
+    def __init__(self, pool, opener, rotate):
+        self._pool = pool
+        self._opener = opener
+        self._rotate_enabled = rotate
+        self._listeners = []
+        self._lock = asyncio.Lock()
+        self._open_pages = {}
+        self._retiring = []
+        self._closing = []
+        self._slot = None
+        self._context = None
+
+    async def _start(self):
+        self._slot, self._context = await self._opener.open()
+        self._open_pages[self._context] = 0
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+    def on(self, event, handler):
+        self._listeners.append((event, handler))
+        self._context.on(event, handler)
+
+    async def new_page(self):
+        if self._rotate_enabled and self._pool._rotation_due(self._slot):
+            async with self._lock:
+                if self._pool._rotation_due(self._slot):
+                    await self._rotate()
+        context = self._context
+        page = await context.new_page()
+        self._open_pages[context] += 1
+        page.on("close", lambda _page: self._page_closed(context))
+        return page
+
+    async def _rotate(self):
+        old_slot, old_context = self._slot, self._context
+        # The replacement is seeded from the profile, so it must see the latest cookies.
+        await self._opener.save_state(old_context)
+        await self._start()
+        for event, handler in self._listeners:
+            self._context.on(event, handler)
+        if self._open_pages[old_context]:
+            self._retiring.append((old_slot, old_context))
+        else:
+            await self._close_one(old_slot, old_context)
+
+    def _page_closed(self, context):
+        if context not in self._open_pages:
+            return
+        self._open_pages[context] -= 1
+        for entry in self._retiring:
+            if entry[1] is context and self._open_pages[context] == 0:
+                self._retiring.remove(entry)
+                self._closing.append(asyncio.ensure_future(self._close_one(*entry)))
+                return
+
+    async def _close_one(self, slot, context):
+        self._open_pages.pop(context, None)
+        await self._opener.close(slot, context)
+
+    async def aclose(self):
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        for slot, context in self._retiring + [(self._slot, self._context)]:
+            if context is not None:
+                await self._close_one(slot, context)
+        self._retiring = []
+
+
+class _ContextOpener:
+    """Opens and closes the raw contexts behind one PooledContext."""
+
+    def __init__(self, pool, blocker, profile, har, context_kwargs):
+        self.pool = pool
+        self.blocker = blocker
+        self.profile = profile
+        self.har = har
+        self.context_kwargs = context_kwargs
+
+    async def open(self):
+        kwargs = dict(self.context_kwargs)
+        if self.profile is not None and "storage_state" not in kwargs:
+            kwargs["storage_state"] = self.profile.storage_state()
+        slot = await self.pool._acquire_slot()
+        try:
+            context = await slot.browser.new_context(**kwargs)
+            context.on("page", lambda _page: self.pool._count_page(slot))
+            await self.pool._attach(context, self.blocker, self.har)
+        except BaseException:
+            await self.pool._release_slot(slot)
+            raise
+        return slot, context
+
+    async def save_state(self, context):
+        if self.profile is not None:
+            await self.profile.save_state(context)
+
+    async def close(self, slot, context):
+        try:
+            await self.save_state(context)
+            try:
+                await context.close()
+            except Exception as e:
+                print(f"⚠️ Failed to close context: {e}")
+        finally:
+            await self.pool._release_slot(slot)
+
+
+class BrowserPool:
+    """One long-lived browser handing out fresh contexts to every scraper.
+
+    Limits how many contexts are open at once and swaps in a new browser after
+    `recycle_after` pages (or when memory use goes over `max_memory_mb`). The
+    check runs whenever a context or a page is opened, so long-lived contexts
+    move over too (see PooledContext). A retired browser is closed once its
+    last context is done.
+    """
+
+    def __init__(self, browser_type="firefox", max_contexts=MAX_CONTEXTS,
+                 recycle_after=RECYCLE_AFTER_PAGES, max_memory_mb=MAX_MEMORY_MB,
+                 ws_endpoint=WS_ENDPOINT, **launch_kwargs):
+        self.browser_type = browser_type
+        self.max_contexts = max_contexts
+        self.recycle_after = recycle_after
+        self.max_memory_mb = max_memory_mb
+        self.ws_endpoint = ws_endpoint
+        self.launch_kwargs = {"headless": True, **launch_kwargs}
+        self.pages_opened = 0
+        self.browsers_launched = 0
+        self._playwright = None
+        self._slot = None
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_contexts)
+        self._next_memory_check = 0.0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self):
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+    async def close(self):
+        if self._slot:
+            await self._close_browser(self._slot)
+            self._slot = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _launch(self):
+        launcher = getattr(self._playwright, self.browser_type)
+        if self.ws_endpoint:
+            print(f"🔌 Connecting to shared {self.browser_type} at {self.ws_endpoint}")
+            browser = await launcher.connect(self.ws_endpoint)
+        else:
+            print(f"🚀 Launching shared {self.browser_type} browser")
+            browser = await launcher.launch(**self.launch_kwargs)
+        self.browsers_launched += 1
+        return _BrowserSlot(browser)
+
+    async def _close_browser(self, slot):
+        try:
+            await slot.browser.close()
+        except Exception as e:
+            print(f"⚠️ Failed to close browser cleanly: {e}")
+
+    def _memory_mb(self):
+        if self.ws_endpoint:
+            return 0
+        if psutil is not None:
+            total = 0
+            for child in psutil.Process().children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    continue
+        elif os.path.isdir("/proc"):
+            total = _proc_descendants_rss()
+        else:
+            return 0
+        return total / (1024 * 1024)
+
+    def _should_recycle(self, slot):
+        if self.recycle_after and slot.pages_opened >= self.recycle_after:
+            print(f"♻️ Recycling {self.browser_type} after {slot.pages_opened} pages")
+            return True
+        if self.max_memory_mb and time.monotonic() >= self._next_memory_check:
+            self._next_memory_check = time.monotonic() + MEMORY_CHECK_SECONDS
+            if self._memory_mb() > self.max_memory_mb:
+                print(f"♻️ Recycling {self.browser_type}: memory above {self.max_memory_mb} MB")
+                return True
+        return False
+
+    def _rotation_due(self, slot):
+        """True once `slot`'s browser should take no new pages; retires it on the first call."""
+        if not slot.retired and self._should_recycle(slot):
+            slot.retired = True
+        return slot.retired
+
+    async def _acquire_slot(self):
+        async with self._lock:
+            if self._playwright is None:
+                await self.start()
+            if self._slot and self._rotation_due(self._slot):
+                if self._slot.active_contexts == 0:
+                    await self._close_browser(self._slot)
+                self._slot = None
+            if self._slot is None or not self._slot.browser.is_connected():
+                self._slot = await self._launch()
+            self._slot.active_contexts += 1
+            return self._slot
+
+    async def _release_slot(self, slot):
+        async with self._lock:
+            slot.active_contexts -= 1
+            if slot.retired and slot.active_contexts == 0:
+                await self._close_browser(slot)
+
+    def _count_page(self, slot):
+        slot.pages_opened += 1
+        self.pages_opened += 1
+
+    @asynccontextmanager
+    async def context(self, blocker=None, profile=None, har=None, **context_kwargs):
+        """Yields a fresh browser context; it is closed when the block exits.
+
+        `blocker` is an optional request_blocker.RequestBlocker routed on the
+        whole context, so popups and new tabs are covered too.
+
+        `profile` names a per-site profile (see profiles.py). When profiles are
+        enabled the context is seeded from the site's saved cookies and
+        localStorage and writes them back when it closes; it still runs on the
+        shared browser, so profiles never add browser processes.
+
+        `har` names a HAR fixture (see har_replay.py); it only has an effect
+        when HAR_MODE is set, recording or replaying the context.
+        """
+        profile = open_profile(profile)
+        har = har_session(har) if isinstance(har, str) else har
+        if har is not None:
+            context_kwargs = {**har.context_kwargs(), **context_kwargs}
+        opener = _ContextOpener(self, blocker, profile, har, context_kwargs)
+        # A HAR fixture belongs to exactly one context, so those never rotate.
+        pooled = PooledContext(self, opener, rotate=har is None)
+        async with self._semaphore:
+            await pooled._start()
+            try:
+                yield pooled
+            finally:
+                await pooled.aclose()
+                if har is not None:
+                    har.finish()
+
+    async def _attach(self, context, blocker, har):
+        # Handlers run newest first, so the blocker goes on last and decides
+        # before the HAR replayer is asked to serve anything.
+        if har is not None:
+            await har.attach(context)
+        if blocker is not None:
+            await blocker.attach(context)
+
+
+@asynccontextmanager
+async def shared_or_new(pool, browser_type="firefox"):
+    """Uses the caller's pool when one is passed, otherwise owns a new one."""
+    if pool is not None:
+        yield pool
+        return
+    async with BrowserPool(browser_type) as new_pool:
+        yield new_pool
@@ -6,6 +6,8 @@ import time
 from xml.etree import ElementTree as ET
 from io import BytesIO
 
+from local_playlists import read_local_playlist
+
 epg_sources = [
     "https://raw.githubusercontent.com/matthuisman/i.mjh.nz/refs/heads/master/Plex/all.xml",
     "https://raw.githubusercontent.com/matthuisman/i.mjh.nz/refs/heads/master/PlutoTV/all.xml",
@@ -56,11 +58,17 @@ def fix_xml_issues(xml_content):
     return xml_content
 
 
-def fetch_tvg_ids_from_playlist(url):
+def fetch_tvg_ids_from_playlist(url, local_files=()):
+    """tvg-ids in the playlist at `url`, read locally when it was regenerated in this run."""
     try:
-        r = requests.get(url, timeout=30)
-        r.raise_for_status()
-        ids = set(re.findall(r'tvg-id="([^"]+)"', r.text))
+        lines = read_local_playlist(url, local_files)
+        if lines is not None:
+            text = "\n".join(lines)
+        else:
+            r = requests.get(url, timeout=30)
+            r.raise_for_status()
+            text = r.text
+        ids = set(re.findall(r'tvg-id="([^"]+)"', text))
         print(f"✅ Loaded {len(ids)} tvg-ids from playlist")
         return ids
     except Exception as e:
@@ -98,8 +106,8 @@ def stream_parse_epg(xml_content, valid_tvg_ids, root):
     return total_items, kept_channels
 
 
-def merge_and_filter_epg(epg_sources, playlist_url, output_file):
-    valid_tvg_ids = fetch_tvg_ids_from_playlist(playlist_url)
+def merge_and_filter_epg(epg_sources, playlist_url, output_file, local_files=()):
+    valid_tvg_ids = fetch_tvg_ids_from_playlist(playlist_url, local_files)
     root = ET.Element("tv")
     cumulative_kept = 0
     cumulative_total = 0
@@ -139,5 +147,9 @@ def merge_and_filter_epg(epg_sources, playlist_url, output_file):
     print(f"📈 Total items kept: {cumulative_kept}")
 
 
+def main(local_files=()):
+    merge_and_filter_epg(epg_sources, playlist_url, output_filename, local_files)
+
+
 if __name__ == "__main__":
-    merge_and_filter_epg(epg_sources, playlist_url, output_filename)
+    main()
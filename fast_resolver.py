@@ -0,0 +1,147 @@
+import asyncio
+import html
+import json
+import re
+import urllib.parse
+from collections import Counter
+from urllib.parse import urljoin
+
+import aiohttp
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:143.0) Gecko/20100101 Firefox/143.0"
+# Same shape as rox.py's M3U8_REGEX, plus the JSON-escaped form (https:\/\/...).
+M3U8_REGEX = re.compile(r"https?:(?://|\\/\\/)[^\s\"'<>`]+?\.m3u8(?:\?[^\s\"'<>`]*)?")
+PING_REGEX = re.compile(r"https?:(?://|\\/\\/)[^\s\"'<>`]+?ping\.gif\?[^\s\"'<>`]*mu=[^\s\"'<>`]+")
+IFRAME_REGEX = re.compile(r"<iframe[^>]+src=[\"']([^\"']+)[\"']", re.IGNORECASE)
+MAX_IFRAME_DEPTH = 2
+FETCH_TIMEOUT = 10
+
+
+def decode_stream_url(url):
+    """Unwraps JSON escaping, HTML entities and ping.gif?mu= wrappers."""
+    url = html.unescape(url.replace("\\/", "/"))
+    if "ping.gif" in url and "mu=" in url:
+        qs = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
+        mu = qs.get("mu", [None])[0]
+        if mu:
+            return urllib.parse.unquote(mu)
+    return url if ".m3u8" in url else None
+
+
+def extract_stream_urls(text):
+    """Finds stream URLs in HTML, inline scripts or JSON; ping.gif wrappers come first."""
+    found = []
+    pings = list(PING_REGEX.finditer(text))
+    direct = [m for m in M3U8_REGEX.finditer(text) if not any(p.start() <= m.start() < p.end() for p in pings)]
+    for match in pings + direct:
+        url = decode_stream_url(match.group(0))
+        if url and url not in found:
+            found.append(url)
+    if not found and text.lstrip().startswith(("{", "[")):
+        try:
+            found = _urls_from_json(json.loads(text))
+        except ValueError:
+            pass
+    return found
+
+
+def _urls_from_json(obj):
+    found = []
+    if isinstance(obj, dict):
+        obj = list(obj.values())
+    if isinstance(obj, list):
+        for item in obj:
+            for url in _urls_from_json(item):
+                if url not in found:
+                    found.append(url)
+    elif isinstance(obj, str):
+        url = decode_stream_url(obj)
+        if url and url.startswith("http"):
+            found.append(url)
+    return found
+
+
+class TierStats:
+    """Counts which tier resolved each page, so we learn which sites need a browser."""
+
+    def __init__(self, name):
+        self.name = name
+        self.counts = Counter()
+
+    def record(self, tier):
+        self.counts[tier] += 1
+
+    def print_report(self):
+        total = sum(self.counts.values())
+        if not total:
+            return
+        print(f"📊 {self.name} resolver tiers ({total} pages):")
+        for tier in ("http", "browser", "miss"):
+            count = self.counts.get(tier, 0)
+            print(f"   {tier:<8} {count:>4}  ({count / total:.0%})")
+
+
+async def fetch_text(session, url, referer=None):
+    headers = {"User-Agent": USER_AGENT}
+    if referer:
+        headers["Referer"] = referer
+    try:
+        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT)) as resp:
+            if resp.status != 200:
+                return None
+            return await resp.text(errors="ignore")
+    except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError):
+        return None
+
+
+async def resolve_without_browser(session, page_url, referer=None, depth=MAX_IFRAME_DEPTH):
+    """Plain HTTP tier: scans the page, then follows iframe src up to `depth` levels."""
+    text = await fetch_text(session, page_url, referer)
+    if not text:
+        return []
+    urls = extract_stream_urls(text)
+    if urls or depth <= 0:
+        return urls
+    for src in IFRAME_REGEX.findall(text):
+        src = html.unescape(src)
+        if src.startswith(("about:", "javascript:")):
+            continue
+        urls = await resolve_without_browser(session, urljoin(page_url, src), page_url, depth - 1)
+        if urls:
+            return urls
+    return []
+
+
+async def first_reachable(session, urls, referer=None):
+    """Returns the first candidate answering 200, checked concurrently."""
+    async def check(url):
+        headers = {"User-Agent": USER_AGENT}
+        if referer:
+            headers["Referer"] = referer
+            headers["Origin"] = referer.rstrip("/")
+        try:
+            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT)) as resp:
+                return resp.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+
+    results = await asyncio.gather(*(check(url) for url in urls))
+    return next((url for url, ok in zip(urls, results) if ok), None)
+
+
+async def resolve_tiered(session, page_url, browser_resolve, stats, referer=None, pick=None):
+    """Tries the HTTP tier first and only falls back to `browser_resolve()` when it misses.
+
+    `pick(urls)` turns the HTTP candidates into the caller's result, validating
+    them on the way; a falsy result counts as a miss for that tier.
+    """
+    urls = await resolve_without_browser(session, page_url, referer)
+    result = None
+    if urls:
+        result = await pick(urls) if pick else urls
+    if result:
+        stats.record("http")
+        return result
+    result = await browser_resolve()
+    stats.record("browser" if result else "miss")
+    return result
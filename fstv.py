@@ -1,9 +1,16 @@
+import os
 import re
 import sys
+import json
 import asyncio
 import random
-from playwright.async_api import async_playwright
+from contextlib import AsyncExitStack
+from urllib.parse import urlsplit
 from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from browser_pool import shared_or_new
+from request_blocker import DEFAULT_BLOCKED_PATTERNS, RequestBlocker
+from page_trace import Tracer
+from matcher import KeywordMatcher
 
 # --- Helper to print status/errors to Standard Error (stderr) ---
 def err_print(*args, **kwargs):
@@ -136,6 +143,10 @@ MIRRORS = [
 ]
 
 MAX_RETRIES = 3
+# The mirror that won the last race is opened first and the others only join
+# after this many seconds (or as soon as it fails).
+MIRROR_STATE_FILE = os.environ.get("FSTV_MIRROR_STATE", os.path.join(".cache", "fstv_mirror.json"))
+MIRROR_HEAD_START = float(os.environ.get("FSTV_MIRROR_HEAD_START", "5"))
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:141.0) Gecko/20100101 Firefox/141.0"
 BASE_ORIGIN = "https://fstv.space"
 BASE_REFERER = "https://fstv.space/"
@@ -154,159 +165,289 @@ def prettify_name(raw: str) -> str:
 
 
 # CRITICAL FIX: Ad-blocking logic to prevent hangs
-async def block_ads(route):
-    # This logic aborts requests for common ad/tracking/heavy media resources
-    resource_type = route.request.resource_type
-    url = route.request.url.lower()
-
-    if (resource_type in ["image", "media", "font"] or
-        "googlesyndication" in url or
-        "doubleclick" in url or
-        "adservice" in url or
-        "adroll" in url or
-        "pop" in url or
-        "pixel" in url):
-        await route.abort()
-    else:
-        await route.continue_()
-
-
-async def fetch_fstv_channels():
-    scraped_data = []
-    
-    async with async_playwright() as p:
-        browser = None
+# Aborts common ad/tracking/heavy media resources. On top of the shared
+# blocklists the mirrors need their popunder and tracking-pixel requests gone;
+# those rules match a host or a whole path segment, since the blocker covers
+# every page in the context and a bare "pop"/"pixel" would also hit pages like
+# /popular or a PixelSport channel.
+POPUP_AND_PIXEL_PATTERNS = (
+    r"^[a-z]+://[^/?#]*(?:popunder|popup|popads|popcash)[^/?#]*/",
+    r"^[a-z]+://(?:[^/?#]*\.)?pixel\.",
+    r"/(?:pop(?:up|under)s?|pixel)(?:\.(?:js|gif|png|php))?(?:[/?#]|$)",
+)
+BLOCKER = RequestBlocker(blocked_patterns=DEFAULT_BLOCKED_PATTERNS + POPUP_AND_PIXEL_PATTERNS)
+TRACER = Tracer("FSTV", blocker=BLOCKER)
+
+# Every channel is clicked on one of these tabs, so a timeout only reloads the
+# tab it happened on. FSTV_TABS=1 walks the list one channel at a time.
+TAB_POOL_SIZE = int(os.environ.get("FSTV_TABS", "4"))
+# The regex pattern to find the stream URL
+M3U8_PATTERN = re.compile(r'\.m3u8\?auth_key=')
+
+
+CHANNEL_MATCHER = KeywordMatcher(
+    ((channel_data.get("keywords", []), channel_data) for channel_data in CHANNEL_MAPPING.values()),
+    default={},
+)
+
+
+def map_channel(raw_name, data_logo):
+    """Map channel info from local dictionary."""
+    mapped_info = CHANNEL_MATCHER.match(normalize_channel_name(raw_name))
+    return {
+        "logo": mapped_info.get("logo", data_logo),
+        "name": mapped_info.get("name", prettify_name(raw_name)),
+        "tv_id": mapped_info.get("tv_id", ""),
+        "group": mapped_info.get("group", "FSTV"),
+    }
+
+
+async def close_popup(page):
+    # Our own tabs come from context.new_page() and have no opener.
+    try:
+        if await page.opener():
+            await page.close()
+    except Exception:
+        pass
+
+
+async def load_mirror(page, url, timeout=30000):
+    await page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+    await page.wait_for_selector(".item-channel", timeout=30000)
+
+
+async def collect_channels(page):
+    """Reads the channel list once; returns (index, raw_name, info) per titled channel and the element count."""
+    all_elements = await page.query_selector_all(".item-channel")
+    channels = []
+    for index, element in enumerate(all_elements):
+        raw_name = await element.get_attribute("title")
+        if raw_name:
+            channels.append((index, raw_name, map_channel(raw_name, await element.get_attribute("data-logo"))))
+    return channels, len(all_elements)
+
+
+async def find_channel_element(page, index, raw_name):
+    all_elements = await page.query_selector_all(".item-channel")
+    if index < len(all_elements) and await all_elements[index].get_attribute("title") == raw_name:
+        return all_elements[index]
+    # The list changed since it was collected; look the channel up by title instead.
+    for element in all_elements:
+        if await element.get_attribute("title") == raw_name:
+            return element
+    return None
+
+
+async def capture_channel(page, url, index, raw_name, name, total):
+    """Clicks one channel and captures its stream URL; retries only ever reload this tab."""
+    with TRACER.start(page, url, label=name) as trace:
+        for attempt in range(1, MAX_RETRIES + 1):
+            err_print(f"👆 Clicking {name} ({index+1}/{total}) [Attempt {attempt}]...")
+            if attempt > 1:
+                trace.retries += 1
+
+            try:
+                element = await find_channel_element(page, index, raw_name)
+                if element is None:
+                    err_print(f"❌ Failed to re-find {name} after reload.")
+                    return None
+
+                # Use expect_request to wait for the network call to be triggered by the click
+                with trace.phase("click"):
+                    async with page.expect_request(M3U8_PATTERN, timeout=15000) as request_info:
+                        await element.click(force=True, timeout=10000)
+
+                    request = await request_info.value
+                trace.outcome = "ok"
+                return request.url
+
+            except PlaywrightTimeoutError:
+                err_print(f"⚠️ Attempt {attempt} timed out waiting for stream URL for {name}")
+                if attempt == MAX_RETRIES:
+                    err_print(f"❌ Giving up on {name} after {MAX_RETRIES} attempts.")
+                    return None
+                # After a failed click, the internal iframe state is often broken, so
+                # reload this tab (and only this tab) before the next attempt.
+                err_print(f"🔄 Reloading tab to reset context before next attempt...")
+                try:
+                    with trace.phase("navigation"):
+                        await load_mirror(page, url)
+                except Exception as e:
+                    err_print(f"❌ Tab reload failed for {name}: {e}")
+                    trace.outcome = "error"
+                    return None
+
+            except Exception as e:
+                # Catch unexpected errors, including context-related issues
+                err_print(f"⚠️ Attempt {attempt} failed due to unexpected error for {name}: {e}")
+                await asyncio.sleep(random.uniform(1, 2))
+
+        return None
+
+
+async def resolve_channels(context, first_page, url, channels, total, pool_size=TAB_POOL_SIZE):
+    """Resolves every channel on a bounded pool of tabs; results keep the list order."""
+    results = [None] * len(channels)
+    queue = asyncio.Queue()
+    for slot, channel in enumerate(channels):
+        queue.put_nowait((slot, channel))
+
+    async def worker(page):
+        owns_page = page is None
         try:
-            # Use Firefox for stability
-            browser = await p.firefox.launch(headless=True)
-            context = await browser.new_context(
-                user_agent=USER_AGENT,
-                extra_http_headers={"Origin": BASE_ORIGIN, "Referer": BASE_REFERER},
-            )
-            page = await context.new_page()
-
-            # Enable ad-blocking (CRITICAL FIX for hanging)
-            await page.route("**/*", block_ads) 
-            # Auto-close popups
-            context.on("page", lambda popup: asyncio.create_task(popup.close()))
-
-            visited_urls = set()
-            # The regex pattern to find the stream URL
-            m3u8_pattern = re.compile(r'\.m3u8\?auth_key=')
-
-            for url in MIRRORS:
+            if owns_page:
+                page = await context.new_page()
+                await load_mirror(page, url, timeout=120000)
+            while True:
+                try:
+                    slot, (index, raw_name, info) = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results[slot] = await capture_channel(page, url, index, raw_name, info["name"], total)
+        except Exception as e:
+            # A tab that cannot load just drops out; the other tabs drain the queue.
+            err_print(f"⚠️ Tab failed on {url}: {e}")
+        finally:
+            if owns_page and page is not None:
                 try:
-                    err_print(f"\n📡 Starting scrape...")
-                    err_print(f"🌐 Trying {url}...")
-                    
-                    # 1. Navigate to the page
-                    await page.goto(url, timeout=120000, wait_until="domcontentloaded")
-                    await page.wait_for_selector(".item-channel", timeout=30000)
-                    all_elements = await page.query_selector_all(".item-channel")
-                    
-                    if not all_elements:
-                        err_print(f"⚠️ No channels found on {url}")
-                        continue
-                        
-                    # This is the outer loop index, used for re-referencing elements if necessary
-                    i = 0 
-                    while i < len(all_elements):
-                        element = all_elements[i]
-                        
-                        raw_name = await element.get_attribute("title")
-                        if not raw_name:
-                            i += 1
-                            continue
-
-                        # Map channel info from local dictionary
-                        normalized_name = normalize_channel_name(raw_name)
-                        mapped_info = {}
-                        for channel_data in CHANNEL_MAPPING.values():
-                            if any(keyword in normalized_name for keyword in channel_data.get("keywords", [])):
-                                mapped_info = channel_data
-                                break
-
-                        new_name = mapped_info.get("name", prettify_name(raw_name))
-                        tv_id = mapped_info.get("tv_id", "")
-                        logo = mapped_info.get("logo", await element.get_attribute("data-logo"))
-                        group_title = mapped_info.get("group", "FSTV")
-                        last_m3u8_url = None
-
-                        # 2. Click and capture the stream URL using expect_request (ROBUST FIX)
-                        for attempt in range(1, MAX_RETRIES + 1):
-                            err_print(f"👆 Clicking {new_name} ({i+1}/{len(all_elements)}) [Attempt {attempt}]...")
-                            
-                            try:
-                                # Use expect_request to wait for the network call to be triggered by the click
-                                async with page.expect_request(m3u8_pattern, timeout=15000) as request_info:
-                                    # Perform the click that should trigger the request
-                                    await element.click(force=True, timeout=10000) 
-                                
-                                # Get the request object and the URL
-                                request = await request_info.value
-                                last_m3u8_url = request.url
-                                break # Success
-                            
-                            except PlaywrightTimeoutError:
-                                err_print(f"⚠️ Attempt {attempt} timed out waiting for stream URL for {new_name}")
-                                # After a failed click, the internal iframe state is often broken.
-                                # The best approach is often to reload the page to reset the context.
-                                if attempt < MAX_RETRIES:
-                                    err_print(f"🔄 Reloading page to reset context before next attempt...")
-                                    await page.goto(url, timeout=30000, wait_until="domcontentloaded")
-                                    await page.wait_for_selector(".item-channel", timeout=30000)
-                                    # Re-query elements and get the element for the current index 'i'
-                                    all_elements = await page.query_selector_all(".item-channel")
-                                    if i < len(all_elements):
-                                        element = all_elements[i]
-                                    else:
-                                        err_print(f"❌ Failed to re-find element after reload. Breaking loop.")
-                                        break
-                                else:
-                                    err_print(f"❌ Giving up on {new_name} after {MAX_RETRIES} attempts.")
-                                    break
-                            
-                            except Exception as e:
-                                # Catch unexpected errors, including context-related issues
-                                err_print(f"⚠️ Attempt {attempt} failed due to unexpected error for {new_name}: {e}")
-                                await asyncio.sleep(random.uniform(1, 2))
-
-
-                        # 3. Add to final list
-                        if last_m3u8_url and last_m3u8_url not in visited_urls and "false" not in last_m3u8_url.lower():
-                            scraped_data.append({
-                                "url": last_m3u8_url,
-                                "logo": logo,
-                                "name": new_name,
-                                "tv_id": tv_id,
-                                "group": group_title
-                            })
-                            visited_urls.add(last_m3u8_url)
-                            # Print the full last_m3u8_url to stderr for logging
-                            err_print(f"✅ Added {new_name} → {last_m3u8_url}")
-                        else:
-                            err_print(f"❌ Skipping {new_name}: No valid URL captured after {MAX_RETRIES} attempts.")
-                        
-                        i += 1 # Move to the next channel
-
-                    err_print(f"🎉 Processed all channels from {url}")
-                    
-                    # Return immediately on successful mirror processing
-                    return scraped_data
+                    await page.close()
+                except Exception:
+                    pass
+
+    tabs = max(1, min(pool_size, len(channels)))
+    await asyncio.gather(worker(first_page), *(worker(None) for _ in range(tabs - 1)))
+    return results
+
+
+def mirror_site(url):
+    """Profile and HAR fixture name for one mirror, e.g. "fstv-fstv.online"."""
+    return f"fstv-{urlsplit(url).hostname}"
 
-                except Exception as e:
-                    err_print(f"❌ Failed processing mirror {url}: {e}")
-                    await asyncio.sleep(5) # Wait before trying next mirror
-                    continue
 
-            # If the script reaches here, all mirrors failed
-            raise Exception("❌ All mirrors failed after all attempts.")
-            
+async def open_mirror(pool, url, stack, head_start=None):
+    """Loads one mirror in its own context; returns it once the channel list renders."""
+    if head_start is not None:
+        # Give the remembered mirror a head start, unless it fails first.
+        try:
+            await asyncio.wait_for(head_start.wait(), MIRROR_HEAD_START)
+        except asyncio.TimeoutError:
+            pass
+
+    err_print(f"🌐 Trying {url}...")
+    # Firefox for stability; the shared pool closes the context on every exit path
+    # Ad-blocking is routed on the whole context (CRITICAL FIX for hanging)
+    # Mirrors race in parallel, so each keeps its own profile and HAR fixture.
+    site = mirror_site(url)
+    context = await stack.enter_async_context(pool.context(
+        blocker=BLOCKER,
+        profile=site,
+        har=site,
+        user_agent=USER_AGENT,
+        extra_http_headers={"Origin": BASE_ORIGIN, "Referer": BASE_REFERER},
+    ))
+    page = await context.new_page()
+
+    # Auto-close popups
+    context.on("page", lambda popup: asyncio.create_task(close_popup(popup)))
+
+    await load_mirror(page, url, timeout=120000)
+    channels, total = await collect_channels(page)
+    if not channels:
+        raise Exception(f"No channels found on {url}")
+    return context, page, channels, total
+
+
+async def race_mirrors(pool, stacks):
+    """Opens every mirror at once and keeps the first that lists channels; the rest are cancelled."""
+    preferred = load_preferred_mirror()
+    order = [preferred] + [m for m in MIRRORS if m != preferred] if preferred else list(MIRRORS)
+    preferred_failed = asyncio.Event() if preferred else None
+
+    tasks = {}
+    for url in order:
+        head_start = preferred_failed if preferred and url != preferred else None
+        tasks[asyncio.ensure_future(open_mirror(pool, url, stacks[url], head_start))] = url
+
+    winner = None
+    pending = set(tasks)
+    while pending and winner is None:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            url = tasks[task]
+            if task.exception() is not None:
+                err_print(f"❌ Failed processing mirror {url}: {task.exception()}")
+                if url == preferred:
+                    preferred_failed.set()
+            elif winner is None:
+                winner = (url, *task.result())
+
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    return winner
+
+
+def load_preferred_mirror():
+    try:
+        with open(MIRROR_STATE_FILE, "r", encoding="utf-8") as f:
+            mirror = json.load(f).get("mirror")
+    except (OSError, ValueError, AttributeError):
+        return None
+    return mirror if mirror in MIRRORS else None
+
+
+def save_preferred_mirror(url):
+    try:
+        os.makedirs(os.path.dirname(MIRROR_STATE_FILE) or ".", exist_ok=True)
+        with open(MIRROR_STATE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"mirror": url}, f)
+    except OSError as e:
+        err_print(f"⚠️ Could not remember mirror {url}: {e}")
+
+
+async def fetch_fstv_channels(pool=None):
+    scraped_data = []
+    visited_urls = set()
+
+    async with shared_or_new(pool, "firefox") as pool:
+        stacks = {url: AsyncExitStack() for url in MIRRORS}
+        try:
+            err_print(f"\n📡 Starting scrape...")
+            # 1. Race the mirrors; the winner's page already holds the channel list
+            winner = await race_mirrors(pool, stacks)
+            if winner is None:
+                raise Exception("❌ All mirrors failed after all attempts.")
+            url, context, page, channels, total = winner
+            err_print(f"🏁 Using {url}")
+            save_preferred_mirror(url)
+            for mirror, stack in stacks.items():
+                if mirror != url:
+                    await stack.aclose()
+
+            # 2. Click and capture every stream URL, one tab per channel at a time
+            err_print(f"🗂️ Resolving {len(channels)} channels on up to {TAB_POOL_SIZE} tabs...")
+            m3u8_urls = await resolve_channels(context, page, url, channels, total)
+
+            # 3. Add to final list, in the original channel order
+            for (index, raw_name, info), m3u8_url in zip(channels, m3u8_urls):
+                if m3u8_url and m3u8_url not in visited_urls and "false" not in m3u8_url.lower():
+                    scraped_data.append({"url": m3u8_url, **info})
+                    visited_urls.add(m3u8_url)
+                    # Print the full m3u8_url to stderr for logging
+                    err_print(f"✅ Added {info['name']} → {m3u8_url}")
+                else:
+                    err_print(f"❌ Skipping {info['name']}: No valid URL captured after {MAX_RETRIES} attempts.")
+
+            err_print(f"🎉 Processed all channels from {url}")
+            blocked, saved = BLOCKER.totals()
+            err_print(f"🛡️ Blocked {blocked} requests (~{saved / 1_048_576:.1f} MB saved)")
+            await TRACER.flush()
+            # stdout is kept for the playlist, so the summary goes to stderr too.
+            TRACER.print_summary(file=sys.stderr)
         finally:
-            # ESSENTIAL: This ensures the browser always closes
-            if browser:
-                await browser.close()
-    
+            for stack in stacks.values():
+                await stack.aclose()
+
     return scraped_data
 
 
@@ -328,29 +469,34 @@ def build_playlist(channels_data):
     return "".join(lines)
 
 
-if __name__ == "__main__":
-    # --- Output Filename Defined Here ---
-    OUTPUT_FILENAME = "FSTV24.m3u8"
-    # ------------------------------------
-    
+OUTPUT_FILENAME = "FSTV24.m3u8"
+
+
+async def main(pool=None):
+    """Scrapes FSTV into OUTPUT_FILENAME; returns False when nothing was written."""
     try:
-        channels_data = asyncio.run(fetch_fstv_channels())
+        channels_data = await fetch_fstv_channels(pool)
     except Exception as e:
         err_print(f"❌ Scrape failed completely. Check logs for mirror failures: {e}")
-        sys.exit(1)
+        return False
 
     if not channels_data:
         err_print("❌ No channels scraped. Exiting.")
-        sys.exit(1)
+        return False
 
-    # --- NEW: Write to local file instead of sys.stdout ---
     try:
         playlist_content = build_playlist(channels_data)
         with open(OUTPUT_FILENAME, "w", encoding="utf-8") as f:
             f.write(playlist_content)
-        
+
         err_print(f"\n✅ Scrape complete. {len(channels_data)} channels found.")
         err_print(f"💾 Playlist successfully saved to {OUTPUT_FILENAME}")
     except IOError as e:
         err_print(f"❌ ERROR: Could not write playlist to file {OUTPUT_FILENAME}: {e}")
-        sys.exit(1)
\ No newline at end of file
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    if not asyncio.run(main()):
+        sys.exit(1)
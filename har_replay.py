@@ -0,0 +1,171 @@
+import asyncio
+import base64
+import json
+import os
+import random
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit, urlunsplit
+
+# HAR_MODE=record saves every browser context opened with har="<site>" to
+# HAR_DIR/<site>.har; HAR_MODE=replay serves those contexts from the fixture
+# and aborts anything it does not have, so no request reaches the network.
+HAR_MODE = os.environ.get("HAR_MODE")
+HAR_DIR = os.environ.get("HAR_DIR", os.path.join("fixtures", "har"))
+# Milliseconds added to every replayed response, or "recorded" to reuse each
+# entry's recorded timing. HAR_JITTER_MS adds a random 0..N ms on top.
+HAR_LATENCY_MS = os.environ.get("HAR_LATENCY_MS", "0")
+HAR_JITTER_MS = int(os.environ.get("HAR_JITTER_MS", "0"))
+# Hop-by-hop or body-encoding headers that no longer apply to the stored body.
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def har_path(site, directory=None):
+    return os.path.join(directory or HAR_DIR, f"{site}.har")
+
+
+def pages_path(site, directory=None):
+    return os.path.join(directory or HAR_DIR, f"{site}.pages.json")
+
+
+def load_pages(site, directory=None):
+    """Top-level URLs the recorded run navigated to, in order."""
+    with open(pages_path(site, directory), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _without_query(url):
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+
+class HarRecorder:
+    """Lets Playwright write the HAR and keeps a list of top-level navigations."""
+
+    def __init__(self, site, directory=None):
+        self.site = site
+        self.directory = directory or HAR_DIR
+        self.pages = []
+
+    def context_kwargs(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return {"record_har_path": har_path(self.site, self.directory), "record_har_content": "embed"}
+
+    async def attach(self, context):
+        context.on("request", self._on_request)
+
+    def _on_request(self, request):
+        try:
+            if request.is_navigation_request() and request.frame.parent_frame is None:
+                if request.url not in self.pages:
+                    self.pages.append(request.url)
+        except Exception:
+            pass
+
+    def finish(self):
+        with open(pages_path(self.site, self.directory), "w", encoding="utf-8") as f:
+            json.dump(self.pages, f, indent=2)
+        print(f"📼 Recorded {self.site}: {len(self.pages)} pages → {har_path(self.site, self.directory)}")
+
+
+class HarReplayer:
+    """Serves browser requests from a recorded HAR with optional latency.
+
+    Requests match on method and URL; when the exact URL is missing (cache
+    busters, fresh tokens) the same URL without its query string is tried.
+    Repeated requests walk through the recorded responses and then stick to
+    the last one, which is how polling playlists behave.
+    """
+
+    def __init__(self, entries, site="", latency_ms=None, jitter_ms=None, seed=0):
+        self.site = site
+        self.latency_ms = HAR_LATENCY_MS if latency_ms is None else latency_ms
+        self.jitter_ms = HAR_JITTER_MS if jitter_ms is None else jitter_ms
+        self._random = random.Random(seed)
+        self._exact = defaultdict(list)
+        self._loose = defaultdict(list)
+        for entry in entries:
+            request = entry.get("request", {})
+            method = request.get("method", "GET")
+            url = request.get("url", "")
+            if entry.get("response", {}).get("status", 0) <= 0:
+                continue
+            self._exact[(method, url)].append(entry)
+            self._loose[(method, _without_query(url))].append(entry)
+        self._served = Counter()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, site, directory=None, **kwargs):
+        with open(har_path(site, directory), "r", encoding="utf-8") as f:
+            har = json.load(f)
+        return cls(har.get("log", {}).get("entries", []), site=site, **kwargs)
+
+    def context_kwargs(self):
+        return {}
+
+    async def attach(self, context):
+        # Registered before the request blocker, so the blocker still decides
+        # first and falls back to this handler for what it lets through.
+        await context.route("**/*", self.handle_route)
+
+    def lookup(self, method, url):
+        for table, key in ((self._exact, (method, url)), (self._loose, (method, _without_query(url)))):
+            entries = table.get(key)
+            if entries:
+                served = (table is self._exact, key)
+                index = min(self._served[served], len(entries) - 1)
+                self._served[served] += 1
+                return entries[index]
+        return None
+
+    def _delay(self, entry):
+        if self.latency_ms == "recorded":
+            delay = max(entry.get("time", 0), 0)
+        else:
+            delay = float(self.latency_ms or 0)
+        if self.jitter_ms:
+            delay += self._random.uniform(0, self.jitter_ms)
+        return delay / 1000
+
+    async def handle_route(self, route):
+        request = route.request
+        entry = self.lookup(request.method, request.url)
+        try:
+            if entry is None:
+                self.misses += 1
+                await route.abort("internetdisconnected")
+                return
+            self.hits += 1
+            delay = self._delay(entry)
+            if delay:
+                await asyncio.sleep(delay)
+            response = entry["response"]
+            content = response.get("content", {})
+            body = content.get("text", "")
+            body = base64.b64decode(body) if content.get("encoding") == "base64" else body.encode("utf-8")
+            headers = {
+                h["name"]: h["value"] for h in response.get("headers", [])
+                if h["name"].lower() not in DROP_HEADERS
+            }
+            await route.fulfill(status=response["status"], headers=headers, body=body)
+        except Exception:
+            # The page went away while the request was in flight.
+            pass
+
+    def finish(self):
+        total = self.hits + self.misses
+        if total:
+            print(f"📼 Replayed {self.site}: {self.hits}/{total} requests served from the fixture")
+
+
+def har_session(site, mode=None, directory=None):
+    """Returns a recorder or replayer for `site`, or None when HAR_MODE is unset."""
+    mode = mode or HAR_MODE
+    if not site or not mode:
+        return None
+    if mode == "record":
+        return HarRecorder(site, directory)
+    if mode == "replay":
+        return HarReplayer.load(site, directory)
+    raise ValueError(f"Unknown HAR_MODE {mode!r}; expected 'record' or 'replay'")
@@ -0,0 +1,222 @@
+"""Shared HTTP client for the plain-HTTP scrapers.
+
+One keep-alive requests.Session per process, with default timeouts, retries
+with exponential backoff on connection errors and 429/5xx, gzip (plus brotli
+when the brotli package is installed) and a small DNS cache for the session's
+own connections. `fetch_all` and
+`map_concurrent` fan requests out over a thread pool and keep input order.
+
+    import http_client
+    text = http_client.get_text(url)
+    for url, lines, error in http_client.fetch_all(urls): ...
+"""
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+from urllib3.util.retry import Retry
+from urllib3.util.ssl_ import is_ipaddress
+
+try:
+    import brotli  # noqa: F401  (lets urllib3 decode "br")
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "30"))
+RETRIES = int(os.environ.get("HTTP_RETRIES", "3"))
+BACKOFF = float(os.environ.get("HTTP_BACKOFF", "0.5"))
+# Kept-alive connections per host; madtitan checks 50 streams at once.
+POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "64"))
+MAX_WORKERS = int(os.environ.get("HTTP_WORKERS", "16"))
+# Seconds a resolved address is reused; 0 turns the DNS cache off.
+DNS_CACHE_TTL = float(os.environ.get("HTTP_DNS_CACHE_TTL", "300"))
+# Hosts kept in the DNS cache; the least recently used one goes first.
+DNS_CACHE_SIZE = int(os.environ.get("HTTP_DNS_CACHE_SIZE", "256"))
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class DnsCache:
+    """Resolved addresses per host, kept for `ttl` seconds and at most `size` hosts."""
+
+    def __init__(self, ttl=DNS_CACHE_TTL, size=DNS_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def addresses(self, host, port):
+        """IP addresses for `host` in resolver order, or None when it does not resolve."""
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(host)
+            if hit and hit[0] > now:
+                self._entries.move_to_end(host)
+                return hit[1]
+        try:
+            infos = socket.getaddrinfo(host, port, allowed_gai_family(), socket.SOCK_STREAM)
+        except OSError:
+            return None
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self._entries[host] = (now + self.ttl, addresses)
+            self._entries.move_to_end(host)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return addresses
+
+
+_dns_cache = DnsCache()
+
+
+class _CachedDnsConnection:
+    """Connects through _dns_cache, trying each cached address in turn.
+
+    Only the socket address changes; the Host header, SNI and certificate
+    checks still use the hostname. Names that do not resolve fall through to
+    urllib3, which raises its usual error.
+    """
+
+    def _new_conn(self):
+        host = self._dns_host
+        addresses = None if is_ipaddress(host) else _dns_cache.addresses(host, self.port)
+        if not addresses:
+            return super()._new_conn()
+        error = None
+        try:
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (ConnectTimeoutError, NewConnectionError) as e:
+                    error = e
+        finally:
+            self._dns_host = host
+        raise error
+
+
+class CachedDnsHTTPConnection(_CachedDnsConnection, HTTPConnection):
+    pass
+
+
+class CachedDnsHTTPSConnection(_CachedDnsConnection, HTTPSConnection):
+    pass
+
+
+class CachedDnsHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CachedDnsHTTPConnection
+
+
+class CachedDnsHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CachedDnsHTTPSConnection
+
+
+class CachedDnsAdapter(HTTPAdapter):
+    """An HTTPAdapter whose direct connections resolve hosts through the DNS cache.
+
+    Scoped to the sessions that mount it, unlike patching socket.getaddrinfo.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CachedDnsHTTPConnectionPool,
+            "https": CachedDnsHTTPSConnectionPool,
+        }
+
+
+class TimeoutSession(requests.Session):
+    """A Session whose requests default to (CONNECT_TIMEOUT, READ_TIMEOUT)."""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+        return super().request(method, url, **kwargs)
+
+
+def new_session(headers=None, retries=RETRIES, pool_size=POOL_SIZE):
+    session = TimeoutSession()
+    retry = Retry(
+        total=retries,
+        backoff_factor=BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adapter_class = CachedDnsAdapter if DNS_CACHE_TTL > 0 else HTTPAdapter
+    adapter = adapter_class(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING})
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def session():
+    """The process-wide session, shared by every scraper in an orchestrator run."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = new_session()
+    return _session
+
+
+def get(url, **kwargs):
+    return session().get(url, **kwargs)
+
+
+def head(url, **kwargs):
+    kwargs.setdefault("allow_redirects", True)
+    return session().head(url, **kwargs)
+
+
+def get_text(url, **kwargs):
+    r = get(url, **kwargs)
+    r.raise_for_status()
+    return r.text
+
+
+def get_json(url, **kwargs):
+    r = get(url, **kwargs)
+    r.raise_for_status()
+    return r.json()
+
+
+def map_concurrent(fn, items, max_workers=MAX_WORKERS):
+    """[(item, result, error)] for fn(item) over a thread pool, in input order."""
+    items = list(items)
+
+    def call(item):
+        try:
+            return item, fn(item), None
+        except Exception as e:
+            return item, None, e
+
+    if len(items) <= 1:
+        return [call(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(call, items))
+
+
+def fetch_all(urls, fetch=get_text, max_workers=MAX_WORKERS):
+    """Fetches every URL concurrently; [(url, body, error)] in input order."""
+    return map_concurrent(fetch, urls, max_workers)
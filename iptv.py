@@ -3,6 +3,8 @@ import re
 import time
 from datetime import datetime
 
+from local_playlists import read_local_playlist
+
 playlist_urls = [
     "https://raw.githubusercontent.com/Drewski2423/DrewLive/main/DrewAll.m3u8",
     "https://raw.githubusercontent.com/Drewski2423/DrewLive/main/JapanTV.m3u8",
@@ -124,14 +126,18 @@ def write_merged_playlist(all_channels):
     print(f"📊 Total channels merged (including duplicates): {total_channels_written}.")
     print(f"📝 Total lines in output file: {len(final_output_string.splitlines())}.")
 
-if __name__ == "__main__":
+def main(local_files=()):
     print(f"Starting playlist merge at {datetime.now()}...")
     all_channels_list = []
 
     for url in playlist_urls:
-        lines = fetch_playlist(url)
+        lines = read_local_playlist(url, local_files) or fetch_playlist(url)
         if lines:
             parsed_channels = parse_playlist(lines, source_url=url)
             all_channels_list.extend(parsed_channels)
     write_merged_playlist(all_channels_list)
     print(f"Merging complete at {datetime.now()}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
-import requests
 import re
 
+import http_client
+from playlist_index import MAX_MISSED_RUNS, PlaylistIndex
+
 UPSTREAM_URL = "https://web.utako.moe/jp.m3u"
 OUTPUT_FILE = "JapanTV.m3u8"
 FORCED_GROUP_NAME = "JapanTV"
@@ -8,19 +10,7 @@ TVG_HEADER = '#EXTM3U url-tvg="https://epg.freejptv.com/jp.xml,https://animenose
 
 group_regex = re.compile(r'group-title=".*?"')
 
-def get_existing_urls(file_path):
-    urls = set()
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        for i, line in enumerate(lines):
-            if line.startswith("#EXTINF") and i + 1 < len(lines):
-                urls.add(lines[i + 1].strip())
-        return urls
-    except FileNotFoundError:
-        return set()
-
-def clean_and_force_group(m3u_content, existing_urls):
+def clean_and_force_group(m3u_content, index):
     lines = m3u_content.strip().splitlines()
     output_lines = []
     skip_next = False
@@ -37,7 +27,7 @@ def clean_and_force_group(m3u_content, existing_urls):
 
             if i + 1 < len(lines):
                 url_line = lines[i + 1].strip()
-                if url_line not in existing_urls:
+                if url_line not in index:
                     if 'group-title="' in line:
                         line = group_regex.sub(f'group-title="{FORCED_GROUP_NAME}"', line)
                     else:
@@ -45,19 +35,26 @@ def clean_and_force_group(m3u_content, existing_urls):
 
                     output_lines.append(line)
                     output_lines.append(url_line)
+                index.seen(url_line)
                 skip_next = True
     return output_lines
 
 def main():
-    response = requests.get(UPSTREAM_URL)
+    """Appends new upstream entries to OUTPUT_FILE; returns False when the download failed."""
+    try:
+        response = http_client.get(UPSTREAM_URL)
+    except Exception as e:
+        print(f"❌ Failed to download: {e}")
+        return False
     if response.status_code != 200:
         print(f"❌ Failed to download: HTTP {response.status_code}")
-        return
+        return False
 
-    existing_urls = get_existing_urls(OUTPUT_FILE)
-    modified_lines = clean_and_force_group(response.text, existing_urls)
+    index = PlaylistIndex(OUTPUT_FILE)
+    was_empty = not index
+    modified_lines = clean_and_force_group(response.text, index)
 
-    if not existing_urls:
+    if was_empty:
         with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
             f.write(TVG_HEADER + "\n")
             f.write("\n".join(modified_lines) + "\n")
@@ -69,5 +66,11 @@ def main():
     else:
         print("ℹ No new entries, playlist unchanged")
 
+    index.end_run()
+    removed = index.compact()
+    if removed:
+        print(f"🧹 Removed {removed} entries missing upstream for {MAX_MISSED_RUNS} runs")
+    index.save()
+
 if __name__ == "__main__":
     main()
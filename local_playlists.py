@@ -0,0 +1,19 @@
+"""Lets the merge and EPG scripts read playlists regenerated earlier in the same run.
+
+The orchestrator passes each of them the names of the files its upstream
+scrapers just wrote; anything else is fetched from the published URL.
+"""
+
+
+def read_local_playlist(url, local_files):
+    """Lines of the local copy of `url` when it was regenerated in this run."""
+    name = url.rsplit("/", 1)[-1]
+    if name not in local_files:
+        return None
+    try:
+        with open(name, "r", encoding="utf-8") as f:
+            lines = f.read().strip().splitlines()
+    except OSError:
+        return None
+    print(f"✅ Using freshly generated {name}")
+    return lines
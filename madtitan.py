@@ -4,6 +4,8 @@ import re
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import sys
 
+import http_client
+
 json_urls = [
     "https://magnetic.website/MAD_TITAN_SPORTS/TOOLS/METAL/luc-247.json",
     "https://magnetic.website/MAD_TITAN_SPORTS/TOOLS/METAL/zpenn-247.json"
@@ -26,13 +28,18 @@ def check_stream(channel_info, session):
         pass
     return None
 
-all_channels = []
-for url in json_urls:
-    try:
-        response = requests.get(url, timeout=20)
-        response.raise_for_status()
-        data = response.json()
-        
+def main():
+    """Writes MadTitan.m3u8 from the feeds; returns False when the file could not be written."""
+    all_channels = []
+    feeds = http_client.fetch_all(json_urls, lambda url: http_client.get_json(url, timeout=20))
+    for url, data, error in feeds:
+        if isinstance(error, json.JSONDecodeError):
+            print(f"Error: Could not decode JSON from {url}.")
+            continue
+        if error:
+            print(f"Error fetching {url}: {error}")
+            continue
+
         items = data.get("items", [])
         if not items:
             print(f"Warning: No 'items' found in {url}")
@@ -49,36 +56,37 @@ for url in json_urls:
                     "stream_url": stream_url,
                     "group": f"MadTitan - {category}"
                 })
-                
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching {url}: {e}")
-    except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON from {url}.")
-
-valid_channels = []
-total_to_check = len(all_channels)
-
-with requests.Session() as session:
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_to_channel = {executor.submit(check_stream, channel, session): channel for channel in all_channels}
-        
-        for i, future in enumerate(as_completed(future_to_channel)):
-            result = future.result()
-            if result:
-                valid_channels.append(result)
-            
-            progress = (i + 1) / total_to_check * 100
-            sys.stdout.write(f"\rChecking streams... {int(progress)}% complete")
-            sys.stdout.flush()
-
-m3u8_content = "#EXTM3U\n"
-for channel in valid_channels:
-    m3u8_content += f'#EXTINF:-1 tvg-id="{STATIC_TVG_ID}" tvg-logo="{STATIC_LOGO_URL}" group-title="{channel["group"]}",{channel["name"]}\n'
-    m3u8_content += f'{channel["stream_url"]}\n'
-
-try:
-    with open("MadTitan.m3u8", "w", encoding="utf-8") as file:
-        file.write(m3u8_content)
-    print(f"\n\nSuccess! Wrote {len(valid_channels)} valid streams to 'MadTitan.m3u8'.")
-except Exception as e:
-    print(f"\nError writing to file: {e}")
+
+    valid_channels = []
+    total_to_check = len(all_channels)
+
+    # No retries here: a stream that fails its HEAD once is dropped anyway.
+    with http_client.new_session(retries=0) as session:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            future_to_channel = {executor.submit(check_stream, channel, session): channel for channel in all_channels}
+
+            for i, future in enumerate(as_completed(future_to_channel)):
+                result = future.result()
+                if result:
+                    valid_channels.append(result)
+
+                progress = (i + 1) / total_to_check * 100
+                sys.stdout.write(f"\rChecking streams... {int(progress)}% complete")
+                sys.stdout.flush()
+
+    m3u8_content = "#EXTM3U\n"
+    for channel in valid_channels:
+        m3u8_content += f'#EXTINF:-1 tvg-id="{STATIC_TVG_ID}" tvg-logo="{STATIC_LOGO_URL}" group-title="{channel["group"]}",{channel["name"]}\n'
+        m3u8_content += f'{channel["stream_url"]}\n'
+
+    try:
+        with open("MadTitan.m3u8", "w", encoding="utf-8") as file:
+            file.write(m3u8_content)
+        print(f"\n\nSuccess! Wrote {len(valid_channels)} valid streams to 'MadTitan.m3u8'.")
+    except Exception as e:
+        print(f"\nError writing to file: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
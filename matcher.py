@@ -0,0 +1,100 @@
+from collections import deque
+from functools import lru_cache
+
+CACHE_SIZE = 4096
+# Up to this many keywords, a plain substring scan beats walking the automaton
+# in Python (see benchmarks/bench_matcher.py), so small tables skip building it.
+LINEAR_SCAN_MAX = 32
+
+
+class KeywordMatcher:
+    """Finds which table entry a name belongs to in a single pass (Aho-Corasick).
+
+    `entries` is an iterable of (keywords, value) in priority order, where
+    `keywords` is one string or a list of them. `match(text)` returns the value
+    of the earliest entry with any keyword occurring in `text`, which is the same
+    answer as the old "loop over the table, first substring hit wins" scans.
+    Results are cached per matcher, since the same names come up run after run.
+    Tables of LINEAR_SCAN_MAX keywords or fewer are scanned in order instead.
+    """
+
+    def __init__(self, entries, default=None, ignore_case=False, cache_size=CACHE_SIZE):
+        self.default = default
+        self.ignore_case = ignore_case
+        self.values = []
+        # (keyword, priority) in table order.
+        self._keywords = []
+        # Trie nodes: child transitions, failure link and the best priority ending here.
+        self._goto = [{}]
+        self._fail = [0]
+        self._best = [None]
+        for priority, (keywords, value) in enumerate(entries):
+            self.values.append(value)
+            if isinstance(keywords, str):
+                keywords = [keywords]
+            for keyword in keywords:
+                if keyword:
+                    self._keywords.append((keyword.lower() if ignore_case else keyword, priority))
+        self.linear = len(self._keywords) <= LINEAR_SCAN_MAX
+        if not self.linear:
+            for keyword, priority in self._keywords:
+                self._add(keyword, priority)
+            self._link()
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+
+    def _add(self, keyword, priority):
+        node = 0
+        for char in keyword:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+            node = nxt
+        if self._best[node] is None or priority < self._best[node]:
+            self._best[node] = priority
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                # A node also "ends" every keyword its failure chain ends.
+                inherited = self._best[self._fail[child]]
+                if inherited is not None and (self._best[child] is None or inherited < self._best[child]):
+                    self._best[child] = inherited
+
+    def _match(self, text):
+        priority = self.match_index(text)
+        return self.default if priority is None else self.values[priority]
+
+    def match_index(self, text):
+        """Returns the priority (table position) of the winning entry, or None."""
+        if self.ignore_case:
+            text = text.lower()
+        if self.linear:
+            for keyword, priority in self._keywords:
+                if keyword in text:
+                    return priority
+            return None
+        goto, fail, best_at = self._goto, self._fail, self._best
+        node = 0
+        best = None
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            found = best_at[node]
+            if found is not None and (best is None or found < best):
+                best = found
+                if best == 0:
+                    break
+        return best
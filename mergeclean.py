@@ -3,6 +3,8 @@ import re
 import time
 from datetime import datetime
 
+from local_playlists import read_local_playlist
+
 playlist_urls = [
     "https://raw.githubusercontent.com/Drewski2423/DrewLive/main/DrewAll.m3u8",
     "https://raw.githubusercontent.com/Drewski2423/DrewLive/main/JapanTV.m3u8",
@@ -145,12 +147,12 @@ def write_merged_playlist(all_channels):
     print(f"🗑️ Duplicates skipped: {duplicates_skipped}.")
     print(f"📝 Total lines in output file: {len(final_output_string.splitlines())}.")
 
-if __name__ == "__main__":
+def main(local_files=()):
     print(f"Starting playlist merge at {datetime.now()}...")
     all_channels_list = []
 
     for url in playlist_urls:
-        lines = fetch_playlist(url)
+        lines = read_local_playlist(url, local_files) or fetch_playlist(url)
         if lines:
             parsed_channels = parse_playlist(lines, source_url=url)
             all_channels_list.extend(parsed_channels)
@@ -163,3 +165,7 @@ if __name__ == "__main__":
 
     write_merged_playlist(clean_channels)
     print(f"Merging complete at {datetime.now()}.")
+
+
+if __name__ == "__main__":
+    main()
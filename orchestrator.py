@@ -0,0 +1,182 @@
+"""Runs every playlist source in one event loop, in dependency order.
+
+    python orchestrator.py                   # everything
+    python orchestrator.py ppv fstv merged   # only these; upstreams are not pulled in
+    python orchestrator.py --due             # only what refresh_scheduler.py says is due
+
+Scrapers start together. The browser scrapers share one BrowserPool per
+browser type, and the blocking ones run on worker threads. A merge starts once
+every selected scraper whose playlist it includes has finished (failed ones
+too, as it then falls back to the published copy), and reads the freshly
+written files instead of fetching them. The EPG waits for MergedPlaylist.m3u8.
+A node fails when its main() raises or returns False; a failed scraper is not
+marked as refreshed, so the scheduler retries it on the next run.
+Ends with a timing report and the critical path through the run.
+"""
+import argparse
+import asyncio
+import importlib
+import time
+from contextlib import AsyncExitStack
+
+import refresh_scheduler
+from browser_pool import BrowserPool
+
+# name: (module, browser type, or None when main() is blocking)
+SCRAPERS = {
+    "aria": ("aria", None),
+    "japan": ("japan", None),
+    "tvpass": ("tvpass", None),
+    "pixelsport": ("pixelsport", None),
+    "madtitan": ("madtitan", None),
+    "rox": ("rox", None),
+    "ppv": ("ppv", "firefox"),
+    "thetvapp": ("tv", "firefox"),
+    "fstv": ("fstv", "firefox"),
+    "webcast": ("webcast", "chromium"),
+}
+MERGES = {"merged": "iptv", "mergeclean": "mergeclean", "drewlivemerge": "drewlivemerge"}
+EPG = "drewepg"
+EPG_INPUT = "merged"
+ALL_NODES = [*SCRAPERS, *MERGES, EPG]
+
+
+def output_of(name):
+    source = refresh_scheduler.SOURCES.get(name)
+    return source[0] if source else None
+
+
+class Node:
+    def __init__(self, name, module, browser=None, deps=()):
+        self.name = name
+        self.module = module
+        self.browser = browser
+        self.deps = list(deps)
+        self.started = None
+        self.finished = None
+        self.ok = None
+        self.error = None
+
+    @property
+    def duration(self):
+        return self.finished - self.started
+
+    async def run(self, pools, nodes):
+        module = importlib.import_module(self.module)
+        if self.browser:
+            return await module.main(pools[self.browser])
+        if self.name in MERGES or self.name == EPG:
+            fresh = {output_of(d) for d in self.deps if nodes[d].ok}
+            return await asyncio.to_thread(module.main, fresh)
+        return await asyncio.to_thread(module.main)
+
+
+def build_graph(selected):
+    """Nodes for `selected`, each depending on the selected nodes it reads from."""
+    nodes = {}
+    for name in selected:
+        if name in SCRAPERS:
+            module, browser = SCRAPERS[name]
+            nodes[name] = Node(name, module, browser)
+        elif name in MERGES:
+            inputs = {url.rsplit("/", 1)[-1] for url in importlib.import_module(MERGES[name]).playlist_urls}
+            deps = [s for s in SCRAPERS if s in selected and output_of(s) in inputs]
+            nodes[name] = Node(name, MERGES[name], deps=deps)
+        elif name == EPG:
+            nodes[name] = Node(name, EPG, deps=[EPG_INPUT] if EPG_INPUT in selected else [])
+    return nodes
+
+
+async def run_node(node, nodes, tasks, pools, t0):
+    waiting = [tasks[d] for d in node.deps]
+    if waiting:
+        await asyncio.wait(waiting)
+    node.started = time.perf_counter() - t0
+    print(f"▶️ {node.name} started at +{node.started:.1f} s")
+    try:
+        result = await node.run(pools, nodes)
+        node.ok = result is not False
+    except (Exception, SystemExit) as e:
+        node.ok = False
+        node.error = repr(e)
+    node.finished = time.perf_counter() - t0
+    status = "✅" if node.ok else f"❌ {node.error or 'reported failure'}"
+    print(f"⏹️ {node.name} finished in {node.duration:.1f} s {status}")
+
+
+async def run_graph(nodes):
+    t0 = time.perf_counter()
+    async with AsyncExitStack() as stack:
+        pools = {}
+        for browser in sorted({n.browser for n in nodes.values() if n.browser}):
+            pools[browser] = await stack.enter_async_context(BrowserPool(browser))
+        tasks = {}
+        for name, node in nodes.items():
+            tasks[name] = asyncio.ensure_future(run_node(node, nodes, tasks, pools, t0))
+        await asyncio.gather(*tasks.values())
+    return time.perf_counter() - t0
+
+
+def critical_path(nodes):
+    """The chain of nodes that decided the run's length, from first to last."""
+    node = max(nodes.values(), key=lambda n: n.finished)
+    path = [node]
+    while node.deps:
+        node = max((nodes[d] for d in node.deps), key=lambda n: n.finished)
+        path.append(node)
+    return path[::-1]
+
+
+def print_report(nodes, wall):
+    print(f"\n⏱️ Orchestrator report ({wall:.1f} s wall):")
+    for node in sorted(nodes.values(), key=lambda n: (n.started, n.name)):
+        status = "ok" if node.ok else "FAILED"
+        waited = f" after {', '.join(node.deps)}" if node.deps else ""
+        print(f"   {node.name:<14} +{node.started:7.1f} s  {node.duration:7.1f} s  {status}{waited}")
+    busy = sum(n.duration for n in nodes.values())
+    print(f"   {busy:.1f} s of work in {wall:.1f} s ({busy / wall if wall else 0:.1f}x overlap)")
+    path = critical_path(nodes)
+    chain = " → ".join(f"{n.name} ({n.duration:.1f} s)" for n in path)
+    print(f"   critical path: {chain}")
+
+
+def mark_refreshed(nodes):
+    state = refresh_scheduler.load_state()
+    for name, node in nodes.items():
+        if node.ok and name in refresh_scheduler.SOURCES:
+            refresh_scheduler.mark(name, state)
+    refresh_scheduler.save_state(state)
+
+
+def select(names, due_only):
+    selected = names or ALL_NODES
+    if due_only:
+        state = refresh_scheduler.load_state()
+        due = {name for name in refresh_scheduler.SOURCES if refresh_scheduler.plan(name, state)["due"]}
+        if EPG_INPUT in due:
+            due.add(EPG)
+        selected = [name for name in selected if name in due]
+    return [name for name in ALL_NODES if name in selected]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="*", metavar="source", help=f"any of: {', '.join(ALL_NODES)}")
+    parser.add_argument("--due", action="store_true", help="skip sources that are not due for a refresh")
+    args = parser.parse_args()
+    unknown = [name for name in args.sources if name not in ALL_NODES]
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(unknown)}")
+
+    selected = select(args.sources, args.due)
+    if not selected:
+        print("Nothing to run.")
+        return
+    nodes = build_graph(selected)
+    wall = asyncio.run(run_graph(nodes))
+    print_report(nodes, wall)
+    mark_refreshed(nodes)
+
+
+if __name__ == "__main__":
+    main()
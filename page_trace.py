@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Directory for the JSONL page traces, e.g. SCRAPER_TRACE_DIR=.cache/traces;
+# each tracer writes <name>.jsonl there. Unset means tracing is off.
+TRACE_DIR = os.environ.get("SCRAPER_TRACE_DIR")
+# DOMContentLoaded and the first .m3u8 are timed from the start of this phase,
+# so waiting on a rate limiter beforehand does not count as page load time.
+NAVIGATION_PHASE = "navigation"
+# How long a finished trace waits for its last response sizes before it is written anyway.
+SIZES_TIMEOUT = 5
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+class PageTrace:
+    """Timings and counters for one scraped page.
+
+    Wrap the slow steps in `with trace.phase("networkidle"):` to see where the
+    time goes. `outcome` is set by the caller ("ok", "miss", ...) and `retries`
+    is bumped by callers that try a page again; leaving the trace through an
+    exception records "error" (or "cancelled" on a timeout).
+
+    `bytes` is what went over the wire (headers plus encoded body) for every
+    finished request, as Playwright reports it.
+    """
+
+    def __init__(self, tracer, page, url, label="", enabled=True):
+        self.tracer = tracer
+        self.page = page
+        self.url = url
+        self.label = label
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.ended = None
+        self.navigation_started = None
+        self.dom_content_loaded = None
+        self.first_m3u8 = None
+        self.requests = 0
+        self.bytes = 0
+        self.retries = 0
+        self.outcome = None
+        self.phases = {}
+        self._finished = False
+        self._sizing = set()
+        # Held here, since the blocker drops a page's tally once the page closes.
+        self._block_stats = None
+        if enabled and tracer.blocker is not None:
+            self._block_stats = tracer.blocker.stats_for(page)
+        if enabled:
+            page.on("request", self._on_request)
+            page.on("requestfinished", self._on_request_finished)
+            page.on("domcontentloaded", self._on_dom_content_loaded)
+
+    def _elapsed(self):
+        return (self.ended or time.perf_counter()) - self.started
+
+    def _since_navigation(self):
+        return time.perf_counter() - (self.navigation_started or self.started)
+
+    def _on_request(self, request):
+        self.requests += 1
+        if self.first_m3u8 is None and ".m3u8" in request.url:
+            self.first_m3u8 = self._since_navigation()
+
+    def _on_request_finished(self, request):
+        task = asyncio.ensure_future(self._add_sizes(request))
+        self._sizing.add(task)
+        task.add_done_callback(self._sizing.discard)
+
+    async def _add_sizes(self, request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            # The page closed before Playwright could report them.
+            return
+        self.bytes += sizes["responseHeadersSize"] + sizes["responseBodySize"]
+
+    def _on_dom_content_loaded(self, _page):
+        if self.dom_content_loaded is None:
+            self.dom_content_loaded = self._since_navigation()
+
+    @contextmanager
+    def phase(self, name):
+        began = time.perf_counter()
+        if name == NAVIGATION_PHASE and self.navigation_started is None:
+            self.navigation_started = began
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - began
+
+    def finish(self, outcome=None):
+        if self._finished:
+            return
+        self._finished = True
+        self.ended = time.perf_counter()
+        if outcome is not None:
+            self.outcome = outcome
+        if not self.enabled:
+            return
+        for event, handler in (("request", self._on_request), ("requestfinished", self._on_request_finished),
+                               ("domcontentloaded", self._on_dom_content_loaded)):
+            try:
+                self.page.remove_listener(event, handler)
+            except Exception:
+                pass
+        if self._sizing:
+            self.tracer.record_when_sized(self)
+        else:
+            self.tracer.record(self)
+
+    def to_record(self):
+        blocked = self._block_stats.blocked if self._block_stats is not None else 0
+        return {
+            "scraper": self.tracer.name,
+            "label": self.label,
+            "url": self.url,
+            "outcome": self.outcome or "miss",
+            "total_s": round(self._elapsed(), 3),
+            "navigation_s": round(self.phases.get(NAVIGATION_PHASE, 0.0), 3),
+            "dom_content_loaded_s": _rounded(self.dom_content_loaded),
+            "first_m3u8_s": _rounded(self.first_m3u8),
+            "requests": self.requests,
+            "bytes": self.bytes,
+            "blocked": blocked,
+            "retries": self.retries,
+            "phases": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        elif issubclass(exc_type, (asyncio.CancelledError, asyncio.TimeoutError)):
+            self.finish("cancelled")
+        else:
+            self.finish("error")
+
+
+def _rounded(value):
+    return None if value is None else round(value, 3)
+
+
+class Tracer:
+    """Collects PageTraces for one scraper and appends them to <name>.jsonl.
+
+    Pass the scraper's RequestBlocker to include blocked requests per page.
+    Await flush() before print_summary() so traces still waiting on response
+    sizes are written.
+    """
+
+    def __init__(self, name, blocker=None, directory=None):
+        self.name = name
+        self.blocker = blocker
+        self.directory = directory or TRACE_DIR
+        self.records = []
+        self._pending = set()
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f"{self.name.lower()}.jsonl")
+
+    def start(self, page, url, label=""):
+        return PageTrace(self, page, url, label, enabled=self.enabled)
+
+    def record(self, trace):
+        record = trace.to_record()
+        self.records.append(record)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write trace to {self.path}: {e}")
+
+    def record_when_sized(self, trace):
+        task = asyncio.ensure_future(self._record_after(trace))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _record_after(self, trace):
+        await asyncio.wait(set(trace._sizing), timeout=SIZES_TIMEOUT)
+        self.record(trace)
+
+    async def flush(self):
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def print_summary(self, top=5, file=None):
+        if not self.records:
+            return
+        totals = [r["total_s"] for r in self.records]
+        print(f"⏱️ {self.name} page trace ({len(self.records)} pages → {self.path}):", file=file)
+        print(f"   {'total':<16} p50 {percentile(totals, 50):6.2f} s  p95 {percentile(totals, 95):6.2f} s  sum {sum(totals):7.1f} s", file=file)
+        phases = {}
+        for r in self.records:
+            for name, seconds in r["phases"].items():
+                phases.setdefault(name, []).append(seconds)
+        for name, values in sorted(phases.items(), key=lambda item: -sum(item[1])):
+            print(f"   {name:<16} p50 {percentile(values, 50):6.2f} s  p95 {percentile(values, 95):6.2f} s  sum {sum(values):7.1f} s", file=file)
+        outcomes = {}
+        for r in self.records:
+            outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+        print("   outcomes: " + ", ".join(f"{k} {v}" for k, v in sorted(outcomes.items())), file=file)
+        for r in sorted(self.records, key=lambda r: r["total_s"], reverse=True)[:top]:
+            print(f"   {r['total_s']:7.2f} s  {r['outcome']:<9} {r['requests']:>4} req  {r['url']}", file=file)
@@ -1,6 +1,5 @@
-import json
-import urllib.request
-from urllib.error import URLError, HTTPError
+import http_client
+from matcher import KeywordMatcher
 
 BASE = "https://pixelsport.tv"
 API_EVENTS = f"{BASE}/backend/liveTV/events"
@@ -32,12 +31,9 @@ def fetch_json(url):
         "User-Agent": VLC_USER_AGENT,
         "Referer": VLC_REFERER,
         "Accept": "*/*",
-        "Connection": "close",
         "Icy-MetaData": VLC_ICY,
     }
-    req = urllib.request.Request(url, headers=headers)
-    with urllib.request.urlopen(req, timeout=10) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+    return http_client.get_json(url, headers=headers, timeout=10)
 
 
 def collect_links(obj, prefix=""):
@@ -53,12 +49,16 @@ def collect_links(obj, prefix=""):
     return links
 
 
+LEAGUE_MATCHER = KeywordMatcher(
+    LEAGUE_INFO.items(),
+    default=("Pixelsports.Dummy.us", LIVE_TV_LOGO, "Pixelsports"),
+    ignore_case=True,
+)
+
+
 def get_league_info(name):
     """Return league info tuple: (tvg-id, logo, group name)"""
-    for key, (tvid, logo, group) in LEAGUE_INFO.items():
-        if key.lower() in name.lower():
-            return tvid, logo, group
-    return ("Pixelsports.Dummy.us", LIVE_TV_LOGO, "Pixelsports")
+    return LEAGUE_MATCHER.match(name)
 
 
 def build_m3u(events, sliders):
@@ -100,11 +100,13 @@ def build_m3u(events, sliders):
 
 
 def main():
+    """Writes OUTPUT_FILE from the PixelSport API; returns False when nothing was written."""
     try:
         print("[*] Fetching PixelSport data...")
-        events_data = fetch_json(API_EVENTS)
+        (_, events_data, error), (_, sliders_data, slider_error) = http_client.fetch_all([API_EVENTS, API_SLIDERS], fetch_json)
+        if error or slider_error:
+            raise error or slider_error
         events = events_data.get("events", []) if isinstance(events_data, dict) else []
-        sliders_data = fetch_json(API_SLIDERS)
         sliders = sliders_data.get("data", []) if isinstance(sliders_data, dict) else []
 
         playlist = build_m3u(events, sliders)
@@ -114,6 +116,7 @@ def main():
         print(f"[+] Saved: {OUTPUT_FILE} ({len(events)} events + {len(sliders)} live channels)")
     except Exception as e:
         print(f"[!] Error: {e}")
+        return False
 
 
 if __name__ == "__main__":
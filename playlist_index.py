@@ -0,0 +1,121 @@
+import json
+import os
+import time
+
+INDEX_DIR = os.environ.get("PLAYLIST_INDEX_DIR", ".cache")
+# Entries upstream has not listed for this many complete runs are compacted away.
+MAX_MISSED_RUNS = int(os.environ.get("PLAYLIST_MAX_MISSED_RUNS", "5"))
+
+
+def read_entries(lines):
+    """Splits playlist lines into (header lines, [entry lines ending in the URL])."""
+    header, entries, current = [], [], None
+    for line in lines:
+        if line.startswith("#EXTINF"):
+            current = [line]
+        elif current is None:
+            header.append(line)
+        elif line.strip():
+            current.append(line)
+            if not line.startswith("#"):
+                entries.append(current)
+                current = None
+    return header, entries
+
+
+class PlaylistIndex:
+    """Sidecar index of an append-only playlist: URL -> when upstream last listed it.
+
+    Lives in INDEX_DIR as <playlist>.index.json, so membership checks never
+    re-read the playlist. The playlist's size is stored with it; when the file
+    no longer matches (a lost cache, a manual edit) the URL set is rebuilt from
+    the file once, keeping the history of URLs that are still there.
+    """
+
+    def __init__(self, playlist_path, directory=None):
+        self.playlist_path = playlist_path
+        self.path = os.path.join(directory or INDEX_DIR, os.path.basename(playlist_path) + ".index.json")
+        self.entries = {}
+        self.runs = 0
+        self._seen = set()
+        self.load()
+
+    def __contains__(self, url):
+        return url in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _playlist_size(self):
+        try:
+            return os.path.getsize(self.playlist_path)
+        except OSError:
+            return None
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.entries = data["entries"]
+            self.runs = data.get("runs", 0)
+            size = data.get("playlist_size")
+        except (OSError, ValueError, KeyError, TypeError):
+            self.entries, size = {}, -1
+        if size != self._playlist_size():
+            self.resync()
+
+    def resync(self):
+        now = time.time()
+        try:
+            with open(self.playlist_path, "r", encoding="utf-8") as f:
+                _, entries = read_entries(f.read().splitlines())
+        except OSError:
+            entries = []
+        known = self.entries
+        self.entries = {}
+        for entry in entries:
+            url = entry[-1].strip()
+            self.entries[url] = known.get(url) or {"first_seen": now, "last_seen": now, "missed": 0}
+
+    def seen(self, url, now=None):
+        """Records that upstream lists `url` this run, adding it when new."""
+        now = time.time() if now is None else now
+        entry = self.entries.setdefault(url, {"first_seen": now, "last_seen": now, "missed": 0})
+        entry["last_seen"] = now
+        entry["missed"] = 0
+        self._seen.add(url)
+
+    def end_run(self, complete=True):
+        """Counts a miss for every URL not seen, unless part of upstream failed to load."""
+        if complete:
+            for url, entry in self.entries.items():
+                if url not in self._seen:
+                    entry["missed"] = entry.get("missed", 0) + 1
+            self.runs += 1
+        self._seen = set()
+
+    def stale(self, max_missed=MAX_MISSED_RUNS):
+        return {url for url, entry in self.entries.items() if entry.get("missed", 0) >= max_missed}
+
+    def compact(self, max_missed=MAX_MISSED_RUNS):
+        """Rewrites the playlist without stale entries; returns how many were removed."""
+        stale = self.stale(max_missed)
+        if not stale:
+            return 0
+        with open(self.playlist_path, "r", encoding="utf-8") as f:
+            header, entries = read_entries(f.read().splitlines())
+        kept = [entry for entry in entries if entry[-1].strip() not in stale]
+        tmp = self.playlist_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(header + [line for entry in kept for line in entry]) + "\n")
+        os.replace(tmp, self.playlist_path)
+        for url in stale:
+            self.entries.pop(url, None)
+        return len(entries) - len(kept)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"playlist_size": self._playlist_size(), "runs": self.runs, "entries": self.entries}, f)
+        os.replace(tmp, self.path)
@@ -1,11 +1,41 @@
 import asyncio
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+import os
 import aiohttp
 from datetime import datetime
 import re 
+from browser_pool import shared_or_new
+from request_blocker import RequestBlocker
+from stream_capture import RateLimiter, StreamCapture
+from fast_resolver import TierStats, resolve_tiered
+from matcher import KeywordMatcher
+from page_trace import Tracer
+from stream_cache import StreamCache
 
 API_URL = "https://ppv.to/api/streams"
 
+# Number of browser pages resolving iframes at the same time, and the hard
+# upper bound for a single stream (goto + click + response wait + checks).
+PAGE_POOL_SIZE = int(os.environ.get("PPV_PAGE_POOL_SIZE", "4"))
+STREAM_TIMEOUT = int(os.environ.get("PPV_STREAM_TIMEOUT", "75"))
+
+BLOCKER = RequestBlocker()
+
+# Upper bounds only: capture returns as soon as the first .m3u8 response lands.
+PLAYER_WAIT_TIMEOUT = 3
+CAPTURE_TIMEOUT = 10
+NAV_LIMITER = RateLimiter(rate=float(os.environ.get("PPV_PAGES_PER_SECOND", "2")), burst=PAGE_POOL_SIZE)
+TIERS = TierStats("PPV")
+TRACER = Tracer("PPV", blocker=BLOCKER)
+# iframe → validated m3u8 URLs, kept between runs; entries are revalidated with
+# a plain HTTP check instead of a browser visit until they expire.
+CACHE = StreamCache("ppv_streams")
+# Used when the URLs carry no expiry token; longer than the hourly run interval,
+# since a reused entry is still checked over HTTP first.
+DEFAULT_CACHE_TTL = int(os.environ.get("PPV_CACHE_TTL", str(2 * 3600)))
+CATEGORY_CACHE_TTL = {
+    "24/7 Streams": 6 * 3600,
+}
+
 CUSTOM_HEADERS = [
     '#EXTVLCOPT:http-origin=https://ppv.to',
     '#EXTVLCOPT:http-referrer=https://ppv.to/',
@@ -96,6 +126,12 @@ COLLEGE_TEAMS = {
     "arizona state sun devils", "texas tech red raiders", "florida atlantic owls"
 }
 
+# NFL names win over college ones, as when the two tables were scanned in turn.
+FOOTBALL_MATCHER = KeywordMatcher([
+    (sorted(NFL_TEAMS), ("NFL.Dummy.us", "PPVLand - NFL Action")),
+    (sorted(COLLEGE_TEAMS), ("NCAA.Football.Dummy.us", "PPVLand - College Football")),
+])
+
 async def check_m3u8_url(url, referer):
     """Checks the M3U8 URL using the correct referer for validation."""
     
@@ -137,76 +173,185 @@ async def get_streams():
         return None
 
 async def grab_m3u8_from_iframe(page, iframe_url):
-    found_streams = set()
-    
-    def handle_response(response):
-        if ".m3u8" in response.url:
-            print(f"✅ Found M3U8 Stream: {response.url}")
-            found_streams.add(response.url)
+    capture = StreamCapture(page, on_match=lambda url: print(f"✅ Found M3U8 Stream: {url}"))
+    with TRACER.start(page, iframe_url) as trace:
+        try:
+            await _capture_m3u8(page, iframe_url, capture, trace)
+        finally:
+            capture.close()
+        found_streams = set(capture.urls)
+
+        if not found_streams:
+            print(f"❌ No M3U8 URLs were captured for {iframe_url}")
+            trace.outcome = "miss"
+            return set()
+
+        valid_urls = set()
+        tasks = [check_m3u8_url(url, iframe_url) for url in found_streams]
+        with trace.phase("validation"):
+            results = await asyncio.gather(*tasks)
+        
+        for url, is_valid in zip(found_streams, results):
+            if is_valid:
+                valid_urls.add(url)
+            else:
+                print(f"🗑️ Discarding invalid or unreachable URL: {url}")
+
+        trace.outcome = "ok" if valid_urls else "invalid"
+        return valid_urls
+
+async def keep_valid(urls, referer):
+    results = await asyncio.gather(*(check_m3u8_url(url, referer) for url in urls))
+    return {url for url, is_valid in zip(urls, results) if is_valid}
+
+async def resolve_stream(page, session, iframe_url):
+    """Plain HTTP scan of the iframe first; the browser only when that finds nothing valid."""
+    return await resolve_tiered(
+        session, iframe_url, lambda: grab_m3u8_from_iframe(page, iframe_url), TIERS,
+        pick=lambda urls: keep_valid(urls, iframe_url),
+    )
+
+async def resolve_cached(context, session, s):
+    """Reuses the cached URLs for this iframe when they still check out; otherwise resolves it.
+
+    A miss resolves on a clean page of its own, so nothing is left
+    mid-navigation after a timeout and the pool can put new pages on a
+    recycled browser.
+    """
+    iframe = s["iframe"]
+    entry = CACHE.get(iframe)
+    if entry:
+        valid = await keep_valid(entry["urls"], iframe)
+        if valid:
+            CACHE.hits += 1
+            print(f"♻️ Reusing cached stream(s) for {s['name']}")
+            return valid
+    CACHE.misses += 1
+    page = await context.new_page()
+    try:
+        urls = await resolve_stream(page, session, iframe)
+    finally:
+        try:
+            await page.close()
+        except Exception:
+            pass
+    if urls:
+        CACHE.put(iframe, sorted(urls), CATEGORY_CACHE_TTL.get(s["category"], DEFAULT_CACHE_TTL))
+    else:
+        CACHE.drop(iframe)
+    return urls
+
+async def _wait_for_iframe(page, timeout):
+    try:
+        await page.wait_for_selector("iframe", state="attached", timeout=timeout)
+    except Exception:
+        pass
 
-    page.on("response", handle_response)
+async def _capture_m3u8(page, iframe_url, capture, trace):
     print(f"🌐 Navigating to iframe: {iframe_url}")
     try:
-        await page.goto(iframe_url, timeout=40000, wait_until="domcontentloaded") 
+        with trace.phase("rate_limit"):
+            await NAV_LIMITER.wait()
+        with trace.phase("navigation"):
+            await page.goto(iframe_url, timeout=40000, wait_until="domcontentloaded") 
     except Exception as e:
         print(f"❌ Failed to load iframe page: {e}")
-        page.remove_listener("response", handle_response)
-        return set()
+        return
+
+    # Instead of a fixed 3 s pause, go as soon as the player iframe is attached
+    # or a stream has already been requested on its own.
+    iframe_ready = asyncio.ensure_future(_wait_for_iframe(page, PLAYER_WAIT_TIMEOUT * 1000))
+    with trace.phase("player_wait"):
+        await asyncio.wait([iframe_ready, capture.future], timeout=PLAYER_WAIT_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+    iframe_ready.cancel()
+    if capture.first:
+        print("✅ M3U8 stream detected before clicking. Proceeding immediately to validation.")
+        return
 
+    # Clicking is the second try at starting the player, after the passive wait found nothing.
+    trace.retries += 1
     try:
-        await page.wait_for_timeout(3000)
-        nested_iframe = page.locator("iframe")
-        
-        if await nested_iframe.count() > 0:
-            print("🔎 Found nested iframe, attempting to click inside it.")
-            await page.mouse.click(200, 200) 
-            print("✅ Mouse click dispatched on page center to trigger nested player.")
+        with trace.phase("click"):
+            nested_iframe = page.locator("iframe")
             
-        else:
-            print("🖱️ No nested iframe found. Clicking center of page body.")
-            await page.mouse.click(200, 200)
+            if await nested_iframe.count() > 0:
+                print("🔎 Found nested iframe, attempting to click inside it.")
+                await page.mouse.click(200, 200) 
+                print("✅ Mouse click dispatched on page center to trigger nested player.")
+                
+            else:
+                print("🖱️ No nested iframe found. Clicking center of page body.")
+                await page.mouse.click(200, 200)
             
     except Exception as e:
         print(f"⚠️ Clicking failed, but proceeding anyway. Error: {e}")
 
-    print("⏳ Waiting for stream to be requested (max 10s)...")
-    try:
-        await page.wait_for_event(
-            "response",
-            lambda resp: ".m3u8" in resp.url,
-            timeout=10000 
-        )
+    print(f"⏳ Waiting for stream to be requested (max {CAPTURE_TIMEOUT}s)...")
+    with trace.phase("capture_wait"):
+        captured = await capture.wait(CAPTURE_TIMEOUT)
+    if captured:
         print("✅ M3U8 stream detected. Proceeding immediately to validation.")
+    else:
+        print(f"⚠️ Stream request did not start within {CAPTURE_TIMEOUT} seconds. Proceeding to validation.")
+
+async def resolve_streams(context, streams, label="", pool_size=PAGE_POOL_SIZE, inflight=None):
+    """Resolves streams on a bounded pool of pages pulling from a shared queue.
+
+    `inflight` maps iframe URLs to their (pending) result; pass the same dict to
+    every call in a run so an iframe listed twice is only resolved once.
+    """
+    url_map = {}
+    inflight = {} if inflight is None else inflight
+    if not streams:
+        return url_map
+
+    queue = asyncio.Queue()
+    for idx, s in enumerate(streams, start=1):
+        queue.put_nowait((idx, s))
+    total_streams = len(streams)
+
+    async def worker(session):
+        while True:
+            try:
+                idx, s = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            key = f"{s['name']}::{s['category']}::{s['iframe']}"
+            print(f"\n🔎 Scraping {label}stream {idx}/{total_streams}: {s['name']} ({s['category']})")
+            if s["iframe"] in inflight:
+                print(f"🔁 {s['name']} shares an iframe already resolved this run")
+                urls = await asyncio.shield(inflight[s["iframe"]])
+            else:
+                result = inflight[s["iframe"]] = asyncio.get_running_loop().create_future()
+                urls = set()
+                try:
+                    urls = await asyncio.wait_for(resolve_cached(context, session, s), timeout=STREAM_TIMEOUT)
+                except asyncio.TimeoutError:
+                    print(f"⏱️ Gave up on {s['name']} after {STREAM_TIMEOUT}s")
+                except Exception as e:
+                    print(f"⚠️ Failed to resolve {s['name']}: {e}")
+                finally:
+                    result.set_result(urls)
+            if urls:
+                print(f"✅ Got {len(urls)} {label}stream(s) for {s['name']} ({idx}/{total_streams})")
+            else:
+                print(f"⚠️ No valid {label}streams for {s['name']} ({idx}/{total_streams})")
+            url_map[key] = urls
 
-    except PlaywrightTimeoutError:
-        print("⚠️ Stream request did not start within 10 seconds. Proceeding to validation.")
-    except Exception as e:
-        print(f"❌ Failed during wait for M3U8 event: {e}")
-
-    page.remove_listener("response", handle_response)
-
-    if not found_streams:
-        print(f"❌ No M3U8 URLs were captured for {iframe_url}")
-        return set()
-
-    valid_urls = set()
-    tasks = [check_m3u8_url(url, iframe_url) for url in found_streams]
-    results = await asyncio.gather(*tasks)
-    
-    for url, is_valid in zip(found_streams, results):
-        if is_valid:
-            valid_urls.add(url)
-        else:
-            print(f"🗑️ Discarding invalid or unreachable URL: {url}")
-            
-    return valid_urls
+    async with aiohttp.ClientSession() as session:
+        workers = [asyncio.create_task(worker(session)) for _ in range(max(1, min(pool_size, total_streams)))]
+        await asyncio.gather(*workers)
+    return url_map
 
 async def grab_live_now_from_html(page, base_url="https://ppv.to/"):
     print("🌐 Scraping 'Live Now' streams from HTML...")
     live_now_streams = []
     try:
         await page.goto(base_url, timeout=20000)
-        await asyncio.sleep(3)
+        try:
+            await page.wait_for_selector("#livecards a.item-card", state="attached", timeout=5000)
+        except Exception:
+            pass
 
         live_cards = await page.query_selector_all("#livecards a.item-card")
         for card in live_cards:
@@ -251,20 +396,9 @@ def build_m3u(streams, url_map):
         tvg_id = CATEGORY_TVG_IDS.get(orig_category, "Misc.Dummy.us")
 
         if orig_category == "American Football":
-            matched_team = None
-            for team in NFL_TEAMS:
-                if team in name_lower:
-                    tvg_id = "NFL.Dummy.us"
-                    final_group = "PPVLand - NFL Action"
-                    matched_team = team
-                    break
-            if not matched_team:
-                for team in COLLEGE_TEAMS:
-                    if team in name_lower:
-                        tvg_id = "NCAA.Football.Dummy.us"
-                        final_group = "PPVLand - College Football"
-                        matched_team = team
-                        break
+            football = FOOTBALL_MATCHER.match(name_lower)
+            if football:
+                tvg_id, final_group = football
 
         url = next(iter(urls))
         lines.append(f'#EXTINF:-1 tvg-id="{tvg_id}" tvg-logo="{logo}" group-title="{final_group}",{s["name"]}')
@@ -272,14 +406,15 @@ def build_m3u(streams, url_map):
         lines.append(url)
     return "\n".join(lines)
 
-async def main():
+async def main(pool=None):
+    """Scrapes PPVLand into PPVLand.m3u8; returns False when the API gave nothing to scrape."""
     print("🚀 Starting PPV Stream Fetcher")
     data = await get_streams()
     if not data or 'streams' not in data:
         print("❌ No valid data received from the API")
         if data:
             print(f"API Response: {data}")
-        return
+        return False
 
     print(f"✅ Found {len(data['streams'])} categories")
     streams = []
@@ -308,35 +443,22 @@ async def main():
             deduped_streams.append(s)
     streams = deduped_streams
 
-    async with async_playwright() as p:
-        browser = await p.firefox.launch(headless=True)
-        context = await browser.new_context()
-        page = await context.new_page()
-        url_map = {}
-
-        total_streams = len(streams)
-        for idx, s in enumerate(streams, start=1):
-            key = f"{s['name']}::{s['category']}::{s['iframe']}"
-            print(f"\n🔎 Scraping stream {idx}/{total_streams}: {s['name']} ({s['category']})")
-            urls = await grab_m3u8_from_iframe(page, s["iframe"])
-            if urls:
-                print(f"✅ Got {len(urls)} stream(s) for {s['name']} ({idx}/{total_streams})")
-            else:
-                print(f"⚠️ No valid streams for {s['name']} ({idx}/{total_streams})")
-            url_map[key] = urls
+    async with shared_or_new(pool, "firefox") as pool, pool.context(blocker=BLOCKER, profile="ppv", har="ppv") as context:
+        print(f"🧵 Resolving {len(streams)} streams with {PAGE_POOL_SIZE} pages")
+        inflight = {}
+        url_map = await resolve_streams(context, streams, inflight=inflight)
 
+        page = await context.new_page()
         live_now_streams = await grab_live_now_from_html(page)
-        for s in live_now_streams:
-            key = f"{s['name']}::{s['category']}::{s['iframe']}"
-            urls = await grab_m3u8_from_iframe(page, s["iframe"])
-            if urls:
-                print(f"✅ Got {len(urls)} 'Live Now' stream(s) for {s['name']}")
-            else:
-                print(f"⚠️ No valid 'Live Now' streams for {s['name']}")
-            url_map[key] = urls
+        await page.close()
+        url_map.update(await resolve_streams(context, live_now_streams, label="'Live Now' ", inflight=inflight))
         streams.extend(live_now_streams)
-
-        await browser.close()
+    CACHE.save()
+    CACHE.print_report("PPV: ")
+    BLOCKER.print_summary("PPV: ")
+    TIERS.print_report()
+    await TRACER.flush()
+    TRACER.print_summary()
 
     print("\n💾 Writing final playlist to PPVLand.m3u8 ...")
     playlist = build_m3u(streams, url_map)
@@ -0,0 +1,71 @@
+import json
+import os
+import shutil
+
+# Per-site browser profiles are kept under this directory when it is set, e.g.
+# BROWSER_PROFILE_DIR=.cache/profiles; unset means every run starts empty.
+PROFILE_ROOT = os.environ.get("BROWSER_PROFILE_DIR")
+STATE_FILE = "storage_state.json"
+# Left behind by older runs that launched a browser per profile; nothing uses it now.
+LEGACY_USER_DATA_DIR = "user-data"
+
+
+class BrowserProfile:
+    """One site's persisted cookies and localStorage, as a Playwright storage-state file.
+
+    Contexts on the shared browser are seeded from it and write it back when
+    they close. Several contexts may use one profile at once: each reads the
+    file as it opens, and saves replace it atomically, so the last one to
+    close wins and nobody ever reads a half-written file.
+    """
+
+    def __init__(self, site, root=PROFILE_ROOT):
+        self.site = site
+        self.path = os.path.join(root, site)
+        self.state_path = os.path.join(self.path, STATE_FILE)
+
+    def storage_state(self):
+        """Path of a valid storage-state file, or None.
+
+        A file that exists but cannot be parsed is removed, so the next save
+        starts clean; a missing file is simply a first run.
+        """
+        legacy = os.path.join(self.path, LEGACY_USER_DATA_DIR)
+        if os.path.isdir(legacy):
+            shutil.rmtree(legacy, ignore_errors=True)
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except OSError:
+            return None
+        except ValueError:
+            state = None
+        if not isinstance(state, dict) or not isinstance(state.get("cookies"), list):
+            print(f"🧹 Dropping unreadable {self.site} storage state")
+            try:
+                os.remove(self.state_path)
+            except OSError:
+                pass
+            return None
+        return self.state_path
+
+    async def save_state(self, context):
+        try:
+            state = await context.storage_state()
+            os.makedirs(self.path, exist_ok=True)
+            tmp = f"{self.state_path}.{os.getpid()}.{id(context)}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_path)
+        except Exception as e:
+            print(f"⚠️ Could not save {self.site} storage state: {e}")
+
+
+def open_profile(site, root=None):
+    """Returns the BrowserProfile for `site`, or None when profiles are disabled."""
+    if isinstance(site, BrowserProfile):
+        return site
+    root = root or PROFILE_ROOT
+    if not site or not root:
+        return None
+    return BrowserProfile(site, root)
@@ -0,0 +1,195 @@
+"""Decides when each playlist actually needs to be scraped again.
+
+    python refresh_scheduler.py                 # table of every source and when it is due
+    python refresh_scheduler.py due fstv        # prints due=true/false (also to $GITHUB_OUTPUT)
+    python refresh_scheduler.py mark fstv       # record that fstv was just scraped
+    python refresh_scheduler.py run             # scrape every source that is due, then mark it
+
+A source is due when its signed links are about to expire (the earliest
+EXPIRY_QUANTILE of them, minus LEAD_SECONDS), or when its own interval has
+passed. Each run that leaves the playlist unchanged doubles that interval up
+to the source's maximum; a run that changes it resets the interval.
+"""
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+from url_expiry import token_expiry
+
+STATE_FILE = os.environ.get("REFRESH_STATE_FILE", os.path.join(".cache", "refresh_state.json"))
+MIN_INTERVAL = int(os.environ.get("REFRESH_MIN_INTERVAL", "900"))
+LEAD_SECONDS = int(os.environ.get("REFRESH_LEAD_SECONDS", "600"))
+# Refresh before this share of a playlist's signed links has expired...
+EXPIRY_QUANTILE = float(os.environ.get("REFRESH_EXPIRY_QUANTILE", "0.1"))
+# ...as long as signed links make up at least this share of its entries.
+TOKEN_SHARE = float(os.environ.get("REFRESH_TOKEN_SHARE", "0.2"))
+
+HOUR = 3600
+# name: (playlist, script, base interval, max interval)
+SOURCES = {
+    "fstv": ("FSTV24.m3u8", "fstv.py", 2 * HOUR, 12 * HOUR),
+    "thetvapp": ("TheTVApp.m3u8", "tv.py", 2 * HOUR, 12 * HOUR),
+    "ppv": ("PPVLand.m3u8", "ppv.py", 1 * HOUR, 6 * HOUR),
+    "webcast": ("SportsWebcast.m3u8", "webcast.py", 1 * HOUR, 6 * HOUR),
+    "pixelsport": ("Pixelsports.m3u8", "pixelsport.py", 1 * HOUR, 6 * HOUR),
+    "rox": ("Roxiestreams.m3u8", "rox.py", 1 * HOUR, 6 * HOUR),
+    "tvpass": ("TVPass.m3u", "tvpass.py", 2 * HOUR, 24 * HOUR),
+    "merged": ("MergedPlaylist.m3u8", "iptv.py", 2 * HOUR, 24 * HOUR),
+    "mergeclean": ("MergedCleanPlaylist.m3u8", "mergeclean.py", 2 * HOUR, 24 * HOUR),
+    "drewlivemerge": ("DrewLiveMergedPlaylist.m3u8", "drewlivemerge.py", 2 * HOUR, 24 * HOUR),
+    "aria": ("AriaPlus.m3u8", "aria.py", 24 * HOUR, 7 * 24 * HOUR),
+    "japan": ("JapanTV.m3u8", "japan.py", 24 * HOUR, 7 * 24 * HOUR),
+    "madtitan": ("MadTitan.m3u8", "madtitan.py", 24 * HOUR, 7 * 24 * HOUR),
+}
+
+
+def load_state():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE) or ".", exist_ok=True)
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def read_playlist(path):
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            return f.read().splitlines()
+    except OSError:
+        return []
+
+
+def playlist_hash(lines):
+    # The header carries an "Updated" timestamp on some playlists; ignore it.
+    body = "\n".join(l for l in lines if not l.startswith("#EXTM3U"))
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+
+def last_updated(path):
+    """When the playlist was last written: its last commit, else the file's mtime."""
+    try:
+        out = subprocess.run(["git", "log", "-1", "--format=%ct", "--", path],
+                             capture_output=True, text=True, timeout=10).stdout.strip()
+        if out:
+            return int(out)
+    except (OSError, subprocess.SubprocessError, ValueError):
+        pass
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+def plan(name, state=None, now=None):
+    """When `name` is next due, and why."""
+    playlist, _script, base, _max = SOURCES[name]
+    now = time.time() if now is None else now
+    entry = (state or {}).get(name, {})
+    urls = [l.strip() for l in read_playlist(playlist) if l.strip().startswith("http")]
+    expiries = sorted(e for e in (token_expiry(u) for u in urls) if e)
+    last_run = entry.get("last_run") or last_updated(playlist)
+    interval = entry.get("interval", base)
+
+    next_due, reason = last_run + interval, f"interval {interval / HOUR:.1f} h"
+    if urls and len(expiries) / len(urls) >= TOKEN_SHARE:
+        earliest = expiries[min(len(expiries) - 1, int(len(expiries) * EXPIRY_QUANTILE))] - LEAD_SECONDS
+        if earliest < next_due:
+            next_due, reason = earliest, f"{len(expiries)}/{len(urls)} signed links expiring"
+    if not urls:
+        next_due, reason = now, "playlist empty or missing"
+    next_due = max(next_due, last_run + MIN_INTERVAL)
+    return {
+        "name": name,
+        "entries": len(urls),
+        "signed": len(expiries),
+        "earliest_expiry": expiries[0] if expiries else None,
+        "last_run": last_run,
+        "next_due": next_due,
+        "due": next_due <= now,
+        "reason": reason,
+    }
+
+
+def mark(name, state, now=None):
+    """Records a finished scrape and adapts the source's interval."""
+    playlist, _script, base, max_interval = SOURCES[name]
+    now = time.time() if now is None else now
+    entry = state.get(name, {})
+    digest = playlist_hash(read_playlist(playlist))
+    if entry.get("hash") == digest:
+        interval = min(entry.get("interval", base) * 2, max_interval)
+    else:
+        interval = base
+    state[name] = {"last_run": now, "interval": interval, "hash": digest}
+    return state[name]
+
+
+def _fmt(ts, now):
+    if ts is None:
+        return "-"
+    minutes = (ts - now) / 60
+    return f"{minutes:+.0f} min"
+
+
+def print_table(state, now):
+    print(f"{'source':<14} {'entries':>7} {'signed':>6} {'expiry':>10} {'next due':>10}  reason")
+    for name in SOURCES:
+        p = plan(name, state, now)
+        flag = "⏰" if p["due"] else "  "
+        print(f"{flag}{name:<12} {p['entries']:>7} {p['signed']:>6} {_fmt(p['earliest_expiry'], now):>10} "
+              f"{_fmt(p['next_due'], now):>10}  {p['reason']}")
+
+
+def write_output(key, value):
+    path = os.environ.get("GITHUB_OUTPUT")
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(f"{key}={value}\n")
+
+
+def main(argv):
+    state = load_state()
+    now = time.time()
+    command = argv[0] if argv else "status"
+
+    if command == "status":
+        print_table(state, now)
+    elif command == "due":
+        p = plan(argv[1], state, now)
+        print(f"{argv[1]}: {'due' if p['due'] else 'not due'} ({p['reason']}, next {_fmt(p['next_due'], now)})")
+        print(f"due={'true' if p['due'] else 'false'}")
+        write_output("due", "true" if p["due"] else "false")
+    elif command == "mark":
+        entry = mark(argv[1], state, now)
+        save_state(state)
+        print(f"{argv[1]}: marked, next interval {entry['interval'] / HOUR:.1f} h")
+    elif command == "run":
+        for name in SOURCES:
+            p = plan(name, state, now)
+            if not p["due"]:
+                continue
+            print(f"▶️ {name}: {p['reason']}")
+            result = subprocess.run([sys.executable, SOURCES[name][1]])
+            if result.returncode == 0:
+                mark(name, state)
+                save_state(state)
+            else:
+                print(f"❌ {name} exited with {result.returncode}; it stays due")
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
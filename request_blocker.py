@@ -0,0 +1,144 @@
+import re
+
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font")
+DEFAULT_BLOCKED_DOMAINS = (
+    "googlesyndication", "doubleclick", "adservice", "adroll", "google-analytics",
+    "googletagmanager", "googletagservices", "adsterra", "popads", "popcash",
+    "propellerads", "exoclick", "juicyads", "hotjar", "histats", "disqus",
+)
+# Video/audio segments fetched by hls.js come through as xhr/fetch, not "media".
+DEFAULT_BLOCKED_PATTERNS = (r"\.(ts|m4s|aac|mp4)(\?|$)",)
+# Requests the scrapers read the stream URL from; these always go through.
+# An entry is a token, or a tuple of tokens that must all appear (the ping
+# beacon carries mu= anywhere in its query, as tv and fast_resolver parse it).
+ALWAYS_ALLOW = (".m3u8", ("ping.gif", "mu="))
+
+# Nothing is downloaded for an aborted request, so "bytes saved" is an estimate
+# from typical sizes per resource type.
+ESTIMATED_BYTES = {
+    "image": 40_000,
+    "media": 1_500_000,
+    "font": 60_000,
+    "script": 80_000,
+    "stylesheet": 30_000,
+    "xhr": 500_000,
+    "fetch": 500_000,
+}
+DEFAULT_ESTIMATED_BYTES = 20_000
+# Closed pages are folded into totals; only this many of the busiest keep their own line.
+BUSIEST_KEPT = 5
+
+
+class PageBlockStats:
+    def __init__(self, url=""):
+        self.url = url
+        self.blocked = 0
+        self.bytes_saved = 0
+        self.allowed = 0
+
+
+class RequestBlocker:
+    """Aborts ads, trackers and heavy resources while letting stream URLs through.
+
+    Attach it to a context (or a single page) with `await blocker.attach(target)`.
+    Blocked requests and estimated bytes saved are tallied per open page; when
+    a page closes its tally is folded into the totals, so long runs do not
+    keep every page they ever opened.
+    """
+
+    def __init__(self, blocked_types=DEFAULT_BLOCKED_TYPES, blocked_domains=DEFAULT_BLOCKED_DOMAINS,
+                 blocked_patterns=DEFAULT_BLOCKED_PATTERNS, blocked_keywords=(), allow=ALWAYS_ALLOW):
+        self.blocked_types = set(blocked_types)
+        self.blocked_domains = tuple(blocked_domains)
+        self.blocked_keywords = tuple(blocked_keywords)
+        self.blocked_patterns = re.compile("|".join(blocked_patterns), re.IGNORECASE) if blocked_patterns else None
+        self.allow = tuple((rule,) if isinstance(rule, str) else tuple(rule) for rule in allow)
+        self.pages = {}
+        self.closed_pages = 0
+        self.closed_blocked = 0
+        self.closed_bytes_saved = 0
+        self.busiest = []
+
+    async def attach(self, target):
+        await target.route("**/*", self.handle_route)
+
+    def should_block(self, url, resource_type):
+        url = url.lower()
+        if any(all(token in url for token in rule) for rule in self.allow):
+            return False
+        if resource_type in self.blocked_types:
+            return True
+        if any(domain in url for domain in self.blocked_domains):
+            return True
+        if any(keyword in url for keyword in self.blocked_keywords):
+            return True
+        return bool(self.blocked_patterns and self.blocked_patterns.search(url))
+
+    def stats_for(self, page):
+        """The live tally for `page`; keep the returned object to read it after the page closes."""
+        stats = self.pages.get(page)
+        if stats is not None:
+            return stats
+        stats = PageBlockStats()
+        if page is None:
+            self.pages[None] = stats
+        else:
+            try:
+                if page.is_closed():
+                    return stats
+                page.on("close", lambda _page: self._page_closed(page))
+            except Exception:
+                return stats
+            self.pages[page] = stats
+        return stats
+
+    def _page_closed(self, page):
+        stats = self.pages.pop(page, None)
+        if stats is None:
+            return
+        self.closed_pages += 1
+        self.closed_blocked += stats.blocked
+        self.closed_bytes_saved += stats.bytes_saved
+        if stats.blocked:
+            self.busiest = sorted(self.busiest + [stats], key=lambda s: s.blocked, reverse=True)[:BUSIEST_KEPT]
+
+    def _page_stats(self, request):
+        try:
+            page = request.frame.page
+        except Exception:
+            # Service worker requests have no frame.
+            return self.stats_for(None)
+        stats = self.stats_for(page)
+        if page.url and page.url != "about:blank":
+            stats.url = page.url
+        return stats
+
+    async def handle_route(self, route):
+        request = route.request
+        stats = self._page_stats(request)
+        try:
+            if self.should_block(request.url, request.resource_type):
+                stats.blocked += 1
+                stats.bytes_saved += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+                await route.abort()
+            else:
+                stats.allowed += 1
+                # Hands over to any earlier handler (e.g. HAR replay), else the network.
+                await route.fallback()
+        except Exception:
+            # The page went away while the request was in flight.
+            pass
+
+    def totals(self):
+        blocked = self.closed_blocked + sum(s.blocked for s in self.pages.values())
+        saved = self.closed_bytes_saved + sum(s.bytes_saved for s in self.pages.values())
+        return blocked, saved
+
+    def print_summary(self, label="", top=BUSIEST_KEPT):
+        blocked, saved = self.totals()
+        pages = self.closed_pages + len(self.pages)
+        print(f"🛡️ {label}Blocked {blocked} requests across {pages} pages (~{saved / 1_048_576:.1f} MB saved)")
+        busiest = sorted([*self.pages.values(), *self.busiest], key=lambda s: s.blocked, reverse=True)[:top]
+        for stats in busiest:
+            if stats.blocked:
+                print(f"   {stats.blocked:>5} blocked, ~{stats.bytes_saved / 1024:.0f} KB  {stats.url or '(no url)'}")
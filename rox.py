@@ -4,6 +4,7 @@ from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from requests.exceptions import RequestException
 import logging
+from matcher import KeywordMatcher
 
 BASE_URL = "https://roxiestreams.live"
 
@@ -102,19 +103,18 @@ def check_stream_status(m3u8_url):
     except RequestException:
         return False
 
+TV_MATCHER = KeywordMatcher(TV_INFO.items(), default=TV_INFO["misc"])
+
 def get_tv_info(url):
-    url_lower = url.lower()
-    for key, (tvgid, logo, group_name) in TV_INFO.items():
-        if key in url_lower:
-            return tvgid, logo, group_name
-    return TV_INFO["misc"]
+    return TV_MATCHER.match(url.lower())
 
 def main():
+    """Writes Roxiestreams.m3u8; returns False when nothing was scraped or written."""
     playlist_lines = ["#EXTM3U"]
     sections = list(discover_sections(BASE_URL))
     if not sections:
         logging.error("No sections discovered.")
-        return
+        return False
     logging.info(f"Found {len(sections)} sections. Scraping for events...")
     for section_url, section_title in sections:
         logging.info(f"\n--- Processing Section: {section_title} ({section_url}) ---")
@@ -144,6 +144,7 @@ def main():
         logging.info(f"Total valid streams found: {(len(playlist_lines) - 1) // 2}")
     except IOError as e:
         logging.error(f"Failed to write file {output_filename}: {e}")
+        return False
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,72 @@
+import json
+import os
+import time
+
+from url_expiry import token_expiry
+
+CACHE_DIR = os.environ.get("STREAM_CACHE_DIR", ".cache")
+# Entries this close to expiring are treated as expired, so a run never
+# publishes a link that dies before the next one. Never more than half an
+# entry's lifetime, so short-lived links are still reused.
+EXPIRY_MARGIN = int(os.environ.get("STREAM_CACHE_MARGIN", "600"))
+
+
+class StreamCache:
+    """Persisted map from a page key (iframe, channel href...) to its stream URLs.
+
+    An entry expires at the soonest expiry token in its URLs (see
+    url_expiry.py), or after `ttl` when none of them carries one. A missing or
+    corrupt file starts empty.
+    """
+
+    def __init__(self, name, directory=None, margin=EXPIRY_MARGIN):
+        self.path = os.path.join(directory or CACHE_DIR, f"{name}.json")
+        self.margin = margin
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        self.entries = entries if isinstance(entries, dict) else {}
+
+    def save(self):
+        now = time.time()
+        self.entries = {k: v for k, v in self.entries.items() if v.get("expires_at", 0) > now}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def get(self, key, now=None):
+        """The live entry for `key`, or None when it is missing or close to expiring."""
+        entry = self.entries.get(key)
+        now = time.time() if now is None else now
+        if not entry:
+            return None
+        expires_at = entry.get("expires_at", 0)
+        margin = min(self.margin, (expires_at - entry.get("resolved_at", expires_at)) / 2)
+        if expires_at - margin > now:
+            return entry
+        return None
+
+    def put(self, key, urls, ttl, now=None, **extra):
+        now = time.time() if now is None else now
+        expiries = [expiry for expiry in map(token_expiry, urls) if expiry is not None]
+        expires_at = min(expiries) if expiries else now + ttl
+        self.entries[key] = {"urls": list(urls), "resolved_at": now, "expires_at": expires_at, **extra}
+        return self.entries[key]
+
+    def drop(self, key):
+        self.entries.pop(key, None)
+
+    def print_report(self, label=""):
+        total = self.hits + self.misses
+        if total:
+            print(f"♻️ {label}Stream cache: {self.hits}/{total} reused without a browser ({self.path})")
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+
+def m3u8_only(url):
+    return url if ".m3u8" in url else None
+
+
+class StreamCapture:
+    """Listens on a page and resolves as soon as the first matching URL shows up.
+
+    `extract` maps a response (or request) URL to the stream URL, or None to
+    ignore it. Every distinct match is kept in `urls`, in arrival order.
+    """
+
+    def __init__(self, page, extract=m3u8_only, event="response", on_match=None):
+        self.page = page
+        self.extract = extract
+        self.event = event
+        self.on_match = on_match
+        self.urls = []
+        self.future = asyncio.get_running_loop().create_future()
+        page.on(event, self._handle)
+
+    def _handle(self, message):
+        url = self.extract(message.url)
+        if not url or url in self.urls:
+            return
+        self.urls.append(url)
+        if self.on_match:
+            self.on_match(url)
+        if not self.future.done():
+            self.future.set_result(url)
+
+    @property
+    def first(self):
+        return self.urls[0] if self.urls else None
+
+    async def wait(self, timeout):
+        """Returns the first captured URL, or None once `timeout` seconds pass."""
+        if self.future.done():
+            return self.future.result()
+        try:
+            return await asyncio.wait_for(asyncio.shield(self.future), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        try:
+            self.page.remove_listener(self.event, self._handle)
+        except Exception:
+            pass
+        if not self.future.done():
+            self.future.cancel()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RateLimiter:
+    """Token bucket spacing page loads out to `rate` per second, allowing `burst` at once."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def __aenter__(self):
+        await self.wait()
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
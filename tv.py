@@ -1,13 +1,37 @@
 import asyncio
+import os
 import urllib.parse
-import random
 from pathlib import Path
+import aiohttp
 from datetime import datetime
-from playwright.async_api import async_playwright
+from browser_pool import shared_or_new
+from request_blocker import RequestBlocker
+from stream_capture import RateLimiter, StreamCapture
+from fast_resolver import TierStats, first_reachable, resolve_tiered
+from page_trace import Tracer
+from stream_cache import StreamCache
 
 M3U8_FILE = "TheTVApp.m3u8"
 BASE_URL = "https://thetvapp.to"
 CHANNEL_LIST_URL = f"{BASE_URL}/tv"
+BLOCKER = RequestBlocker()
+
+# A page resolves as soon as its stream shows up; CAPTURE_TIMEOUT is only the
+# upper bound. Page loads are paced by the limiter instead of fixed sleeps.
+CAPTURE_TIMEOUT = 5
+NAV_LIMITER = RateLimiter(rate=float(os.environ.get("TV_PAGES_PER_SECOND", "3")), burst=4)
+# Pages open at once for the /tv channel list, sections walked at once, and
+# links open at once inside each section.
+CHANNEL_CONCURRENCY = int(os.environ.get("TV_CHANNEL_CONCURRENCY", "4"))
+SECTION_CONCURRENCY = int(os.environ.get("TV_SECTION_CONCURRENCY", "3"))
+LINK_CONCURRENCY = int(os.environ.get("TV_LINK_CONCURRENCY", "2"))
+TIERS = TierStats("TheTVApp")
+# Channel href → current stream URL and its expiry, kept between runs so only
+# channels whose link is missing, near expiry or failing get scraped again.
+CHANNEL_STATE = StreamCache("thetvapp_channels")
+CHANNEL_TTL = int(os.environ.get("TV_CHANNEL_TTL", str(6 * 3600)))
+CHECK_CONCURRENCY = int(os.environ.get("TV_CHECK_CONCURRENCY", "16"))
+TRACER = Tracer("TheTVApp", blocker=BLOCKER)
 
 SECTIONS_TO_APPEND = {
     "/nba": "NBA",
@@ -42,34 +66,55 @@ def extract_real_m3u8(url: str):
         return url
     return None
 
-async def scrape_single_tv(context, href, title_raw):
-    full_url = BASE_URL + href
-    title = " - ".join(line.strip() for line in title_raw.splitlines() if line.strip())
-    title = title.replace(",", "")
-    stream_url = None
-    page = await context.new_page()
+async def scrape_stream_page(context, session, full_url, label, title):
+    async def pick(urls):
+        return await first_reachable(session, urls, referer=BASE_URL + "/")
 
-    async def handle_response(response):
-        nonlocal stream_url
-        real = extract_real_m3u8(response.url)
-        if real and not stream_url:
-            stream_url = real
-            print(f"✅ [TV] {title} → {real}")
+    stream_url = await resolve_tiered(
+        session, full_url, lambda: capture_stream_in_browser(context, full_url, label, title), TIERS, pick=pick
+    )
+    if stream_url:
+        print(f"✅ [{label}] {title} → {stream_url}")
+    return stream_url
 
-    page.on("response", handle_response)
+async def capture_stream_in_browser(context, full_url, label, title):
+    page = await context.new_page()
+    capture = StreamCapture(page, extract_real_m3u8)
+    trace = TRACER.start(page, full_url, label)
+    stream_url = None
     try:
-        await page.goto(full_url, wait_until="domcontentloaded", timeout=60000)
-        await asyncio.sleep(random.uniform(2.8, 3.5))
+        with trace.phase("rate_limit"):
+            await NAV_LIMITER.wait()
+        with trace.phase("navigation"):
+            await page.goto(full_url, wait_until="domcontentloaded", timeout=60000)
+        with trace.phase("capture_wait"):
+            stream_url = await capture.wait(CAPTURE_TIMEOUT)
     except Exception as e:
-        print(f"⚠️ Failed {title}: {e}")
-    await page.close()
+        print(f"⚠️ {label} page failed for {title}: {e}")
+        stream_url = capture.first
+        if not stream_url:
+            trace.outcome = "error"
+    finally:
+        trace.finish(trace.outcome or ("ok" if stream_url else "miss"))
+        capture.close()
+        await page.close()
     return stream_url
 
-async def scrape_tv_urls():
-    urls = []
-    async with async_playwright() as p:
-        browser = await p.firefox.launch(headless=True)
-        context = await browser.new_context()
+def clean_title(title_raw):
+    title = " - ".join(line.strip() for line in title_raw.splitlines() if line.strip())
+    return title.replace(",", "")
+
+async def scrape_single_tv(context, session, href, title_raw):
+    return await scrape_stream_page(context, session, BASE_URL + href, "TV", clean_title(title_raw))
+
+def stream_key(url):
+    """The stream's path (e.g. /hls/AEEast/tracks-v1a1/mono.m3u8); host and token change between scrapes."""
+    return urllib.parse.urlsplit(url.strip()).path
+
+async def scrape_tv_urls(pool=None):
+    """Refreshes the channels that need it and returns {stream_key: url} for every known channel."""
+    async with shared_or_new(pool, "firefox") as pool, pool.context(blocker=BLOCKER, profile="thetvapp-channels", har="thetvapp-channels") as context, \
+            aiohttp.ClientSession() as session:
         page = await context.new_page()
         print("🔄 Loading /tv channel list...")
         await page.goto(CHANNEL_LIST_URL, wait_until="domcontentloaded", timeout=60000)
@@ -80,15 +125,38 @@ async def scrape_tv_urls():
         ]
         await page.close()
 
-        for idx, (href, title_raw) in enumerate(hrefs_and_titles, 1):
-            stream = await scrape_single_tv(context, href, title_raw)
+        check_semaphore = asyncio.Semaphore(CHECK_CONCURRENCY)
+
+        async def needs_refresh(href):
+            entry = CHANNEL_STATE.get(href)
+            if not entry:
+                return True
+            async with check_semaphore:
+                return await first_reachable(session, entry["urls"], referer=BASE_URL + "/") is None
+
+        stale_flags = await asyncio.gather(*(needs_refresh(href) for href, _title in hrefs_and_titles))
+        stale = [channel for channel, is_stale in zip(hrefs_and_titles, stale_flags) if is_stale]
+        print(f"🔁 Refreshing {len(stale)}/{len(hrefs_and_titles)} channels; the rest are still valid")
+
+        semaphore = asyncio.Semaphore(CHANNEL_CONCURRENCY)
+
+        async def scrape_bounded(href, title_raw):
+            async with semaphore:
+                return await scrape_single_tv(context, session, href, title_raw)
+
+        streams = await asyncio.gather(*(scrape_bounded(href, title_raw) for href, title_raw in stale))
+        for (href, title_raw), stream in zip(stale, streams):
             if stream:
-                urls.append(stream)
-            if idx % 10 == 0:
-                print("⏳ Cooling down Firefox after 10 pages...")
-                await asyncio.sleep(random.uniform(3.0, 4.5))
+                CHANNEL_STATE.put(href, [stream], CHANNEL_TTL, title=clean_title(title_raw))
+            else:
+                CHANNEL_STATE.drop(href)
+        CHANNEL_STATE.save()
 
-        await browser.close()
+    urls = {}
+    for href, _title in hrefs_and_titles:
+        entry = CHANNEL_STATE.entries.get(href)
+        if entry:
+            urls[stream_key(entry["urls"][0])] = entry["urls"][0]
     return urls
 
 def clean_m3u_header(lines):
@@ -100,13 +168,12 @@ def clean_m3u_header(lines):
     )
     return lines
 
-def replace_urls_only(lines, new_urls):
+def replace_urls_by_key(lines, urls_by_key):
+    """Swaps each stream line for the fresh URL of the same stream; unknown lines stay as they are."""
     replaced = []
-    url_idx = 0
     for line in lines:
-        if line.strip().startswith("http") and url_idx < len(new_urls):
-            replaced.append(new_urls[url_idx])
-            url_idx += 1
+        if line.strip().startswith("http"):
+            replaced.append(urls_by_key.get(stream_key(line), line))
         else:
             replaced.append(line)
     return replaced
@@ -148,69 +215,74 @@ def replace_sports_section(lines, sports_urls):
         cleaned.append(url)
     return cleaned
 
-async def scrape_all_sports_sections():
+async def scrape_sports_section(context, session, section_path, group_name, link_semaphore):
+    section_urls = []
+    try:
+        page = await context.new_page()
+        section_url = BASE_URL + section_path
+        print(f"\n📁 Loading section: {section_url}")
+        await page.goto(section_url, wait_until="domcontentloaded", timeout=60000)
+        links = await page.locator("ol.list-group a").all()
+        entries = []
+        for link in links:
+            href = await link.get_attribute("href")
+            title_raw = await link.text_content()
+            if href and title_raw:
+                entries.append((href, clean_title(title_raw)))
+        await page.close()
+
+        async def scrape_bounded(href, title):
+            async with link_semaphore:
+                return await scrape_stream_page(context, session, BASE_URL + href, group_name, title)
+
+        streams = await asyncio.gather(*(scrape_bounded(href, title) for href, title in entries))
+        for (href, title), stream_url in zip(entries, streams):
+            if stream_url:
+                section_urls.append((stream_url, group_name, title))
+    except Exception as e:
+        print(f"⚠️ Skipped {group_name}: {e}")
+    return section_urls
+
+async def scrape_all_sports_sections(pool=None):
     all_urls = []
-    async with async_playwright() as p:
-        browser = await p.firefox.launch(headless=True)
-        context = await browser.new_context()
-        for section_path, group_name in SECTIONS_TO_APPEND.items():
-            try:
-                page = await context.new_page()
-                section_url = BASE_URL + section_path
-                print(f"\n📁 Loading section: {section_url}")
-                await page.goto(section_url, wait_until="domcontentloaded", timeout=60000)
-                links = await page.locator("ol.list-group a").all()
-                for idx, link in enumerate(links, 1):
-                    href = await link.get_attribute("href")
-                    title_raw = await link.text_content()
-                    if not href or not title_raw:
-                        continue
-                    title = " - ".join(line.strip() for line in title_raw.splitlines() if line.strip())
-                    title = title.replace(",", "")
-                    full_url = BASE_URL + href
-                    stream_url = None
-                    sub = await context.new_page()
-
-                    async def handle_response(response):
-                        nonlocal stream_url
-                        real = extract_real_m3u8(response.url)
-                        if real and not stream_url:
-                            stream_url = real
-                            print(f"✅ [{group_name}] {title} → {real}")
-
-                    sub.on("response", handle_response)
-                    try:
-                        await sub.goto(full_url, wait_until="domcontentloaded", timeout=60000)
-                        await asyncio.sleep(random.uniform(2.8, 3.5))
-                    except Exception as e:
-                        print(f"⚠️ {group_name} page failed: {e}")
-                    await sub.close()
-                    if stream_url:
-                        all_urls.append((stream_url, group_name, title))
-                    if idx % 8 == 0:
-                        print("⏳ Cooling down Firefox to sync responses...")
-                        await asyncio.sleep(random.uniform(3.0, 4.5))
-                await page.close()
-            except Exception as e:
-                print(f"⚠️ Skipped {group_name}: {e}")
-                continue
-        await browser.close()
+    async with shared_or_new(pool, "firefox") as pool, pool.context(blocker=BLOCKER, profile="thetvapp-sports", har="thetvapp-sports") as context, \
+            aiohttp.ClientSession() as session:
+        section_semaphore = asyncio.Semaphore(SECTION_CONCURRENCY)
+
+        async def scrape_section(section_path, group_name):
+            # Each section gets its own link budget so one long section can't starve the rest.
+            async with section_semaphore:
+                return await scrape_sports_section(
+                    context, session, section_path, group_name, asyncio.Semaphore(LINK_CONCURRENCY)
+                )
+
+        results = await asyncio.gather(*(
+            scrape_section(section_path, group_name) for section_path, group_name in SECTIONS_TO_APPEND.items()
+        ))
+        for section_urls in results:
+            all_urls.extend(section_urls)
     return all_urls
 
-async def main():
+async def main(pool=None):
+    """Refreshes M3U8_FILE in place; returns False when there is no playlist to update."""
     if not Path(M3U8_FILE).exists():
         print(f"❌ File not found: {M3U8_FILE}")
-        return
+        return False
     lines = Path(M3U8_FILE).read_text(encoding="utf-8").splitlines()
     lines = clean_m3u_header(lines)
-    print("🔧 Updating TV URLs only...")
-    new_urls = await scrape_tv_urls()
+    print("🔧 Scraping TV channels and sports sections together...")
+    async with shared_or_new(pool, "firefox") as pool:
+        new_urls, sports_urls = await asyncio.gather(scrape_tv_urls(pool), scrape_all_sports_sections(pool))
+    BLOCKER.print_summary("TheTVApp: ")
+    TIERS.print_report()
+    await TRACER.flush()
+    TRACER.print_summary()
+    print("🔧 Updating TV URLs by channel...")
     if new_urls:
-        lines = replace_urls_only(lines, new_urls)
+        lines = replace_urls_by_key(lines, new_urls)
     print("🧹 Removing SD entries...")
     lines = remove_sd_entries(lines)
     print("⚽ Replacing Sports Sections...")
-    sports_urls = await scrape_all_sports_sections()
     if sports_urls:
         lines = replace_sports_section(lines, sports_urls)
     Path(M3U8_FILE).write_text("\n".join(lines), encoding="utf-8")
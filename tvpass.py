@@ -1,6 +1,9 @@
-import requests
+import calendar
 import re
-from datetime import datetime
+from datetime import date
+from functools import lru_cache
+
+import http_client
 
 UPSTREAM_URL = "http://tvpass.org/playlist/m3u"
 LOCAL_FILE = "TVPass.m3u"
@@ -36,35 +39,49 @@ LOCKED_GROUPS = {
     }
 }
 
-def extract_event_date(title):
-    patterns = [
-        r"(\d{4}-\d{2}-\d{2})",
-        r"(\d{1,2}/\d{1,2})",
-        r"([A-Za-z]+ \d{1,2})",
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, title)
-        if match:
-            try:
-                text = match.group(1)
-                for fmt in ("%Y-%m-%d", "%m/%d", "%B %d", "%b %d"):
-                    try:
-                        parsed = datetime.strptime(text, fmt)
-                        if "%Y" not in fmt:
-                            parsed = parsed.replace(year=datetime.now().year)
-                        return parsed.date()
-                    except ValueError:
-                        continue
-            except Exception:
-                continue
+# Tried in this order; the first match of each pattern is the only one considered.
+ISO_DATE_REGEX = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+SLASH_DATE_REGEX = re.compile(r"(\d{1,2})/(\d{1,2})")
+MONTH_DAY_REGEX = re.compile(r"([A-Za-z]+) (\d{1,2})")
+MONTHS = {name.lower(): i for names in (calendar.month_name, calendar.month_abbr) for i, name in enumerate(names) if name}
+
+def _valid(year, month, day):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+@lru_cache(maxsize=None)
+def _event_month_day(title):
+    """(year or None, month, day) of the date in `title`, or None.
+
+    Yearless dates are validated against 1900 like strptime does, so Feb 29
+    never counts as a date.
+    """
+    match = ISO_DATE_REGEX.search(title)
+    if match and _valid(*map(int, match.groups())):
+        return tuple(map(int, match.groups()))
+    match = SLASH_DATE_REGEX.search(title)
+    if match and _valid(1900, int(match.group(1)), int(match.group(2))):
+        return None, int(match.group(1)), int(match.group(2))
+    match = MONTH_DAY_REGEX.search(title)
+    if match:
+        month = MONTHS.get(match.group(1).lower())
+        if month and _valid(1900, month, int(match.group(2))):
+            return None, month, int(match.group(2))
     return None
 
-def is_event_outdated(title):
-    event_date = extract_event_date(title)
-    if event_date:
-        today = datetime.now().date()
-        return event_date < today
-    return False
+def extract_event_date(title, year=None):
+    parsed = _event_month_day(title)
+    if parsed is None:
+        return None
+    event_year, month, day = parsed
+    return date(event_year or year or date.today().year, month, day)
+
+def is_event_outdated(title, today=None):
+    today = today or date.today()
+    event_date = extract_event_date(title, today.year)
+    return event_date is not None and event_date < today
 
 def extract_title(extinf_line):
     return extinf_line.split(",")[-1].strip().lower()
@@ -84,12 +101,10 @@ def lock_metadata(meta_line, title):
         return f'#EXTINF:-1 tvg-id="{locked["tvg-id"]}" tvg-name="{title_cased}" tvg-logo="{locked["tvg-logo"]}" group-title="{display_group}",{title_cased}'
     return meta_line
 
-def fetch_upstream_pairs():
-    res = requests.get(UPSTREAM_URL, timeout=15)
-    res.raise_for_status()
-    lines = res.text.splitlines()
-    pairs = []
-    i = 0
+def read_entries(lines, today, start=0):
+    """(meta, url, title) for every entry that is neither live nor a past event."""
+    entries = []
+    i = start
     while i < len(lines):
         if lines[i].startswith("#EXTINF"):
             meta = lines[i].strip()
@@ -98,48 +113,36 @@ def fetch_upstream_pairs():
             if i < len(lines):
                 url = lines[i].strip()
                 title = extract_title(meta)
-                if group != "live" and not is_event_outdated(title):
-                    pairs.append((meta, url))
+                if group != "live" and not is_event_outdated(title, today):
+                    entries.append((meta, url, title))
         i += 1
-    return pairs
+    return entries
 
-def parse_local_playlist():
+def fetch_upstream_pairs(today=None):
+    lines = http_client.get_text(UPSTREAM_URL, timeout=15).splitlines()
+    return read_entries(lines, today or date.today())
+
+def parse_local_playlist(today=None):
     with open(LOCAL_FILE, "r", encoding="utf-8") as f:
         lines = f.read().splitlines()
 
     header = lines[0] if lines and lines[0].startswith("#EXTM3U") else "#EXTM3U"
-    pairs = []
-    i = 1
-    while i < len(lines):
-        if lines[i].startswith("#EXTINF"):
-            meta = lines[i].strip()
-            group = extract_group(meta).lower()
-            i += 1
-            if i < len(lines):
-                url = lines[i].strip()
-                title = extract_title(meta)
-                if group != "live" and not is_event_outdated(title):
-                    pairs.append((meta, url))
-        i += 1
-    return header, pairs
+    return header, read_entries(lines, today or date.today(), start=1)
 
-def update_playlist(local_pairs, upstream_pairs):
+def update_playlist(local_entries, upstream_entries):
+    """Local entries keep their place but take upstream's URL for the same title;
+    upstream titles not in the local playlist are appended in upstream order."""
+    upstream_urls = {title: url for _, url, title in upstream_entries}
     updated = []
     used_titles = set()
-    upstream_map = {extract_title(meta): url for meta, url in upstream_pairs}
-
-    for meta, url in local_pairs:
-        title = extract_title(meta)
-        if title in upstream_map:
-            new_url = upstream_map[title]
-            new_meta = lock_metadata(meta, title)
-            updated.append((new_meta, new_url))
+
+    for meta, url, title in local_entries:
+        if title in upstream_urls:
+            url = upstream_urls[title]
             used_titles.add(title)
-        else:
-            updated.append((lock_metadata(meta, title), url))
+        updated.append((lock_metadata(meta, title), url))
 
-    for meta, url in upstream_pairs:
-        title = extract_title(meta)
+    for meta, url, title in upstream_entries:
         if title not in used_titles:
             updated.append((lock_metadata(meta, title), url))
 
@@ -154,9 +157,10 @@ def write_playlist(header, updated_pairs):
     print(f"✅ Updated {LOCAL_FILE} with {len(updated_pairs)} total streams.")
 
 def main():
-    header, local_pairs = parse_local_playlist()
-    upstream_pairs = fetch_upstream_pairs()
-    updated_pairs = update_playlist(local_pairs, upstream_pairs)
+    today = date.today()
+    header, local_entries = parse_local_playlist(today)
+    upstream_entries = fetch_upstream_pairs(today)
+    updated_pairs = update_playlist(local_entries, upstream_entries)
     write_playlist(header, updated_pairs)
 
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+import base64
+import json
+import os
+import re
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+# Query parameters holding a plain Unix expiry time (seconds, or milliseconds).
+EXPIRY_PARAMS = {"expires", "expire", "expiry", "exp", "e", "validto"}
+# auth_key=<timestamp>-<rand>-<uid>-<hash> (CDN "type A" signing) carries the
+# signing time, not the expiry; the link stays valid for the CDN's TTL after it.
+AUTH_KEY_TTL = int(os.environ.get("URL_AUTH_KEY_TTL", "1800"))
+AKAMAI_EXP_REGEX = re.compile(r"(?:^|~)exp=(\d+)")
+
+
+def _timestamp(value):
+    if not value.isdigit():
+        return None
+    ts = int(value)
+    if ts > 10**12:
+        ts //= 1000
+    return ts if ts > 10**9 else None
+
+
+def _jwt_expiry(token):
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = parts[1] + "=" * (-len(parts[1]) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+    except (ValueError, AttributeError):
+        return None
+    return int(exp) if isinstance(exp, (int, float)) else None
+
+
+def token_expiry(url):
+    """Unix time a signed stream URL stops working, or None when it carries no expiry."""
+    expiries = []
+    for key, value in parse_qsl(urlsplit(url).query, keep_blank_values=True):
+        key = key.lower()
+        if key in EXPIRY_PARAMS:
+            ts = _timestamp(value)
+        elif key == "auth_key":
+            signed = _timestamp(value.split("-", 1)[0])
+            ts = signed + AUTH_KEY_TTL if signed else None
+        elif key in ("hdnts", "hdnea", "__token__"):
+            match = AKAMAI_EXP_REGEX.search(value)
+            ts = int(match.group(1)) if match else None
+        elif key in ("token", "jwt", "access_token"):
+            ts = _jwt_expiry(value)
+        else:
+            continue
+        if ts:
+            expiries.append(ts)
+    return min(expiries) if expiries else None
+
+
+def seconds_left(url, now=None):
+    """Seconds until `url` expires (negative once it has), or None if unknown."""
+    expiry = token_expiry(url)
+    if expiry is None:
+        return None
+    return expiry - (time.time() if now is None else now)
@@ -0,0 +1,298 @@
+"""Compact, normalized storage for the VOD library in DrewLiveVOD.json.
+
+    python vod_catalog.py pack DrewLiveVOD.json DrewLiveVOD.vod.jsonl.gz
+    python vod_catalog.py unpack DrewLiveVOD.vod.jsonl.gz DrewLiveVOD.json
+    python vod_catalog.py stats DrewLiveVOD.json
+
+The legacy file repeats every series-level field on every episode. The catalog
+is JSON Lines (gzipped when the name ends in .gz): one header line holding an
+interned string table and a series table, then one short array per episode
+that points into both. Episodes only carry the series fields they override,
+so the catalog can be streamed row by row or loaded and materialized lazily.
+"""
+import gzip
+import json
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+
+FORMAT = "drewlive-vod"
+VERSION = 1
+# Key order of a legacy DrewLiveVOD.json entry.
+LEGACY_FIELDS = ("stream_id", "name", "folder_url", "category_id", "tmdb_id", "plot", "rating",
+                 "rating_5based", "stream_icon", "backdrop_path", "genre_ids", "yt_trailer", "group_title")
+# Shared by every entry of a series; the tuple is also the series' identity.
+SERIES_KEY = ("tmdb_id", "category_id", "group_title", "backdrop_path", "genre_ids", "yt_trailer")
+# Usually shared, but some episodes carry their own (ep. plots, stills, ratings).
+SERIES_DEFAULTS = ("plot", "stream_icon", "rating", "rating_5based", "stream_id")
+# Series fields stored as indexes into the string table.
+INTERNED = {"group_title", "backdrop_path", "yt_trailer", "plot", "stream_icon"}
+
+# Characters read per step when streaming a legacy file.
+LEGACY_CHUNK = 1 << 16
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+Series = namedtuple("Series", SERIES_KEY + SERIES_DEFAULTS)
+
+
+def _open(path, mode, compressed=None):
+    if path.endswith(".gz") if compressed is None else compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class StringTable:
+    """Interns strings to small ints; None stays None."""
+
+    def __init__(self, strings=()):
+        self.strings = list(strings)
+        self._index = {s: i for i, s in enumerate(self.strings)}
+
+    def add(self, value):
+        if value is None:
+            return None
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def get(self, index):
+        return None if index is None else self.strings[index]
+
+
+class VodCatalog:
+    """The VOD library as a series table plus compact episode rows.
+
+    Rows are [series, name, folder, file, *overrides], where `folder` is the
+    interned directory of folder_url and overrides follow SERIES_DEFAULTS with
+    None meaning "same as the series" (trailing Nones are dropped) and false
+    meaning an explicit null. Rows are only turned into legacy dicts when an
+    episode is accessed.
+    """
+
+    def __init__(self, strings, series, rows):
+        self.strings = strings
+        self.series = series
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.materialize(self.rows[index])
+
+    def __iter__(self):
+        for row in self.rows:
+            yield self.materialize(row)
+
+    def materialize(self, row):
+        """The legacy dict for one episode row."""
+        series = self.series[row[0]]
+        values = series._asdict()
+        for field, override in zip(SERIES_DEFAULTS, row[4:]):
+            if override is False:
+                values[field] = None
+            elif override is not None:
+                values[field] = override
+        for field in INTERNED:
+            values[field] = self.strings.get(values[field])
+        values["name"] = row[1]
+        values["folder_url"] = None if row[3] is None else self.strings.get(row[2]) + row[3]
+        values["genre_ids"] = list(values["genre_ids"])
+        return {field: values[field] for field in LEGACY_FIELDS}
+
+    def to_legacy(self):
+        return list(self)
+
+    @classmethod
+    def from_legacy(cls, items):
+        strings = StringTable()
+        series, series_index, rows = [], {}, []
+        for item in items:
+            values = {field: item.get(field) for field in LEGACY_FIELDS}
+            for field in INTERNED:
+                values[field] = strings.add(values[field])
+            values["genre_ids"] = tuple(values["genre_ids"] or ())
+            key = tuple(values[field] for field in SERIES_KEY)
+            index = series_index.get(key)
+            if index is None:
+                index = series_index[key] = len(series)
+                series.append(Series(*key, *(values[field] for field in SERIES_DEFAULTS)))
+            defaults = series[index]
+            overrides = [_override(values[field], getattr(defaults, field)) for field in SERIES_DEFAULTS]
+            while overrides and overrides[-1] is None:
+                overrides.pop()
+            folder, filename = _split_url(values["folder_url"])
+            rows.append([index, values["name"], strings.add(folder), filename, *overrides])
+        return cls(strings, series, rows)
+
+    def header(self):
+        return {
+            "format": FORMAT,
+            "version": VERSION,
+            "episodes": len(self.rows),
+            "fields": list(SERIES_KEY + SERIES_DEFAULTS),
+            "strings": self.strings.strings,
+            "series": [list(s) for s in self.series],
+        }
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with _open(tmp, "w", compressed=path.endswith(".gz")) as f:
+            f.write(json.dumps(self.header(), ensure_ascii=False, separators=(",", ":")) + "\n")
+            for row in self.rows:
+                f.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with _open(path, "r") as f:
+            catalog = _read_header(f)
+            catalog.rows = [json.loads(line) for line in f if line.strip()]
+        return catalog
+
+
+def _override(value, default):
+    # 8 and 8.0 compare equal but must round-trip as written.
+    if value == default and type(value) is type(default):
+        return None
+    return False if value is None else value
+
+
+def _split_url(url):
+    """(directory with trailing slash, file name); directories repeat a lot."""
+    if url is None:
+        return None, None
+    folder, slash, filename = url.rpartition("/")
+    return folder + slash, filename
+
+
+def _read_header(f):
+    header = json.loads(f.readline())
+    if header.get("format") != FORMAT or header.get("version") != VERSION:
+        raise ValueError(f"not a {FORMAT} v{VERSION} catalog")
+    series = [Series(*s[:4], tuple(s[4]), *s[5:]) for s in header["series"]]
+    return VodCatalog(StringTable(header["strings"]), series, [])
+
+
+def iter_catalog(path):
+    """Streams legacy dicts from a catalog file without holding its rows."""
+    with _open(path, "r") as f:
+        catalog = _read_header(f)
+        for line in f:
+            if line.strip():
+                yield catalog.materialize(json.loads(line))
+
+
+def load_legacy(path):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return json.load(f)
+
+
+def iter_legacy(path, chunk_size=LEGACY_CHUNK):
+    """Streams the entries of a legacy JSON array, holding one chunk at a time."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        buf, pos, state = "", 0, "open"
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos == len(buf):
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise ValueError(f"{path}: unexpected end of legacy JSON array")
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            ch = buf[pos]
+            if state == "open":
+                if ch != "[":
+                    raise ValueError(f"{path}: legacy catalog is not a JSON array")
+                pos, state = pos + 1, "first"
+            elif state == "next":
+                if ch == "]":
+                    return
+                if ch != ",":
+                    raise ValueError(f"{path}: expected ',' or ']' at character {f.tell()}")
+                pos, state = pos + 1, "item"
+            elif state == "first" and ch == "]":
+                return
+            else:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                    after = _WHITESPACE.match(buf, end).end()
+                except json.JSONDecodeError:
+                    end = after = None
+                # Only trust an entry once its ',' or ']' is in the buffer: it may
+                # run past the chunk, and "2." decodes as 2 until the "5" arrives.
+                if end is None or after == len(buf) or buf[after] not in ",]":
+                    chunk = f.read(chunk_size)
+                    if chunk:
+                        buf, pos = buf[pos:] + chunk, 0
+                        continue
+                    if end is None:
+                        decoder.raw_decode(buf, pos)
+                yield item
+                pos, state = end, "next"
+
+
+def save_legacy(items, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(items, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_any(path):
+    """A VodCatalog from either a catalog file or a legacy DrewLiveVOD.json."""
+    if path.endswith(".json"):
+        return VodCatalog.from_legacy(load_legacy(path))
+    return VodCatalog.load(path)
+
+
+def iter_any(path):
+    """Legacy dicts from either format, streamed without loading the whole file."""
+    if path.endswith(".json"):
+        return iter_legacy(path)
+    return iter_catalog(path)
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def print_stats(path):
+    import tempfile
+    items, legacy_time = _timed(lambda: load_legacy(path))
+    catalog = VodCatalog.from_legacy(items)
+    assert catalog.to_legacy() == items, "catalog does not round-trip"
+    print(f"{len(items)} entries, {len(catalog.series)} series, {len(catalog.strings.strings)} interned strings")
+    print(f"{'legacy json':<22} {os.path.getsize(path) / 1024:9.0f} KiB  load {legacy_time * 1000:7.1f} ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("catalog.vod.jsonl", "catalog.vod.jsonl.gz"):
+            out = os.path.join(tmp, name)
+            catalog.save(out)
+            _, load_time = _timed(lambda: VodCatalog.load(out))
+            _, stream_time = _timed(lambda: sum(1 for _ in iter_catalog(out)))
+            print(f"{name:<22} {os.path.getsize(out) / 1024:9.0f} KiB  load {load_time * 1000:7.1f} ms  "
+                  f"stream+materialize {stream_time * 1000:7.1f} ms")
+
+
+def main(argv):
+    if len(argv) == 3 and argv[0] == "pack":
+        VodCatalog.from_legacy(load_legacy(argv[1])).save(argv[2])
+    elif len(argv) == 3 and argv[0] == "unpack":
+        save_legacy(list(iter_catalog(argv[1])), argv[2])
+    elif len(argv) == 2 and argv[0] == "stats":
+        print_stats(argv[1])
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,187 @@
+"""Writes the VOD M3U and a .strm bundle from DrewLiveVOD.json (or a catalog).
+
+    python vod_export.py                                   # vod/DrewLiveVOD.m3u8 + vod/strm/
+    python vod_export.py --source DrewLiveVOD.vod.jsonl.gz --out vod
+    python vod_export.py --m3u DrewLiveVOD.m3u8 --no-strm  # only regenerate the playlist
+
+Every output file is fingerprinted in <out>/.vod_manifest.json. A run only
+rewrites files whose content changed, removes files for titles that are gone,
+and writes everything through a temp file and rename, so a library-wide
+refresh touches the diff and nothing else.
+
+.strm layout: Movies/<title>.strm, XXX/<title>.strm and
+<Kind>/<Series>/Season NN/<episode>.strm for "DrewLive <Kind> - <Series>".
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+
+from vod_catalog import iter_any
+
+DEFAULT_SOURCE = "DrewLiveVOD.json"
+DEFAULT_OUT = "vod"
+MANIFEST = ".vod_manifest.json"
+TVG_IDS = {"DrewLive - XXX": "Adult.Section.Dummy.us", "DrewLive - VOD": "Movie.Dummy.us"}
+DEFAULT_TVG_ID = "24.7.Dummy.us"
+TOP_FOLDERS = {"VOD": "Movies"}
+EPISODE_REGEX = re.compile(r"\bS(\d{1,2})E\d{1,3}", re.IGNORECASE)
+UNSAFE_REGEX = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+
+def fingerprint(content):
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def safe_name(name):
+    return UNSAFE_REGEX.sub("", name).strip().rstrip(". ") or "untitled"
+
+
+def extinf(item):
+    group = item.get("group_title") or ""
+    return (f'#EXTINF:-1  tvg-name="{item["name"]}" tvg-id="{TVG_IDS.get(group, DEFAULT_TVG_ID)}" '
+            f'tvg-logo="{item.get("stream_icon") or ""}" group-title="{group}" radio="false",{item["name"]}')
+
+
+def split_group(group):
+    """("Cartoons", "South Park") for "DrewLive Cartoons - South Park"; movies have no kind."""
+    kind, _, series = (group or "").partition(" - ")
+    return kind.replace("DrewLive", "").strip(), series
+
+
+def strm_path(item):
+    """Relative .strm path for a title, following the layout in the module docstring."""
+    kind, series = split_group(item.get("group_title"))
+    if not kind:
+        parts = [TOP_FOLDERS.get(series, safe_name(series or "Other"))]
+    else:
+        parts = [safe_name(kind), safe_name(series)]
+        season = EPISODE_REGEX.search(item["name"])
+        if season:
+            parts.append(f"Season {int(season.group(1)):02d}")
+    return os.path.join(*parts, safe_name(item["name"]) + ".strm")
+
+
+class Exporter:
+    """Writes outputs under `out`, skipping files whose fingerprint is unchanged."""
+
+    def __init__(self, out, dry_run=False):
+        self.out = out
+        self.dry_run = dry_run
+        self.manifest_path = os.path.join(out, MANIFEST)
+        self.previous = self._load_manifest()
+        self.current = {}
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return manifest if isinstance(manifest, dict) else {}
+
+    def _path(self, rel):
+        return rel if os.path.isabs(rel) else os.path.join(self.out, rel)
+
+    def write(self, rel, content):
+        digest = fingerprint(content)
+        self.current[rel] = digest
+        path = self._path(rel)
+        if self.previous.get(rel) == digest and os.path.exists(path):
+            self.unchanged += 1
+            return
+        self.written += 1
+        if self.dry_run:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+    def remove_stale(self):
+        """Deletes files from the last run that this run did not write.
+
+        Only paths inside `out` are ever removed; a playlist written elsewhere
+        with --m3u is left alone.
+        """
+        for rel in self.previous.keys() - self.current.keys():
+            if os.path.isabs(rel):
+                continue
+            self.removed += 1
+            if self.dry_run:
+                continue
+            path = self._path(rel)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._prune_dirs(os.path.dirname(path))
+
+    def _prune_dirs(self, directory):
+        root = os.path.abspath(self.out)
+        directory = os.path.abspath(directory)
+        while directory.startswith(root + os.sep):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                return
+            directory = os.path.dirname(directory)
+
+    def save_manifest(self):
+        if self.dry_run:
+            return
+        os.makedirs(self.out, exist_ok=True)
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.current, f, indent=0, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+
+def export(source=DEFAULT_SOURCE, out=DEFAULT_OUT, m3u_path=None, strm=True, dry_run=False):
+    exporter = Exporter(out, dry_run)
+    m3u_lines = ["#EXTM3U"]
+    taken = set()
+    titles = 0
+    for item in iter_any(source):
+        url = item.get("folder_url")
+        if not url or not item.get("name"):
+            continue
+        titles += 1
+        m3u_lines.append(extinf(item))
+        m3u_lines.append(url)
+        if strm:
+            rel = os.path.join("strm", strm_path(item))
+            base, n = rel[: -len(".strm")], 2
+            # Case-insensitive, since the bundle is mostly used on Windows and macOS.
+            while rel.lower() in taken:
+                rel, n = f"{base} ({n}).strm", n + 1
+            taken.add(rel.lower())
+            exporter.write(rel, url + "\n")
+    exporter.write(m3u_path or "DrewLiveVOD.m3u8", "\n".join(m3u_lines) + "\n")
+    exporter.remove_stale()
+    exporter.save_manifest()
+    return titles, exporter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="DrewLiveVOD.json or a vod_catalog file")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="output directory for the playlist and strm/")
+    parser.add_argument("--m3u", help="playlist path (default <out>/DrewLiveVOD.m3u8)")
+    parser.add_argument("--no-strm", action="store_true", help="skip the .strm bundle")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    args = parser.parse_args()
+
+    m3u = os.path.abspath(args.m3u) if args.m3u else None
+    titles, exporter = export(args.source, args.out, m3u, not args.no_strm, args.dry_run)
+    verb = "would write" if args.dry_run else "wrote"
+    print(f"🎬 {titles} titles: {verb} {exporter.written}, unchanged {exporter.unchanged}, removed {exporter.removed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""Inverted-index search over the VOD library.
+
+    python vod_search.py build                      # index DrewLiveVOD.json into .cache/vod_search.idx
+    python vod_search.py south park s09e02          # search (rebuilds first when the source changed)
+    python vod_search.py --source DrewLiveVOD.vod.jsonl.gz "dragon ball"
+
+Indexes `name`, `group_title`, `plot` and the TMDB genre names behind
+`genre_ids`. Every query word must match, either a whole indexed word or, for
+words of MIN_PREFIX letters or more, the start of one (up to MAX_EXPANSIONS
+words). Episode codes (S01E02, s1e2, 1x02, or just S03) filter by season and
+episode instead of being matched as text. Matches in the name weigh most, then
+group, genre and plot; prefix matches count half.
+
+A single word's best matches are read straight off its weight tiers. Queries
+with a broad word (one matching a large part of the library) are first
+answered from name matches, then name and group matches; plot and genre
+matches are only scored when they could still change the top results.
+
+The saved index records which source file it was built from (path, size and
+mtime), and is rebuilt when that no longer matches.
+"""
+import argparse
+import os
+import pickle
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from heapq import merge, nsmallest
+
+from vod_catalog import iter_any
+
+DEFAULT_SOURCE = "DrewLiveVOD.json"
+INDEX_PATH = os.environ.get("VOD_SEARCH_INDEX", os.path.join(".cache", "vod_search.idx"))
+INDEX_VERSION = 2
+MIN_PREFIX = 2
+MAX_EXPANSIONS = 64
+# Roughly how many postings dict.update() covers in the time of one bisect probe.
+LOOKUP_COST = 16
+# A query with a word matching more titles than this is first answered from
+# whole-word name matches, then from name and group matches, before matching everything.
+BROAD_MATCH = 5000
+NARROW_PASSES = (8, 4)
+# Highest weight wins when a word appears in several fields of one title.
+FIELD_WEIGHTS = {"name": 8, "group_title": 4, "genres": 2, "plot": 1}
+TOKEN_REGEX = re.compile(r"\w+")
+EPISODE_REGEX = re.compile(r"\bs(\d{1,2})(?:\s*e(\d{1,3}))?\b|\b(\d{1,2})x(\d{1,3})\b", re.IGNORECASE)
+GENRES = {
+    28: "Action", 12: "Adventure", 16: "Animation", 35: "Comedy", 80: "Crime", 99: "Documentary",
+    18: "Drama", 10751: "Family", 14: "Fantasy", 36: "History", 27: "Horror", 10402: "Music",
+    9648: "Mystery", 10749: "Romance", 878: "Science Fiction", 10770: "TV Movie", 53: "Thriller",
+    10752: "War", 37: "Western", 10759: "Action & Adventure", 10762: "Kids", 10763: "News",
+    10764: "Reality", 10765: "Sci-Fi & Fantasy", 10766: "Soap", 10767: "Talk", 10768: "War & Politics",
+}
+
+
+def tokenize(text):
+    return TOKEN_REGEX.findall(text.casefold()) if text else []
+
+
+def parse_episode(text):
+    """(season, episode, text without the code); missing parts are -1."""
+    match = EPISODE_REGEX.search(text or "")
+    if not match:
+        return -1, -1, text
+    season = match.group(1) or match.group(3)
+    episode = match.group(2) or match.group(4)
+    rest = (text[:match.start()] + " " + text[match.end():]).strip()
+    return int(season), int(episode) if episode else -1, rest
+
+
+class VodIndex:
+    """Postings per word, split into weight tiers of sorted title ids.
+
+    Title ids follow name order, so ties rank by id. Tiers let a query score
+    whole posting lists with dict operations instead of visiting every title
+    in Python.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.urls = []
+        self.groups = []
+        self.group_of = array("I")
+        self.season = array("h")
+        self.episode = array("h")
+        self.seasons = {}
+        self.episodes = {}
+        self.postings = {}
+        self.vocabulary = []
+        self.source = None
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def build(cls, items):
+        index = cls()
+        group_ids = {}
+        collected = {}
+        items = sorted(items, key=lambda item: (item.get("name") or "").casefold())
+        for doc, item in enumerate(items):
+            name = item.get("name") or ""
+            group = item.get("group_title") or ""
+            if group not in group_ids:
+                group_ids[group] = len(index.groups)
+                index.groups.append(group)
+            index.names.append(name)
+            index.urls.append(item.get("folder_url") or "")
+            index.group_of.append(group_ids[group])
+            season, episode, _ = parse_episode(name)
+            index.season.append(season)
+            index.episode.append(episode)
+            if season >= 0:
+                index.seasons.setdefault(season, array("I")).append(doc)
+                if episode >= 0:
+                    index.episodes.setdefault((season, episode), array("I")).append(doc)
+
+            weights = {}
+            fields = {
+                "name": name,
+                "group_title": group,
+                "genres": " ".join(GENRES.get(g, "") for g in item.get("genre_ids") or ()),
+                "plot": item.get("plot") or "",
+            }
+            for field, text in fields.items():
+                weight = FIELD_WEIGHTS[field]
+                for token in tokenize(text):
+                    if weights.get(token, 0) < weight:
+                        weights[token] = weight
+            for token, weight in weights.items():
+                tiers = collected.get(token)
+                if tiers is None:
+                    tiers = collected[token] = {}
+                docs = tiers.get(weight)
+                if docs is None:
+                    docs = tiers[weight] = array("I")
+                docs.append(doc)
+        index.postings = {token: tuple(sorted(tiers.items())) for token, tiers in collected.items()}
+        index.vocabulary = sorted(collected)
+        return index
+
+    def _expand(self, token):
+        """[(weight, sorted title ids)] for every word `token` matches."""
+        tiers = []
+        exact = self.postings.get(token)
+        if exact is not None:
+            tiers.extend(exact)
+        if len(token) >= MIN_PREFIX:
+            vocabulary = self.vocabulary
+            i = bisect_left(vocabulary, token)
+            expanded = 1 if exact is not None else 0
+            while i < len(vocabulary) and expanded < MAX_EXPANSIONS and vocabulary[i].startswith(token):
+                if vocabulary[i] != token:
+                    tiers.extend((weight * 0.5, docs) for weight, docs in self.postings[vocabulary[i]])
+                    expanded += 1
+                i += 1
+        return tiers
+
+    @staticmethod
+    def _size(tiers):
+        return sum(len(docs) for _, docs in tiers)
+
+    @staticmethod
+    def _scores(tiers):
+        """{title id: best weight}; higher tiers are applied last and win."""
+        scores = {}
+        for weight, docs in sorted(tiers, key=lambda tier: tier[0]):
+            scores.update(dict.fromkeys(docs, weight))
+        return scores
+
+    @staticmethod
+    def _lookup(tiers, doc):
+        best = 0
+        for weight, docs in tiers:
+            if weight > best:
+                i = bisect_left(docs, doc)
+                if i < len(docs) and docs[i] == doc:
+                    best = weight
+        return best
+
+    def _match(self, groups, within=None):
+        """{title id: score} for titles matching every group of tiers (and in `within`, if given)."""
+        groups = sorted(groups, key=self._size)
+        if within is None:
+            candidates, groups = self._scores(groups[0]), groups[1:]
+        else:
+            candidates = dict.fromkeys(within, 0)
+        for tiers in groups:
+            if not candidates:
+                break
+            # Scoring a whole list runs in C; probing one title costs a
+            # Python-level bisect per tier.
+            if len(candidates) * len(tiers) * LOOKUP_COST > self._size(tiers):
+                # Highest tier first, so a title keeps its best weight.
+                narrowed = {}
+                for weight, docs in sorted(tiers, key=lambda tier: tier[0], reverse=True):
+                    for doc in candidates.keys() & docs:
+                        if doc not in narrowed:
+                            narrowed[doc] = candidates[doc] + weight
+                candidates = narrowed
+            else:
+                narrowed = {}
+                for doc, score in candidates.items():
+                    extra = self._lookup(tiers, doc)
+                    if extra:
+                        narrowed[doc] = score + extra
+                candidates = narrowed
+        return candidates
+
+    @staticmethod
+    def _bound_below(groups, floor):
+        """Best score a title can reach when some word matches it only below `floor`."""
+        best = [max(weight for weight, _ in tiers) for tiers in groups]
+        total, bound = sum(best), 0
+        for tiers, top in zip(groups, best):
+            low = [weight for weight, _ in tiers if weight < floor]
+            if low:
+                bound = max(bound, total - top + max(low))
+        return bound
+
+    def search(self, query, limit=20):
+        """Best matches for `query` as [(score, title id)], highest first."""
+        season, episode, text = parse_episode(query)
+        groups = [self._expand(token) for token in dict.fromkeys(tokenize(text))]
+        if any(not tiers for tiers in groups):
+            return []
+        within = None
+        if season >= 0:
+            within = self.episodes.get((season, episode), ()) if episode >= 0 else self.seasons.get(season, ())
+            if not groups or not within:
+                return [(0, doc) for doc in within[:limit]]
+        elif not groups:
+            return []
+        elif len(groups) == 1:
+            return self._best_of(groups[0], limit)
+        if max(map(self._size, groups)) > BROAD_MATCH:
+            for floor in NARROW_PASSES:
+                narrow = [[tier for tier in tiers if tier[0] >= floor] for tiers in groups]
+                if not all(narrow):
+                    continue
+                top = self._top(self._match(narrow, within), limit)
+                # Exact when no title with a weaker match for some word could outscore the last one.
+                if len(top) == limit and top[-1][0] > self._bound_below(groups, floor):
+                    return top
+        return self._top(self._match(groups, within), limit)
+
+    @staticmethod
+    def _best_of(tiers, limit):
+        """The `limit` best matches of one word, read off its tiers without scoring every title."""
+        results, seen = [], set()
+        for weight in sorted({weight for weight, _ in tiers}, reverse=True):
+            for doc in merge(*(docs for w, docs in tiers if w == weight)):
+                if len(results) >= limit:
+                    return results
+                if doc not in seen:
+                    seen.add(doc)
+                    results.append((weight, doc))
+        return results
+
+    @staticmethod
+    def _top(candidates, limit):
+        """The `limit` best (score, title id) pairs, without sorting every candidate."""
+        best_first = lambda item: (-item[0], item[1])  # noqa: E731
+        if len(candidates) <= 8 * limit:
+            return sorted(((score, doc) for doc, score in candidates.items()), key=best_first)[:limit]
+        counts = Counter(candidates.values())
+        kept = 0
+        for threshold in sorted(counts, reverse=True):
+            kept += counts[threshold]
+            if kept >= limit:
+                break
+        above = sorted(((score, doc) for doc, score in candidates.items() if score > threshold), key=best_first)
+        ties = nsmallest(limit - len(above), (doc for doc, score in candidates.items() if score == threshold))
+        return above + [(threshold, doc) for doc in ties]
+
+    def result(self, doc):
+        return {"name": self.names[doc], "group_title": self.groups[self.group_of[doc]], "folder_url": self.urls[doc]}
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((INDEX_VERSION, self.__dict__), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Loads an index written by save(); only open files this module wrote."""
+        with open(path, "rb") as f:
+            version, state = pickle.load(f)
+        if version != INDEX_VERSION:
+            raise ValueError(f"{path} is index v{version}, expected v{INDEX_VERSION}")
+        index = cls()
+        index.__dict__.update(state)
+        return index
+
+
+def source_identity(source):
+    """(absolute path, size, mtime) of a source file; changes whenever it is rewritten."""
+    stat = os.stat(source)
+    return os.path.abspath(source), stat.st_size, stat.st_mtime_ns
+
+
+def open_index(source=DEFAULT_SOURCE, path=INDEX_PATH, rebuild=False):
+    """The saved index for `source`, rebuilt when missing, built from another file, or unreadable."""
+    identity = source_identity(source)
+    if not rebuild:
+        try:
+            index = VodIndex.load(path)
+            if index.source == identity:
+                return index
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+            pass
+    index = VodIndex.build(iter_any(source))
+    index.source = identity
+    index.save(path)
+    return index
+
+
+def search(query, limit=20, source=DEFAULT_SOURCE, path=INDEX_PATH):
+    """[{name, group_title, folder_url, score}] for `query`, best first."""
+    index = open_index(source, path)
+    return [dict(index.result(doc), score=score) for score, doc in index.search(query, limit)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("query", nargs="*", help='search words, or "build" to (re)build the index')
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="DrewLiveVOD.json or a vod_catalog file")
+    parser.add_argument("--index", default=INDEX_PATH, help="where the index is saved")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--urls", action="store_true", help="print stream URLs too")
+    args = parser.parse_args()
+
+    if args.query == ["build"]:
+        start = time.perf_counter()
+        index = open_index(args.source, args.index, rebuild=True)
+        print(f"🔎 Indexed {len(index)} titles, {len(index.vocabulary)} words in "
+              f"{time.perf_counter() - start:.2f} s → {args.index}")
+        return 0
+    if not args.query:
+        parser.print_help()
+        return 2
+
+    index = open_index(args.source, args.index)
+    query = " ".join(args.query)
+    start = time.perf_counter()
+    results = index.search(query, args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    for score, doc in results:
+        item = index.result(doc)
+        print(f"{score:5.1f}  {item['name']}  [{item['group_title']}]")
+        if args.urls:
+            print(f"       {item['folder_url']}")
+    print(f"{len(results)} result(s) in {elapsed:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,29 @@
 import asyncio
+import os
 import re
 from typing import Dict, List, Optional, Tuple
 from urllib.parse import urljoin
 import aiohttp
 from bs4 import BeautifulSoup
-from playwright.async_api import BrowserContext, Page, async_playwright
+from playwright.async_api import BrowserContext, Page, TimeoutError as PlaywrightTimeoutError
+from browser_pool import BrowserPool, shared_or_new
+from request_blocker import RequestBlocker
+from page_trace import Tracer
+from fast_resolver import TierStats, resolve_tiered
 
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0"
 DYNAMIC_WAIT_TIMEOUT = 15000
 GAME_TABLE_WAIT_TIMEOUT = 30000
 STREAM_PATTERN = re.compile(r"\.m3u8($|\?)", re.IGNORECASE)
 OUTPUT_FILE = "SportsWebcast.m3u8"
+# Games resolved at once per league (they share the league's context and
+# aiohttp session) and how long one game may take before it is skipped.
+GAME_CONCURRENCY = int(os.environ.get("WEBCAST_GAME_CONCURRENCY", "4"))
+GAME_DEADLINE = int(os.environ.get("WEBCAST_GAME_DEADLINE", "90"))
+NBA_VERIFY_CONCURRENCY = int(os.environ.get("WEBCAST_NBA_VERIFY_CONCURRENCY", "8"))
+BLOCKER = RequestBlocker()
+TIERS = TierStats("Webcast")
+TRACER = Tracer("Webcast", blocker=BLOCKER)
 
 NFL_BASE_URL = "https://nflwebcast.com/"
 NHL_BASE_URL = "https://slapstreams.com/"
@@ -83,56 +96,134 @@ async def verify_stream_url(session: aiohttp.ClientSession, url: str, headers: O
         print(f" ❌ URL Client Error ({type(e).__name__}): {url}")
         return False
 
+class CandidateVerifier:
+    """Verifies captured stream candidates as they arrive; the first valid one wins.
+
+    Each candidate is checked in its own task, so verification overlaps with
+    whatever the page is doing. Once one passes, the other checks are cancelled.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, headers: Dict[str, str]):
+        self.session = session
+        self.headers = headers
+        self.found: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.tasks: set = set()
+        self.seen: set = set()
+
+    def add(self, url: str):
+        if url in self.seen or self.found.done():
+            return
+        self.seen.add(url)
+        task = asyncio.ensure_future(self._verify(url))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _verify(self, url: str):
+        if await verify_stream_url(self.session, url, headers=dict(self.headers)) and not self.found.done():
+            self.found.set_result(url)
+            self.cancel()
+
+    def cancel(self):
+        current = asyncio.current_task()
+        for task in list(self.tasks):
+            if task is not current:
+                task.cancel()
+
+    async def race(self, coro) -> bool:
+        """Runs `coro` (a click or a networkidle wait) until it ends or a stream is confirmed."""
+        task = asyncio.ensure_future(coro)
+        await asyncio.wait([task, self.found], return_when=asyncio.FIRST_COMPLETED)
+        if self.found.done():
+            if not task.done():
+                task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return True
+        task.result()
+        return False
+
+    async def settle(self) -> Optional[str]:
+        """Waits for the checks still running; returns the confirmed stream, if any."""
+        while self.tasks and not self.found.done():
+            await asyncio.wait(list(self.tasks) + [self.found], return_when=asyncio.FIRST_COMPLETED)
+        return self.found.result() if self.found.done() else None
+
+    async def close(self):
+        self.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if not self.found.done():
+            self.found.cancel()
+
+
+async def _wait_for_network_idle(page: Page):
+    # Live players keep polling, so a page that never goes idle is not an error.
+    try:
+        await page.wait_for_load_state('networkidle', timeout=DYNAMIC_WAIT_TIMEOUT)
+    except PlaywrightTimeoutError:
+        pass
+
+async def _click_server_links(page: Page, links, where: str, verifier: CandidateVerifier, trace) -> bool:
+    count = await links.count()
+    if count == 0:
+        print(f"   - No server links found {where}.")
+        return False
+    print(f"   Found {count} server links {where}.")
+    for i in range(count):
+        link = links.nth(i)
+        link_text = (await link.inner_text() or "Unknown Link").strip()
+        trace.retries += 1
+        try:
+            # Candidates from earlier clicks keep verifying while this one loads.
+            with trace.phase("server_links"):
+                found = await verifier.race(link.click(timeout=5000)) or await verifier.race(_wait_for_network_idle(page))
+        except Exception as e:
+            print(f"   - Error clicking link '{link_text}' {where}: {e}")
+            continue
+        if found:
+            print(f" ✔️ Found valid stream after clicking link '{link_text}' {where}.")
+            return True
+    return False
+
 async def find_stream_from_servers_on_page(context: BrowserContext, page_url: str, base_url: str, session: aiohttp.ClientSession) -> Optional[str]:
     verification_headers = {
         "Origin": base_url.rstrip('/'),
         "Referer": base_url
     }
     page = await context.new_page()
-    candidate_urls: List[str] = []
+    trace = TRACER.start(page, page_url, label=base_url)
+    verifier = CandidateVerifier(session, verification_headers)
 
     def handle_request(request):
-        if STREAM_PATTERN.search(request.url) and request.url not in candidate_urls:
+        if STREAM_PATTERN.search(request.url) and request.url not in verifier.seen:
             print(f" ✅ Captured potential stream: {request.url}")
-            candidate_urls.append(request.url)
+            verifier.add(request.url)
 
     page.on("request", handle_request)
     try:
         print(f" ↳ Navigating to content page: {page_url}")
-        await page.goto(page_url, wait_until="domcontentloaded", timeout=60000)
-        await page.wait_for_load_state('networkidle', timeout=DYNAMIC_WAIT_TIMEOUT)
-
-        for stream_url in reversed(candidate_urls):
-            if await verify_stream_url(session, stream_url, headers=verification_headers):
+        with trace.phase("navigation"):
+            if await verifier.race(page.goto(page_url, wait_until="domcontentloaded", timeout=60000)):
                 print(" ✔️ Found valid stream on initial page load.")
-                return stream_url
+                trace.outcome = "ok"
+                return verifier.found.result()
+        with trace.phase("networkidle"):
+            found = await verifier.race(_wait_for_network_idle(page))
+        if not found:
+            with trace.phase("verification"):
+                found = await verifier.settle() is not None
+        if found:
+            print(" ✔️ Found valid stream on initial page load.")
+            trace.outcome = "ok"
+            return verifier.found.result()
 
         print("  checking for server links on main page...")
-        server_links_main = page.locator("#multistmb a")
-        count_main = await server_links_main.count()
-
-        if count_main > 0:
-            print(f"   Found {count_main} server links on main page (slapstreams style).")
-            for i in range(count_main):
-                link = server_links_main.nth(i)
-                link_text = (await link.inner_text() or "Unknown Link").strip()
-                urls_before_click = set(candidate_urls)
-                try:
-                    await link.click(timeout=5000)
-                    await page.wait_for_load_state('networkidle', timeout=DYNAMIC_WAIT_TIMEOUT)
-                except Exception as e:
-                    print(f"   - Error clicking main page link '{link_text}': {e}")
-                    continue
-                
-                urls_after_click = set(candidate_urls)
-                new_urls = list(urls_after_click - urls_before_click)
-
-                for stream_url in reversed(new_urls):
-                    if await verify_stream_url(session, stream_url, headers=verification_headers):
-                        print(f" ✔️ Found valid stream after clicking main page link '{link_text}'.")
-                        return stream_url
-            print("   - No valid streams found from main page links.")
-        
+        if await _click_server_links(page, page.locator("#multistmb a"), "on main page", verifier, trace):
+            trace.outcome = "ok"
+            return verifier.found.result()
+        with trace.phase("verification"):
+            if await verifier.settle():
+                trace.outcome = "ok"
+                return verifier.found.result()
+
         print(" checking for server links inside iframe (original style)...")
         iframe_locator = page.locator("div#player iframe, div.vplayer iframe, iframe.responsive-iframe").first
         if not await iframe_locator.count():
@@ -145,38 +236,23 @@ async def find_stream_from_servers_on_page(context: BrowserContext, page_url: st
                 return None
 
         server_links_iframe = frame_content.locator("#multistmb a")
-        count_iframe = await server_links_iframe.count()
-        
-        if count_iframe == 0:
+        if await server_links_iframe.count() == 0:
             server_links_iframe = frame_content.locator("a:has-text('Server'), a:has-text('HD')")
-            count_iframe = await server_links_iframe.count()
-
-        if count_iframe > 0:
-            print(f"   Found {count_iframe} server links inside iframe.")
-            for i in range(count_iframe):
-                link = server_links_iframe.nth(i)
-                link_text = (await link.inner_text() or "Unknown Link").strip()
-                urls_before_click = set(candidate_urls)
-                try:
-                    await link.click(timeout=5000)
-                    await page.wait_for_load_state('networkidle', timeout=DYNAMIC_WAIT_TIMEOUT)
-                except Exception as e:
-                    print(f"   - Error clicking iframe link '{link_text}': {e}")
-                    continue
 
-                urls_after_click = set(candidate_urls)
-                new_urls = list(urls_after_click - urls_before_click)
-
-                for stream_url in reversed(new_urls):
-                    if await verify_stream_url(session, stream_url, headers=verification_headers):
-                        print(f" ✔️ Found valid stream after clicking iframe link '{link_text}'.")
-                        return stream_url
-        else:
-            print("   - No server links found inside iframe.")
+        if await _click_server_links(page, server_links_iframe, "inside iframe", verifier, trace):
+            trace.outcome = "ok"
+            return verifier.found.result()
+        with trace.phase("verification"):
+            if await verifier.settle():
+                trace.outcome = "ok"
+                return verifier.found.result()
 
     except Exception as e:
         print(f" ❌ Error processing page {page_url}: {e}")
+        trace.outcome = "error"
     finally:
+        trace.finish()
+        await verifier.close()
         if not page.is_closed():
             page.remove_listener("request", handle_request)
         await page.close()
@@ -184,14 +260,28 @@ async def find_stream_from_servers_on_page(context: BrowserContext, page_url: st
     print(f" ❌ No valid stream found for {page_url}")
     return None
 
-async def scrape_league(base_url: str, channel_urls: List[str], group_prefix: str, default_id: str, default_logo: str) -> List[Dict]:
+async def resolve_stream(context: BrowserContext, page_url: str, base_url: str, session: aiohttp.ClientSession) -> Optional[str]:
+    verification_headers = {
+        "Origin": base_url.rstrip('/'),
+        "Referer": base_url
+    }
+
+    async def pick(urls: List[str]) -> Optional[str]:
+        results = await asyncio.gather(*(verify_stream_url(session, url, headers=dict(verification_headers)) for url in urls))
+        return next((url for url, ok in zip(urls, results) if ok), None)
+
+    return await resolve_tiered(
+        session, page_url, lambda: find_stream_from_servers_on_page(context, page_url, base_url, session), TIERS,
+        referer=base_url, pick=pick,
+    )
+
+async def scrape_league(base_url: str, channel_urls: List[str], group_prefix: str, default_id: str, default_logo: str, pool: Optional[BrowserPool] = None) -> List[Dict]:
     print(f"\nScraping {group_prefix} streams from {base_url}...")
     found_streams: Dict[str, Tuple[str, str, Optional[str]]] = {}
     results: List[Dict] = []
 
-    async with async_playwright() as p, aiohttp.ClientSession(headers={"User-Agent": USER_AGENT}) as session:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(user_agent=USER_AGENT)
+    async with shared_or_new(pool, "chromium") as pool, pool.context(user_agent=USER_AGENT, blocker=BLOCKER, har=f"webcast-{group_prefix.lower()}") as context, \
+            aiohttp.ClientSession(headers={"User-Agent": USER_AGENT}) as session:
         try:
             page = await context.new_page()
             await page.goto(base_url, wait_until="domcontentloaded", timeout=60000)
@@ -247,20 +337,25 @@ async def scrape_league(base_url: str, channel_urls: List[str], group_prefix: st
 
             await page.close()
 
-            for game in game_links_info:
-                stream_url = await find_stream_from_servers_on_page(context, game["url"], base_url, session)
+            jobs = [(game["name"], game["url"], "Live Games", game["logo"]) for game in game_links_info]
+            jobs += [(url.strip("/").split("/")[-1], url, "24/7 Channels", None) for url in channel_urls]
+            semaphore = asyncio.Semaphore(GAME_CONCURRENCY)
+
+            async def resolve_job(key: str, url: str) -> Optional[str]:
+                async with semaphore:
+                    try:
+                        return await asyncio.wait_for(resolve_stream(context, url, base_url, session), GAME_DEADLINE)
+                    except asyncio.TimeoutError:
+                        print(f" ⏱️ Gave up on {key} after {GAME_DEADLINE}s: {url}")
+                        return None
+
+            stream_urls = await asyncio.gather(*(resolve_job(key, url) for key, url, _category, _logo in jobs))
+            # Filled in job order, so a repeated name resolves the same way as before.
+            for (key, _url, category, logo), stream_url in zip(jobs, stream_urls):
                 if stream_url:
-                    found_streams[game["name"]] = (stream_url, "Live Games", game["logo"])
-
-            for url in channel_urls:
-                slug = url.strip("/").split("/")[-1]
-                stream_url = await find_stream_from_servers_on_page(context, url, base_url, session)
-                if stream_url:
-                    found_streams[slug] = (stream_url, "24/7 Channels", None)
+                    found_streams[key] = (stream_url, category, logo)
         except Exception as e:
             print(f" ❌ Error scraping {group_prefix}: {e}")
-        finally:
-            await browser.close()
 
     for slug, data_tuple in sorted(found_streams.items()):
         stream_url, category, scraped_logo = data_tuple
@@ -305,6 +400,7 @@ async def scrape_nba_league(default_logo: str) -> List[Dict]:
 
             print(f" 🏀 Found {len(game_rows)} potential NBA games in the schedule.")
             
+            games = []
             for row in game_rows:
                 teamvs_div = row.find("div", class_="teamvs")
                 if not teamvs_div:
@@ -325,22 +421,30 @@ async def scrape_nba_league(default_logo: str) -> List[Dict]:
                         continue
                         
                     stream_key = f"nba_{team_key}"
-                    stream_url = NBA_STREAM_URL_PATTERN.format(stream_key=stream_key)
-                    
-                    if await verify_stream_url(session, stream_url, headers=NBA_CUSTOM_HEADERS):
-                        results.append({
-                            "name": game_name,
-                            "url": stream_url,
-                            "tvg_id": "NBA.Basketball.Dummy.us",
-                            "tvg_logo": default_logo,
-                            "group": "NBAWebcast - Live Games",
-                            "ref": NBA_BASE_URL,
-                            "custom_headers": NBA_CUSTOM_HEADERS,
-                        })
+                    games.append((game_name, NBA_STREAM_URL_PATTERN.format(stream_key=stream_key)))
                 except Exception as e:
                     print(f" ⚠️ Error processing NBA row: {e}")
                     continue
 
+            semaphore = asyncio.Semaphore(NBA_VERIFY_CONCURRENCY)
+
+            async def verify_game(stream_url: str) -> bool:
+                async with semaphore:
+                    return await verify_stream_url(session, stream_url, headers=NBA_CUSTOM_HEADERS)
+
+            verified = await asyncio.gather(*(verify_game(stream_url) for _name, stream_url in games))
+            for (game_name, stream_url), ok in zip(games, verified):
+                if ok:
+                    results.append({
+                        "name": game_name,
+                        "url": stream_url,
+                        "tvg_id": "NBA.Basketball.Dummy.us",
+                        "tvg_logo": default_logo,
+                        "group": "NBAWebcast - Live Games",
+                        "ref": NBA_BASE_URL,
+                        "custom_headers": NBA_CUSTOM_HEADERS,
+                    })
+
         except Exception as e:
             print(f" ❌ Error parsing NBA HTML or processing rows: {e}")
     
@@ -366,17 +470,22 @@ def write_playlist(streams: List[Dict], filename: str):
             f.write(entry["url"] + "\n")
     print(f"✅ Playlist saved to {filename} ({len(streams)} streams).")
 
-async def main():
+async def main(pool: Optional[BrowserPool] = None):
     print("🚀 Starting Sports Webcast Scraper...")
     NBA_DEFAULT_LOGO = "http://drewlive24.duckdns.org:9000/Logos/Basketball.png"
-    tasks = [
-        scrape_league(NFL_BASE_URL, NFL_CHANNEL_URLS, "NFLWebcast", "NFL.Dummy.us", "http://drewlive24.duckdns.org:9000/Logos/Maxx.png"),
-        scrape_league(NHL_BASE_URL, NHL_CHANNEL_URLS, "NHLWebcast", "NHL.Hockey.Dummy.us", "http://drewlive24.duckdns.org:9000/Logos/Hockey.png"),
-        scrape_league(MLB_BASE_URL, MLB_CHANNEL_URLS, "MLBWebcast", "MLB.Baseball.Dummy.us", "http://drewlive24.duckdns.org:9000/Logos/MLB.png"),
-        scrape_league(MLS_BASE_URL, MLS_CHANNEL_URLS, "MLSWebcast", "MLS.Soccer.Dummy.us", "http://drewlive24.duckdns.org:9Image of Football2.png"),
-        scrape_nba_league(NBA_DEFAULT_LOGO),
-    ]
-    results = await asyncio.gather(*tasks)
+    async with shared_or_new(pool, "chromium") as pool:
+        tasks = [
+            scrape_league(NFL_BASE_URL, NFL_CHANNEL_URLS, "NFLWebcast", "NFL.Dummy.us", "http://drewlive24.duckdns.org:9000/Logos/Maxx.png", pool),
+            scrape_league(NHL_BASE_URL, NHL_CHANNEL_URLS, "NHLWebcast", "NHL.Hockey.Dummy.us", "http://drewlive24.duckdns.org:9000/Logos/Hockey.png", pool),
+            scrape_league(MLB_BASE_URL, MLB_CHANNEL_URLS, "MLBWebcast", "MLB.Baseball.Dummy.us", "http://drewlive24.duckdns.org:9000/Logos/MLB.png", pool),
+            scrape_league(MLS_BASE_URL, MLS_CHANNEL_URLS, "MLSWebcast", "MLS.Soccer.Dummy.us", "http://drewlive24.duckdns.org:9Image of Football2.png", pool),
+            scrape_nba_league(NBA_DEFAULT_LOGO),
+        ]
+        results = await asyncio.gather(*tasks)
+    BLOCKER.print_summary("Webcast: ")
+    TIERS.print_report()
+    await TRACER.flush()
+    TRACER.print_summary()
     all_streams = [s for league in results for s in league]
     write_playlist(all_streams, OUTPUT_FILE)
 
@@ -0,0 +1,460 @@
+"""Xtream Codes compatible API over the VOD library and the merged live playlists.
+
+    python xtream_server.py                                    # http://127.0.0.1:4000/player_api.php
+    python xtream_server.py --host 0.0.0.0                     # reachable from the LAN
+    python xtream_server.py --vod DrewLiveVOD.vod.jsonl.gz --live DrewLiveMergedPlaylist.m3u8 --port 8000
+
+Serves player_api.php (login, get_live_categories, get_live_streams,
+get_vod_categories, get_vod_streams, get_vod_info, get_series_categories,
+get_series, get_series_info) and redirects /live, /movie and /series stream
+URLs to the source URL.
+
+Each response body is built once per catalog version and kept gzipped with an
+ETag, so a request is a dict lookup, and a client that already has the body
+gets a 304. The source files are polled; a changed catalog is loaded in a
+thread and swapped in whole, so requests never see a half-built one.
+
+XTREAM_USERNAME / XTREAM_PASSWORD restrict access; when unset any login works.
+The server listens on 127.0.0.1 unless told otherwise: set both before
+exposing it with --host or XTREAM_HOST, since logins travel in the query string
+and the login response echoes them back.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+import zlib
+
+from aiohttp import web
+
+from playlist_index import read_entries
+from vod_catalog import iter_any
+from vod_export import split_group
+from vod_search import GENRES, parse_episode
+
+DEFAULT_VOD = "DrewLiveVOD.json"
+DEFAULT_LIVE = ("DrewLiveMergedPlaylist.m3u8", "MergedPlaylist.m3u8")
+HOST = os.environ.get("XTREAM_HOST", "127.0.0.1")
+PORT = int(os.environ.get("XTREAM_PORT", "4000"))
+USERNAME = os.environ.get("XTREAM_USERNAME")
+PASSWORD = os.environ.get("XTREAM_PASSWORD")
+POLL_SECONDS = float(os.environ.get("XTREAM_POLL_SECONDS", "5"))
+GZIP_LEVEL = 6
+ATTR_REGEX = re.compile(r'([\w-]+)="([^"]*)"')
+# Responses built eagerly when a catalog loads; filtered and per-title ones are built on first request.
+WARM_ACTIONS = ("get_live_categories", "get_live_streams", "get_vod_categories", "get_vod_streams",
+                "get_series_categories", "get_series")
+
+
+def stable_id(key, taken):
+    """A positive int derived from `key`, so ids survive reloads; bumped past collisions."""
+    value = zlib.crc32(key.encode("utf-8")) & 0x7FFFFFFF or 1
+    while value in taken:
+        value = value % 0x7FFFFFFF + 1
+    taken.add(value)
+    return value
+
+
+def extension(url, default):
+    path = url.split("?", 1)[0].rsplit("/", 1)[-1]
+    ext = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+    return ext if ext.isalnum() and len(ext) <= 4 else default
+
+
+def read_live(paths):
+    """[(attributes, name, url)] from the live playlists, first occurrence of each URL kept."""
+    channels, seen = [], set()
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                _, entries = read_entries(f.read().splitlines())
+        except OSError:
+            continue
+        for lines in entries:
+            url = lines[-1].strip()
+            if url in seen:
+                continue
+            seen.add(url)
+            extinf = lines[0]
+            attributes = dict(ATTR_REGEX.findall(extinf))
+            name = extinf.rsplit('",', 1)[-1].strip() if '",' in extinf else extinf.split(",", 1)[-1].strip()
+            channels.append((attributes, name or attributes.get("tvg-name", ""), url))
+    return channels
+
+
+class CachedResponse:
+    """A JSON body with its gzipped form and ETag."""
+
+    __slots__ = ("body", "gzipped", "etag")
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.gzipped = gzip.compress(self.body, GZIP_LEVEL, mtime=0)
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+
+
+class Catalog:
+    """One immutable version of the served data plus the responses built from it."""
+
+    def __init__(self, vod_items, live_channels, added=0):
+        self.added = str(int(added))
+        self.urls = {"live": {}, "movie": {}, "series": {}}
+        self.live_categories, self.live_streams = [], []
+        self.vod_categories, self.vod_streams = [], []
+        self.series_categories, self.series = [], []
+        self.vod_info = {}
+        self.series_episodes = {}
+        self._responses = {}
+        self._category_ids = {}
+        self._load_live(live_channels)
+        self._load_vod(vod_items)
+
+    @staticmethod
+    def _category(name, categories, index, taken):
+        category_id = index.get(name)
+        if category_id is None:
+            category_id = index[name] = str(stable_id(name, taken))
+            categories.append({"category_id": category_id, "category_name": name, "parent_id": 0})
+        return category_id
+
+    def _load_live(self, channels):
+        index, taken, ids = {}, set(), set()
+        for attributes, name, url in channels:
+            group = attributes.get("group-title") or "Uncategorized"
+            # Live URLs carry rotating tokens, so the id follows the channel, not the URL.
+            stream_id = stable_id(f"{group}\n{name}", ids)
+            self.urls["live"][stream_id] = url
+            self.live_streams.append({
+                "num": len(self.live_streams) + 1,
+                "name": name,
+                "stream_type": "live",
+                "stream_id": stream_id,
+                "stream_icon": attributes.get("tvg-logo", ""),
+                "epg_channel_id": attributes.get("tvg-id") or None,
+                "added": self.added,
+                "category_id": self._category(group, self.live_categories, index, taken),
+                "custom_sid": "",
+                "tv_archive": 0,
+                "direct_source": "",
+                "tv_archive_duration": 0,
+            })
+
+    def _load_vod(self, items):
+        vod_index, series_index, series_ids = {}, {}, {}
+        taken, ids, series_taken = set(), set(), set()
+        for item in items:
+            url, name = item.get("folder_url"), item.get("name")
+            if not url or not name:
+                continue
+            group = item.get("group_title") or ""
+            kind, title = split_group(group)
+            if not kind:
+                self._add_movie(item, stable_id(url, ids), self._category(group, self.vod_categories, vod_index, taken))
+                continue
+            series_id = series_ids.get(group)
+            if series_id is None:
+                series_id = series_ids[group] = stable_id(group, series_taken)
+                category_id = self._category(f"DrewLive {kind}", self.series_categories, series_index, taken)
+                self._add_series(item, series_id, title, category_id)
+            self._add_episode(item, series_id, stable_id(url, ids))
+
+    def _add_movie(self, item, stream_id, category_id):
+        url = item["folder_url"]
+        self.urls["movie"][stream_id] = url
+        row = {
+            "num": len(self.vod_streams) + 1,
+            "name": item["name"],
+            "stream_type": "movie",
+            "stream_id": stream_id,
+            "stream_icon": item.get("stream_icon") or "",
+            "rating": item.get("rating") or 0,
+            "rating_5based": item.get("rating_5based") or 0,
+            "added": self.added,
+            "is_adult": "1" if item.get("group_title") == "DrewLive - XXX" else "0",
+            "category_id": category_id,
+            "container_extension": extension(url, "mp4"),
+            "custom_sid": "",
+            "direct_source": "",
+        }
+        self.vod_streams.append(row)
+        self.vod_info[stream_id] = (item, row)
+
+    def _add_series(self, item, series_id, title, category_id):
+        self.series.append({
+            "num": len(self.series) + 1,
+            "name": title,
+            "series_id": series_id,
+            "cover": item.get("stream_icon") or "",
+            "plot": item.get("plot") or "",
+            "cast": "",
+            "director": "",
+            "genre": genre_names(item),
+            "releaseDate": "",
+            "last_modified": self.added,
+            "rating": str(item.get("rating") or 0),
+            "rating_5based": item.get("rating_5based") or 0,
+            "backdrop_path": [item["backdrop_path"]] if item.get("backdrop_path") else [],
+            "youtube_trailer": item.get("yt_trailer") or "",
+            "episode_run_time": "",
+            "category_id": category_id,
+        })
+        self.series_episodes[series_id] = (self.series[-1], {})
+
+    def _add_episode(self, item, series_id, episode_id):
+        url = item["folder_url"]
+        self.urls["series"][episode_id] = url
+        seasons = self.series_episodes[series_id][1]
+        season, number, _ = parse_episode(item["name"])
+        season = max(season, 0)  # specials without a code go to season 0
+        episodes = seasons.setdefault(str(season), [])
+        episodes.append({
+            "id": str(episode_id),
+            "episode_num": number if number >= 0 else len(episodes) + 1,
+            "title": item["name"],
+            "container_extension": extension(url, "mp4"),
+            "info": {"plot": item.get("plot") or "", "movie_image": item.get("stream_icon") or "",
+                     "rating": item.get("rating") or 0},
+            "custom_sid": "",
+            "added": self.added,
+            "season": season,
+            "direct_source": "",
+        })
+
+    def series_info(self, series_id):
+        info, seasons = self.series_episodes[series_id]
+        return {
+            "seasons": [{"season_number": int(n), "name": f"Season {n}", "episode_count": len(episodes),
+                         "cover": info["cover"], "air_date": ""}
+                        for n, episodes in sorted(seasons.items(), key=lambda s: int(s[0]))],
+            "info": info,
+            "episodes": seasons,
+        }
+
+    def movie_info(self, stream_id):
+        item, row = self.vod_info[stream_id]
+        return {
+            "info": {
+                "tmdb_id": item.get("tmdb_id"),
+                "name": item["name"],
+                "plot": item.get("plot") or "",
+                "genre": genre_names(item),
+                "rating": item.get("rating") or 0,
+                "movie_image": row["stream_icon"],
+                "cover_big": row["stream_icon"],
+                "backdrop_path": [item["backdrop_path"]] if item.get("backdrop_path") else [],
+                "youtube_trailer": item.get("yt_trailer") or "",
+            },
+            "movie_data": {key: row[key] for key in ("stream_id", "name", "added", "category_id",
+                                                    "container_extension", "custom_sid", "direct_source")},
+        }
+
+    def _request(self, action, query):
+        """(cache key, payload builder) for a player_api action, or None when it has no answer."""
+        lists = {
+            "get_live_categories": self.live_categories,
+            "get_vod_categories": self.vod_categories,
+            "get_series_categories": self.series_categories,
+        }
+        streams = {
+            "get_live_streams": (self.live_streams, self.live_categories),
+            "get_vod_streams": (self.vod_streams, self.vod_categories),
+            "get_series": (self.series, self.series_categories),
+        }
+        if action in lists:
+            return (action,), lambda: lists[action]
+        if action in streams:
+            rows, categories = streams[action]
+            category_id = query.get("category_id")
+            if not category_id:
+                return (action,), lambda: rows
+            known = self._category_ids.get(action)
+            if known is None:
+                known = self._category_ids[action] = {c["category_id"] for c in categories}
+            if category_id not in known:
+                # Every unknown id shares one empty answer, so made-up ids cannot grow the cache.
+                return ("empty",), list
+            return (action, category_id), lambda: [row for row in rows if row["category_id"] == category_id]
+        ids = {"get_series_info": ("series_id", self.series_episodes, self.series_info),
+               "get_vod_info": ("vod_id", self.vod_info, self.movie_info)}
+        if action in ids:
+            param, known, build = ids[action]
+            try:
+                key = int(query.get(param, ""))
+            except ValueError:
+                return None
+            if key in known:
+                return (action, key), lambda: build(key)
+        return None
+
+    def response(self, action, query):
+        """The cached response for an action, building it on first use."""
+        request = self._request(action, query)
+        if request is None:
+            return None
+        key, build = request
+        # Only keys the catalog knows reach here, so the cache is bounded by its size.
+        cached = self._responses.get(key)
+        if cached is None:
+            cached = self._responses[key] = CachedResponse(build())
+        return cached
+
+    def warm(self):
+        for action in WARM_ACTIONS:
+            self.response(action, {})
+        return self
+
+
+def genre_names(item):
+    return ", ".join(GENRES[g] for g in item.get("genre_ids") or () if g in GENRES)
+
+
+def signature(paths):
+    """Changes whenever one of `paths` is written, replaced or removed."""
+    result = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            result.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            result.append(None)
+    return tuple(result)
+
+
+def load_catalog(vod_path, live_paths):
+    start = time.perf_counter()
+    try:
+        added = os.path.getmtime(vod_path)
+        items = iter_any(vod_path)
+    except OSError:
+        added, items = 0, ()
+    catalog = Catalog(items, read_live(live_paths), added).warm()
+    print(f"📚 Loaded {len(catalog.live_streams)} live, {len(catalog.vod_streams)} movies, "
+          f"{len(catalog.series)} series in {time.perf_counter() - start:.2f} s")
+    return catalog
+
+
+class CatalogHolder:
+    """The catalog currently served; the watcher swaps `catalog` in place."""
+
+    __slots__ = ("catalog",)
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+
+CATALOG = web.AppKey("catalog", CatalogHolder)
+SOURCES = web.AppKey("sources", tuple)
+
+
+def authorized(username, password):
+    return (USERNAME is None or username == USERNAME) and (PASSWORD is None or password == PASSWORD)
+
+
+def login_payload(request, username, password):
+    now = int(time.time())
+    return {
+        "user_info": {
+            "username": username, "password": password, "message": "", "auth": 1, "status": "Active",
+            "exp_date": None, "is_trial": "0", "active_cons": "0", "created_at": str(now),
+            "max_connections": "1", "allowed_output_formats": ["m3u8", "ts"],
+        },
+        "server_info": {
+            "url": request.url.host, "port": str(request.url.port or PORT), "https_port": "",
+            "server_protocol": request.url.scheme, "rtmp_port": "", "timezone": "UTC",
+            "timestamp_now": now, "time_now": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(now)),
+        },
+    }
+
+
+async def player_api(request):
+    query = request.query
+    username, password = query.get("username", ""), query.get("password", "")
+    if not authorized(username, password):
+        return web.json_response({"user_info": {"auth": 0}})
+    action = query.get("action")
+    if not action:
+        return web.json_response(login_payload(request, username, password))
+    cached = request.app[CATALOG].catalog.response(action, query)
+    if cached is None:
+        return web.json_response([])
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if cached.etag in request.headers.get("If-None-Match", ""):
+        return web.Response(status=304, headers=headers)
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return web.Response(body=cached.gzipped, content_type="application/json", headers=headers)
+    return web.Response(body=cached.body, content_type="application/json", headers=headers)
+
+
+async def stream(request):
+    info = request.match_info
+    if not authorized(info["username"], info["password"]):
+        raise web.HTTPForbidden()
+    url = request.app[CATALOG].catalog.urls[info.get("kind", "live")].get(int(info["stream_id"]))
+    if url is None:
+        raise web.HTTPNotFound()
+    raise web.HTTPFound(url)
+
+
+async def watch_sources(app):
+    """Reloads the catalog in a thread whenever a source file changes."""
+    vod_path, live_paths = app[SOURCES]
+    holder = app[CATALOG]
+    paths = (vod_path, *live_paths)
+    current = signature(paths)
+    while True:
+        await asyncio.sleep(POLL_SECONDS)
+        latest = signature(paths)
+        if latest == current:
+            continue
+        current = latest
+        try:
+            holder.catalog = await asyncio.to_thread(load_catalog, vod_path, live_paths)
+        except Exception as e:
+            print(f"⚠️ Reload failed, still serving the previous catalog: {e}")
+
+
+async def source_watcher(app):
+    task = asyncio.create_task(watch_sources(app))
+    yield
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def make_app(vod_path=DEFAULT_VOD, live_paths=DEFAULT_LIVE, watch=True):
+    app = web.Application()
+    app[SOURCES] = (vod_path, tuple(live_paths))
+    app[CATALOG] = CatalogHolder(load_catalog(vod_path, live_paths))
+    if watch:
+        app.cleanup_ctx.append(source_watcher)
+    credentials = "{username}/{password}/{stream_id:\\d+}"
+    app.router.add_get("/player_api.php", player_api)
+    app.router.add_get(f"/{{kind:live|movie|series}}/{credentials}.{{ext:\\w+}}", stream)
+    app.router.add_get(f"/{{kind:live|movie|series}}/{credentials}", stream)
+    app.router.add_get(f"/{credentials}", stream)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vod", default=DEFAULT_VOD, help="DrewLiveVOD.json or a vod_catalog file")
+    parser.add_argument("--live", action="append", help="live playlist (repeatable; default: the merged playlists)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--no-watch", action="store_true", help="do not reload when the sources change")
+    args = parser.parse_args()
+
+    app = make_app(args.vod, args.live or DEFAULT_LIVE, watch=not args.no_watch)
+    web.run_app(app, host=args.host, port=args.port, access_log=None,
+                print=lambda _: print(f"📡 Xtream API on http://{args.host}:{args.port}/player_api.php"))
+
+
+if __name__ == "__main__":
+    main()